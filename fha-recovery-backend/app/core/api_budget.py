@@ -0,0 +1,322 @@
+# Shared, cross-worker budget for Gemini API calls
+# Counters live in the database (or Redis when REDIS_URL is set) so every
+# worker process draws from the same per-user and global quotas
+
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, select, update
+
+from app.core.database import dialect_insert
+from app.models.api_usage import ApiUsageCounter
+
+# Endpoints that spend Gemini quota
+API_ENDPOINTS = ("analyze", "inspiration", "recipe")
+
+
+@dataclass
+class QuotaRule:
+    """One limit: at most `limit` calls per `window` for a scope/endpoint pair"""
+    scope: str  # "global" or "user"
+    endpoint: str  # one of API_ENDPOINTS, or "all"
+    window: str  # "day" or "minute"
+    limit: int
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def default_quota_rules() -> List[QuotaRule]:
+    """Build quota rules from environment variables (0 disables a rule)"""
+    rules = [
+        QuotaRule("global", "all", "day", _env_int("GEMINI_DAILY_BUDGET", 500)),
+        QuotaRule("global", "all", "minute", _env_int("GEMINI_CALLS_PER_MINUTE", 60)),
+        QuotaRule("global", "analyze", "day", _env_int("GEMINI_DAILY_QUOTA_ANALYZE", 300)),
+        QuotaRule("global", "inspiration", "day", _env_int("GEMINI_DAILY_QUOTA_INSPIRATION", 100)),
+        QuotaRule("global", "recipe", "day", _env_int("GEMINI_DAILY_QUOTA_RECIPE", 200)),
+        QuotaRule("user", "analyze", "day", _env_int("GEMINI_USER_DAILY_QUOTA_ANALYZE", 30)),
+        QuotaRule("user", "inspiration", "day", _env_int("GEMINI_USER_DAILY_QUOTA_INSPIRATION", 10)),
+        QuotaRule("user", "recipe", "day", _env_int("GEMINI_USER_DAILY_QUOTA_RECIPE", 20)),
+        QuotaRule("user", "all", "minute", _env_int("GEMINI_USER_CALLS_PER_MINUTE", 6)),
+    ]
+    return [rule for rule in rules if rule.limit > 0]
+
+
+def _window_key(window: str, now: datetime) -> str:
+    """Name of the current fixed window; a new name means the counter has reset"""
+    if window == "minute":
+        return f"minute:{now.strftime('%Y-%m-%dT%H:%M')}"
+    return f"day:{now.date().isoformat()}"
+
+
+def _window_expiry(window: str, now: datetime) -> datetime:
+    """End of the current window, after which its counter can be purged"""
+    if window == "minute":
+        return now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+class _QuotaExhausted(Exception):
+    """Raised inside a consume transaction to roll back partial increments"""
+
+    def __init__(self, key):
+        super().__init__(key.scope)
+        self.key = key
+
+
+@dataclass
+class CounterKey:
+    scope: str
+    endpoint: str
+    window: str
+    limit: int
+    expires_at: datetime
+
+
+class SQLBudgetStore:
+    """
+    Counter store backed by the application database.
+    Each acquire runs in one transaction that creates missing counters and
+    increments them only while below their limit, so concurrent workers can
+    never push a counter past its cap.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._last_purge = None
+
+    def try_consume(self, keys: List[CounterKey]) -> Optional[CounterKey]:
+        """Consume one unit from every key; returns the first exhausted key, or None on success"""
+        table = ApiUsageCounter.__table__
+        try:
+            with self.engine.begin() as conn:
+                self._consume_all(conn, table, keys)
+        except _QuotaExhausted as exhausted:
+            return exhausted.key
+        self._purge_expired()
+        return None
+
+    @staticmethod
+    def _consume_all(conn, table, keys: List[CounterKey]):
+        for key in keys:
+            conn.execute(
+                dialect_insert(conn.dialect.name, table)
+                .values(scope=key.scope, endpoint=key.endpoint, window=key.window,
+                        count=0, expires_at=key.expires_at)
+                .on_conflict_do_nothing(index_elements=["scope", "endpoint", "window"])
+            )
+            result = conn.execute(
+                update(table)
+                .where(and_(
+                    table.c.scope == key.scope,
+                    table.c.endpoint == key.endpoint,
+                    table.c.window == key.window,
+                    table.c.count < key.limit,
+                ))
+                .values(count=table.c.count + 1)
+            )
+            if result.rowcount == 0:
+                # Abort the transaction so earlier keys aren't charged either
+                raise _QuotaExhausted(key)
+
+    def get_counts(self, keys: List[CounterKey]) -> Dict[str, int]:
+        table = ApiUsageCounter.__table__
+        counts = {}
+        with self.engine.connect() as conn:
+            for key in keys:
+                count = conn.execute(
+                    select(table.c.count).where(and_(
+                        table.c.scope == key.scope,
+                        table.c.endpoint == key.endpoint,
+                        table.c.window == key.window,
+                    ))
+                ).scalar()
+                counts[f"{key.scope}|{key.endpoint}|{key.window}"] = count or 0
+        return counts
+
+    def _purge_expired(self):
+        """Drop finished windows at most once a minute per process"""
+        now = datetime.now()
+        if self._last_purge and now - self._last_purge < timedelta(minutes=1):
+            return
+        self._last_purge = now
+        table = ApiUsageCounter.__table__
+        with self.engine.begin() as conn:
+            conn.execute(delete(table).where(table.c.expires_at < now))
+
+
+class RedisBudgetStore:
+    """Counter store backed by Redis; all keys are checked and incremented in one Lua script"""
+
+    _CONSUME_SCRIPT = """
+    for i, key in ipairs(KEYS) do
+        local current = tonumber(redis.call('GET', key) or '0')
+        if current >= tonumber(ARGV[(i - 1) * 2 + 1]) then
+            return i
+        end
+    end
+    for i, key in ipairs(KEYS) do
+        redis.call('INCR', key)
+        redis.call('EXPIREAT', key, ARGV[(i - 1) * 2 + 2])
+    end
+    return 0
+    """
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(redis_url)
+        self._consume = self.client.register_script(self._CONSUME_SCRIPT)
+
+    @staticmethod
+    def _redis_key(key: CounterKey) -> str:
+        return f"gemini_budget:{key.scope}:{key.endpoint}:{key.window}"
+
+    def try_consume(self, keys: List[CounterKey]) -> Optional[CounterKey]:
+        args = []
+        for key in keys:
+            args.extend([key.limit, int(key.expires_at.timestamp())])
+        exhausted = self._consume(keys=[self._redis_key(k) for k in keys], args=args)
+        return keys[int(exhausted) - 1] if exhausted else None
+
+    def get_counts(self, keys: List[CounterKey]) -> Dict[str, int]:
+        values = self.client.mget([self._redis_key(k) for k in keys])
+        return {
+            f"{key.scope}|{key.endpoint}|{key.window}": int(value or 0)
+            for key, value in zip(keys, values)
+        }
+
+
+class ApiBudget:
+    """
+    Per-user and global quotas for Gemini calls, shared by all workers.
+    Windows are fixed (per calendar day / per minute) and reset on their own
+    as the window key rolls over.
+    """
+
+    def __init__(self, store, rules: Optional[List[QuotaRule]] = None):
+        self.store = store
+        self.rules = rules if rules is not None else default_quota_rules()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            endpoint: {"allowed": 0, "denied": 0, "errors": 0}
+            for endpoint in API_ENDPOINTS
+        }
+        self.denials_by_rule: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "ApiBudget":
+        """Use Redis when REDIS_URL is configured, otherwise the application database"""
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url:
+            try:
+                return cls(RedisBudgetStore(redis_url))
+            except Exception as e:
+                print(f"❌ Redis budget store unavailable, using database: {e}")
+        from app.core.database import engine
+        return cls(SQLBudgetStore(engine))
+
+    def _keys_for(self, endpoint: str, user_id: Optional[str], now: datetime) -> List[CounterKey]:
+        keys = []
+        for rule in self.rules:
+            if rule.endpoint not in ("all", endpoint):
+                continue
+            if rule.scope == "user":
+                if not user_id:
+                    continue
+                scope = f"user:{user_id}"
+            else:
+                scope = "global"
+            keys.append(CounterKey(
+                scope=scope,
+                endpoint=rule.endpoint,
+                window=_window_key(rule.window, now),
+                limit=rule.limit,
+                expires_at=_window_expiry(rule.window, now),
+            ))
+        return keys
+
+    def _record(self, endpoint: str, outcome: str):
+        with self._metrics_lock:
+            self.metrics.setdefault(endpoint, {"allowed": 0, "denied": 0, "errors": 0})
+            self.metrics[endpoint][outcome] += 1
+
+    def acquire(self, endpoint: str, user_id: Optional[str] = None) -> bool:
+        """
+        Reserve one Gemini call for an endpoint. Returns False when any quota
+        is exhausted (or the store is unreachable) so callers use their fallback.
+        """
+        keys = self._keys_for(endpoint, user_id, datetime.now())
+        try:
+            exhausted = self.store.try_consume(keys)
+        except Exception as e:
+            print(f"❌ API budget store error, denying Gemini call: {e}")
+            self._record(endpoint, "errors")
+            return False
+
+        if exhausted:
+            rule_name = f"{exhausted.scope.split(':')[0]}:{exhausted.endpoint}:{exhausted.window.split(':')[0]}"
+            with self._metrics_lock:
+                self.denials_by_rule[rule_name] = self.denials_by_rule.get(rule_name, 0) + 1
+            self._record(endpoint, "denied")
+            return False
+
+        self._record(endpoint, "allowed")
+        return True
+
+    def has_capacity(self, endpoint: str, user_id: Optional[str] = None) -> bool:
+        """Check quotas without consuming anything"""
+        keys = self._keys_for(endpoint, user_id, datetime.now())
+        try:
+            counts = self.store.get_counts(keys)
+        except Exception:
+            return False
+        return all(
+            counts.get(f"{key.scope}|{key.endpoint}|{key.window}", 0) < key.limit
+            for key in keys
+        )
+
+    def usage_snapshot(self, user_id: Optional[str] = None) -> Dict:
+        """Current counters and limits plus in-process allow/deny metrics"""
+        now = datetime.now()
+        seen = set()
+        keys = []
+        for endpoint in API_ENDPOINTS:
+            for key in self._keys_for(endpoint, user_id, now):
+                ident = (key.scope, key.endpoint, key.window)
+                if ident not in seen:
+                    seen.add(ident)
+                    keys.append(key)
+        try:
+            counts = self.store.get_counts(keys)
+        except Exception as e:
+            counts = {}
+            print(f"❌ Could not read API budget counters: {e}")
+
+        with self._metrics_lock:
+            metrics = {endpoint: dict(values) for endpoint, values in self.metrics.items()}
+            denials = dict(self.denials_by_rule)
+
+        return {
+            "backend": type(self.store).__name__,
+            "quotas": [
+                {
+                    "scope": key.scope,
+                    "endpoint": key.endpoint,
+                    "window": key.window,
+                    "used": counts.get(f"{key.scope}|{key.endpoint}|{key.window}", 0),
+                    "limit": key.limit,
+                    "resets_at": key.expires_at.isoformat(),
+                }
+                for key in keys
+            ],
+            "metrics": metrics,
+            "denials_by_rule": denials,
+        }
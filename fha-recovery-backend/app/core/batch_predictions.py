@@ -0,0 +1,52 @@
+# Batch LSTM and Cox scoring over a memory-mapped tracking snapshot
+# Mirrors the per-user prediction endpoints with the same defaults, without
+# querying daily_tracking row by row.
+
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.core.coxfinal import predict_period_recovery_batch
+from app.core.tracking_snapshot import TrackingSnapshot
+
+LSTM_CHANNELS = ("calorie_deficit", "heart_rate_variability", "body_temperature")
+LSTM_WINDOW_DAYS = 60
+HRV_AVERAGE_DAYS = 30
+DEFAULT_MEAN_CYCLE_DURATION = 35.0  # Same default as /api/period-prediction/predict-from-data
+
+
+def score_lstm(snapshot: TrackingSnapshot, predictor, end_date: Optional[date] = None) -> Dict[str, float]:
+    """30-day recovery probability for every user with 60 recorded days in the window"""
+    windows = snapshot.windows(LSTM_WINDOW_DAYS, end_date, channels=LSTM_CHANNELS)
+    eligible = np.flatnonzero(snapshot.observed_days(windows) >= LSTM_WINDOW_DAYS)
+    if eligible.size == 0:
+        return {}
+
+    sequences = predictor.prepare_sequences_batch(windows[eligible])
+    probabilities = predictor.predict_batch(sequences)
+    return dict(zip(snapshot.users[eligible].tolist(), probabilities.tolist()))
+
+
+def score_cox(snapshot: TrackingSnapshot, days_since_period: Dict[str, int],
+              end_date: Optional[date] = None) -> Dict[str, np.ndarray]:
+    """180-day recovery distribution for users with a 30-day HRV average and a known days-since-period"""
+    hrv = snapshot.windows(HRV_AVERAGE_DAYS, end_date, channels=("heart_rate_variability",))[:, :, 0]
+    recorded = np.count_nonzero(~np.isnan(hrv), axis=1)
+    hrv_sums = np.nansum(hrv, axis=1, dtype=np.float64)
+
+    rows = [
+        row for row, user_id in enumerate(snapshot.users.tolist())
+        if recorded[row] > 0 and days_since_period.get(user_id) is not None
+    ]
+    if not rows:
+        return {}
+    rows = np.asarray(rows)
+    user_ids = snapshot.users[rows].tolist()
+
+    distributions = predict_period_recovery_batch(
+        userhrv=hrv_sums[rows] / recorded[rows],
+        usermcd=np.full(rows.size, DEFAULT_MEAN_CYCLE_DURATION),
+        timesinceperiod=np.array([days_since_period[user_id] for user_id in user_ids]),
+    )
+    return dict(zip(user_ids, distributions))
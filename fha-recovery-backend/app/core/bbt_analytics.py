@@ -0,0 +1,343 @@
+# BBT cycle analytics over DailyTracking.body_temperature
+# Coverline, thermal shift detection (3-over-6 rule), smoothed trend and
+# estimated cycle phases. Every step works on a (users, days) matrix so a batch
+# job can analyze thousands of users in one pass; single users are a 1-row batch.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.daily_tracking import DailyTracking
+
+BASELINE_DAYS = 6  # Low readings a shift is compared against
+SHIFT_DAYS = 3  # Consecutive high temperatures that confirm a shift (3-over-6)
+COVERLINE_OFFSET = 0.1  # Coverline sits this far (°F) above the highest baseline temperature
+THIRD_TEMP_RISE = 0.2  # The third high temperature must clear the baseline by this much (°F)
+MIN_SHIFT_GAP = 10  # Days after a shift during which another one is not counted
+MAX_LUTEAL_DAYS = 18  # Luteal phase is assumed over after this long even without a drop
+FERTILE_DAYS = 6  # Five days before estimated ovulation plus ovulation day
+SMOOTHING_WINDOW = 3  # Centered rolling mean for the trend line
+LOOKBACK_DAYS = int(os.getenv("BBT_ANALYTICS_LOOKBACK_DAYS", 365))  # History analyzed per request
+
+PHASE_UNKNOWN, PHASE_FOLLICULAR, PHASE_FERTILE, PHASE_LUTEAL = range(4)
+PHASE_NAMES = ("unknown", "follicular", "fertile", "luteal")
+
+
+def _shifted(values: np.ndarray, offset: int, fill) -> np.ndarray:
+    """values[:, i - offset] at column i (positive offset looks back, negative looks ahead)"""
+    out = np.full_like(values, fill)
+    if offset > 0:
+        out[:, offset:] = values[:, :-offset]
+    elif offset < 0:
+        out[:, :offset] = values[:, -offset:]
+    else:
+        out[:] = values
+    return out
+
+
+def _window_counts(flags: np.ndarray, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+    """Number of True flags in columns [start, stop) for every row; start/stop are per-column index arrays"""
+    totals = np.zeros((flags.shape[0], flags.shape[1] + 1), dtype=np.int32)
+    np.cumsum(flags, axis=1, out=totals[:, 1:])
+    days = flags.shape[1]
+    return totals[:, np.clip(stop, 0, days)] - totals[:, np.clip(start, 0, days)]
+
+
+def rolling_nanmean(values: np.ndarray, window: int = SMOOTHING_WINDOW) -> np.ndarray:
+    """Centered rolling mean along axis 1 that skips missing (NaN) days"""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    columns = np.arange(values.shape[1])
+    start = columns - window // 2
+    stop = start + window
+
+    sums = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(filled, axis=1, out=sums[:, 1:])
+    days = values.shape[1]
+    window_sums = sums[:, np.clip(stop, 0, days)] - sums[:, np.clip(start, 0, days)]
+    counts = _window_counts(valid, start, stop)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, window_sums / counts, np.nan)
+
+
+def analyze_matrix(temps: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Run the analytics over a (users, days) float matrix with NaN for missing days.
+
+    Returns per-day arrays of the same shape: smoothed, coverline, shift_onset
+    (first day of each confirmed thermal shift), cycle_start and phase.
+    """
+    temps = np.asarray(temps, dtype=np.float64)
+    if temps.ndim == 1:
+        temps = temps[np.newaxis, :]
+    days = temps.shape[1]
+    valid = ~np.isnan(temps)
+    columns = np.arange(days)
+
+    # 3-over-6 counts readings, not calendar days, so a missed morning doesn't
+    # hide a shift: move each row's readings to the front, detect, then map back
+    order = np.argsort(~valid, axis=1, kind="stable")
+    readings = np.take_along_axis(temps, order, axis=1)
+    reading_valid = np.take_along_axis(valid, order, axis=1)
+
+    # Highest of the previous six readings
+    reading_baseline = np.full(readings.shape, np.nan)
+    baseline_count = np.zeros(readings.shape, dtype=np.int8)
+    for lag in range(1, BASELINE_DAYS + 1):
+        reading_baseline = np.fmax(reading_baseline, _shifted(readings, lag, np.nan))
+        baseline_count += _shifted(reading_valid, lag, False)
+
+    # Three consecutive readings above the baseline, the third clearly so
+    reading_candidate = (
+        (baseline_count >= BASELINE_DAYS)
+        & (readings > reading_baseline)
+        & (_shifted(readings, -1, np.nan) > reading_baseline)
+        & (_shifted(readings, -2, np.nan) >= reading_baseline + THIRD_TEMP_RISE)
+    )
+
+    baseline = np.empty_like(temps)
+    np.put_along_axis(baseline, order, reading_baseline, axis=1)
+    baseline[~valid] = np.nan
+    candidate = np.zeros(temps.shape, dtype=bool)
+    np.put_along_axis(candidate, order, reading_candidate, axis=1)
+    has_baseline = valid & (np.cumsum(valid, axis=1) > BASELINE_DAYS)
+    coverline = baseline + COVERLINE_OFFSET
+
+    # Only the first candidate of a shift counts as its onset
+    recent = _window_counts(candidate, columns - MIN_SHIFT_GAP, columns)
+    shift_onset = candidate & (recent == 0)
+
+    last_onset = np.maximum.accumulate(np.where(shift_onset, columns, -1), axis=1)
+    has_onset = last_onset >= 0
+    onset_index = np.clip(last_onset, 0, None)
+    days_since_onset = columns - last_onset
+    onset_coverline = np.take_along_axis(coverline, onset_index, axis=1)
+
+    # The luteal phase lasts until a reading falls back to the shift's coverline
+    drop = valid & has_onset & (days_since_onset >= SHIFT_DAYS) & (temps <= onset_coverline)
+    drops = np.cumsum(drop, axis=1)
+    drops_since_onset = drops - np.take_along_axis(drops, onset_index, axis=1)
+    luteal = has_onset & (drops_since_onset == 0) & (days_since_onset < MAX_LUTEAL_DAYS)
+    cycle_start = ~luteal & _shifted(luteal, 1, False)
+
+    # Ovulation is estimated as the day before the shift
+    fertile = _window_counts(shift_onset, columns + 1, columns + FERTILE_DAYS + 1) > 0
+
+    phase = np.full(temps.shape, PHASE_UNKNOWN, dtype=np.int8)
+    phase[np.logical_or.accumulate(has_baseline, axis=1)] = PHASE_FOLLICULAR
+    phase[fertile] = PHASE_FERTILE
+    phase[luteal] = PHASE_LUTEAL
+
+    return {
+        "temperatures": temps,
+        "smoothed": rolling_nanmean(temps),
+        "coverline": np.where(has_onset, onset_coverline, coverline),
+        "shift_onset": shift_onset,
+        "cycle_start": cycle_start,
+        "phase": phase,
+    }
+
+
+@dataclass
+class BBTAnalysis:
+    """One user's analytics; arrays are indexed by day from `start_date`"""
+
+    start_date: date
+    temperatures: np.ndarray
+    smoothed: np.ndarray
+    coverline: np.ndarray
+    shift_onset: np.ndarray
+    cycle_start: np.ndarray
+    phase: np.ndarray
+
+    def _date(self, index: int) -> date:
+        return self.start_date + timedelta(days=int(index))
+
+    @property
+    def readings(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.temperatures)))
+
+    @property
+    def shift_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.shift_onset)
+
+    @property
+    def current_coverline(self) -> Optional[float]:
+        known = np.flatnonzero(~np.isnan(self.coverline))
+        return round(float(self.coverline[known[-1]]), 2) if known.size else None
+
+    @property
+    def latest_shift_date(self) -> Optional[date]:
+        shifts = self.shift_indices
+        return self._date(shifts[-1]) if shifts.size else None
+
+    @property
+    def current_phase(self) -> str:
+        return PHASE_NAMES[int(self.phase[-1])] if self.phase.size else PHASE_NAMES[PHASE_UNKNOWN]
+
+    @property
+    def cycle_length(self) -> Optional[int]:
+        """Median days between cycle starts, or between shifts when fewer than two starts are known"""
+        for boundaries in (np.flatnonzero(self.cycle_start), self.shift_indices):
+            if boundaries.size >= 2:
+                return int(round(float(np.median(np.diff(boundaries)))))
+        return None
+
+    def fertile_window(self) -> Optional[tuple]:
+        """(first, last) cycle day of the fertile window in the latest cycle with a known start"""
+        starts = np.flatnonzero(self.cycle_start)
+        for shift in self.shift_indices[::-1]:
+            earlier = starts[starts < shift]
+            if earlier.size:
+                ovulation_day = int(shift - earlier[-1])  # 1-indexed cycle day before the shift
+                return max(1, ovulation_day - FERTILE_DAYS + 1), ovulation_day
+        return None
+
+    def summary(self) -> dict:
+        """Fields of BBTCycleSummary"""
+        window = self.fertile_window()
+        return {
+            "cycle_length": self.cycle_length,
+            "fertile_window_start": window[0] if window else None,
+            "fertile_window_end": window[1] if window else None,
+            "coverline": self.current_coverline,
+            "thermal_shift_date": self.latest_shift_date,
+            "current_phase": self.current_phase,
+            "cycles_detected": int(self.shift_indices.size),
+        }
+
+    def daily(self) -> List[dict]:
+        """Per-day rows for charting; missing readings are None"""
+        def value(array, index):
+            number = array[index]
+            return None if np.isnan(number) else round(float(number), 2)
+
+        return [
+            {
+                "date": self._date(index),
+                "temperature": value(self.temperatures, index),
+                "smoothed": value(self.smoothed, index),
+                "coverline": value(self.coverline, index),
+                "phase": PHASE_NAMES[int(self.phase[index])],
+                "thermal_shift": bool(self.shift_onset[index]),
+            }
+            for index in range(self.temperatures.size)
+        ]
+
+
+def analyze_batch(user_ids: Sequence, dates: Sequence, temperatures: Sequence) -> Dict[str, BBTAnalysis]:
+    """
+    Analyze many users from flat columns (one row per reading), e.g. straight
+    from a query over daily_tracking. Users share one date grid; later
+    readings for the same user and day win.
+    """
+    if len(user_ids) == 0:
+        return {}
+    users, user_index = np.unique(np.asarray(user_ids), return_inverse=True)
+    days = np.asarray(dates, dtype="datetime64[D]")
+    origin = days.min()
+    day_index = (days - origin).astype(np.int64)
+
+    matrix = np.full((users.size, int(day_index.max()) + 1), np.nan)
+    matrix[user_index, day_index] = np.asarray(temperatures, dtype=np.float64)
+    result = analyze_matrix(matrix)
+
+    start_date = origin.astype(date)
+    first_day = np.full(users.size, matrix.shape[1])
+    np.minimum.at(first_day, user_index, day_index)
+
+    analyses = {}
+    for row, user_id in enumerate(users.tolist()):
+        begin = int(first_day[row])
+        analyses[user_id] = BBTAnalysis(
+            start_date=start_date + timedelta(days=begin),
+            **{name: values[row, begin:] for name, values in result.items()}
+        )
+    return analyses
+
+
+def analyze_series(dates: Sequence[date], temperatures: Sequence[float]) -> Optional[BBTAnalysis]:
+    """Analyze a single user's readings; None when there are none"""
+    if len(dates) == 0:
+        return None
+    return analyze_batch(["user"] * len(dates), dates, temperatures)["user"]
+
+
+class BBTAnalyticsCache:
+    """
+    Per-user analysis cache. Writes that touch body_temperature call
+    invalidate(); the TTL bounds staleness across workers. The loader runs
+    outside the lock, so each invalidate() bumps a generation and a result
+    loaded across one is returned but not stored.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_users: Optional[int] = None):
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv("BBT_ANALYTICS_CACHE_TTL_SECONDS", 300))
+        self.max_users = max_users or int(os.getenv("BBT_ANALYTICS_CACHE_MAX_USERS", 2000))
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0  # Bumped by invalidate() of every user
+        self._generations: Dict[str, int] = {}
+        self.metrics = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, user_id: str, loader: Callable[[], Optional[BBTAnalysis]]) -> Optional[BBTAnalysis]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached and now - cached[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.metrics["hits"] += 1
+                return cached[0]
+            self.metrics["misses"] += 1
+            generation = self._generation(user_id)
+
+        analysis = loader()
+        with self._lock:
+            if self._generation(user_id) != generation:
+                return analysis
+            self._entries[user_id] = (analysis, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return analysis
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """Drop one user's analysis, or everything when user_id is None"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+                self._generations.clear()
+                self._epoch += 1
+            else:
+                self._entries.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.metrics["invalidations"] += 1
+
+    def _generation(self, user_id: str) -> tuple:
+        return self._epoch, self._generations.get(user_id, 0)
+
+
+bbt_analytics_cache = BBTAnalyticsCache()
+
+
+def load_user_series(db: Session, user_id: str, lookback_days: int = LOOKBACK_DAYS):
+    """(dates, temperatures) of a user's recorded body temperatures, oldest first"""
+    rows = db.query(DailyTracking.tracking_date, DailyTracking.body_temperature).filter(
+        DailyTracking.user_id == user_id,
+        DailyTracking.body_temperature.isnot(None),
+        DailyTracking.tracking_date >= date.today() - timedelta(days=lookback_days)
+    ).order_by(DailyTracking.tracking_date).all()
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def get_user_analysis(db: Session, user_id: str) -> Optional[BBTAnalysis]:
+    """Cached analysis of the user's recent body temperatures"""
+    return bbt_analytics_cache.get(user_id, lambda: analyze_series(*load_user_series(db, user_id)))
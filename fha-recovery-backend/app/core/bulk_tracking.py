@@ -0,0 +1,241 @@
+# Bulk ingestion of per-date tracking metrics (wearable syncs)
+# Parses a JSON array or NDJSON body, validates every row in one vectorized
+# pass and upserts the valid rows with one multi-row INSERT ... ON CONFLICT per
+# chunk, all inside the caller's transaction.
+
+import json
+import os
+import re
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import and_, func
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert, new_revision
+from app.core.metric_rollups import METRICS as ROLLUP_METRICS, TrackingValues, apply_tracking_changes
+from app.models.daily_tracking import DailyTracking
+
+BULK_MAX_ROWS = int(os.getenv("BULK_TRACKING_MAX_ROWS", 5000))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_TRACKING_CHUNK_SIZE", 500))
+
+# Same bounds as HealthMetricsUpdateRequest
+METRIC_BOUNDS = {
+    "body_temperature": (95.0, 105.0),
+    "heart_rate_variability": (0.0, 200.0),
+    "total_calories": (0, 5000),
+    "calorie_deficit": (-2000, 2000),
+}
+INTEGER_METRICS = ("total_calories", "calorie_deficit")
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}", re.ASCII)
+
+_table = DailyTracking.__table__
+
+
+class BulkPayloadError(ValueError):
+    """The request body could not be parsed into rows"""
+
+
+class UnparsableRow:
+    """Placeholder for an NDJSON line that isn't valid JSON; reported as an invalid row"""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def parse_rows(body: bytes, content_type: Optional[str] = None) -> List:
+    """
+    Rows from NDJSON (one object per line) or JSON (an array, or {"readings": [...]}).
+    A malformed NDJSON line becomes an UnparsableRow so the other lines still load;
+    BulkPayloadError is only raised when the body as a whole can't be read.
+    """
+    try:
+        text = body.decode("utf-8")
+    except UnicodeDecodeError:
+        raise BulkPayloadError("Body must be UTF-8 encoded")
+
+    content_type = (content_type or "").lower()
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                rows.append(UnparsableRow(f"Invalid JSON on line {line_number}: {e.msg}"))
+        return rows
+
+    try:
+        payload = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise BulkPayloadError(f"Invalid JSON: {e.msg}")
+    rows = payload.get("readings") if isinstance(payload, dict) else payload
+    if not isinstance(rows, list):
+        raise BulkPayloadError('Expected an array of readings or {"readings": [...]}')
+    return rows
+
+
+def _strict_date(value) -> Optional[date]:
+    """The date for an exact YYYY-MM-DD string, else None ("2026", "today" and datetimes are rejected)"""
+    if not isinstance(value, str) or not ISO_DATE.fullmatch(value):
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _date_column(values: List) -> np.ndarray:
+    """datetime64[D] array with NaT for missing or malformed dates"""
+    return np.array([_strict_date(value) or "NaT" for value in values], dtype="datetime64[D]")
+
+
+def _numeric_column(values: List) -> Tuple[np.ndarray, np.ndarray]:
+    """(float array with NaN for missing, mask of values that aren't numbers)"""
+    cleaned = [None if isinstance(value, bool) else value for value in values]
+    try:
+        numbers = np.array(cleaned, dtype=np.float64)
+        malformed = np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        numbers = np.full(len(values), np.nan)
+        malformed = np.zeros(len(values), dtype=bool)
+        for index, value in enumerate(cleaned):
+            try:
+                numbers[index] = np.nan if value is None else float(value)
+            except (TypeError, ValueError):
+                malformed[index] = True
+    malformed |= np.array([isinstance(value, bool) for value in values], dtype=bool)
+    return numbers, malformed
+
+
+def validate_rows(rows: List) -> Dict:
+    """
+    Validate all rows at once. Returns the parsed columns plus per-row error
+    lists and a `keep` mask of valid rows; when a date repeats, the last
+    valid row for it wins and earlier ones are marked superseded.
+    """
+    count = len(rows)
+    errors: List[List[str]] = [[] for _ in range(count)]
+    is_object = np.array([isinstance(row, dict) for row in rows], dtype=bool)
+    for index in np.flatnonzero(~is_object):
+        errors[index].append(rows[index].error if isinstance(rows[index], UnparsableRow) else "Row must be an object")
+
+    def field(name):
+        return [row.get(name) if isinstance(row, dict) else None for row in rows]
+
+    dates = _date_column(field("tracking_date"))
+    for index in np.flatnonzero(is_object & np.isnat(dates)):
+        errors[index].append("tracking_date is required as YYYY-MM-DD")
+
+    metrics = {}
+    present = np.zeros(count, dtype=bool)
+    supplied_malformed = np.zeros(count, dtype=bool)
+    for name, (low, high) in METRIC_BOUNDS.items():
+        values, malformed = _numeric_column(field(name))
+        for index in np.flatnonzero(malformed):
+            errors[index].append(f"{name} must be a number")
+        supplied_malformed |= malformed
+        with np.errstate(invalid="ignore"):
+            out_of_range = (values < low) | (values > high)
+            if name in INTEGER_METRICS:
+                out_of_range |= ~np.isnan(values) & (values != np.round(values))
+        for index in np.flatnonzero(out_of_range):
+            errors[index].append(f"{name} must be between {low} and {high}"
+                                 + (" (whole number)" if name in INTEGER_METRICS else ""))
+        metrics[name] = values
+        present |= ~np.isnan(values)
+
+    for index in np.flatnonzero(is_object & ~present & ~supplied_malformed):
+        errors[index].append("At least one metric is required")
+
+    keep = np.array([not row_errors for row_errors in errors], dtype=bool)
+
+    # Last valid row per date wins
+    superseded = np.zeros(count, dtype=bool)
+    valid_rows = np.flatnonzero(keep)
+    if valid_rows.size:
+        reversed_rows = valid_rows[::-1]
+        _, first_in_reverse = np.unique(dates[reversed_rows], return_index=True)
+        winners = np.zeros(count, dtype=bool)
+        winners[reversed_rows[first_in_reverse]] = True
+        superseded = keep & ~winners
+        keep &= winners
+
+    return {"dates": dates, "metrics": metrics, "errors": errors, "keep": keep, "superseded": superseded}
+
+
+def _value(number: float, name: str):
+    if np.isnan(number):
+        return None
+    return int(number) if name in INTEGER_METRICS else float(number)
+
+
+def bulk_upsert(db: Session, user_id: str, rows: List, chunk_size: int = BULK_CHUNK_SIZE) -> List[dict]:
+    """
+    Validate and upsert rows for one user; returns a status per input row.
+    Metrics missing from a row leave the stored value untouched. The caller commits.
+    """
+    validated = validate_rows(rows)
+    dates, metrics, keep = validated["dates"], validated["metrics"], validated["keep"]
+
+    statuses = []
+    for index in range(len(rows)):
+        day = None if np.isnat(dates[index]) else dates[index].astype(date)
+        if validated["errors"][index]:
+            statuses.append({"index": index, "tracking_date": day, "status": "invalid",
+                             "errors": validated["errors"][index]})
+        elif validated["superseded"][index]:
+            statuses.append({"index": index, "tracking_date": day, "status": "skipped",
+                             "errors": ["Superseded by a later row for the same date"]})
+        else:
+            statuses.append({"index": index, "tracking_date": day, "status": None, "errors": []})
+
+    kept = np.flatnonzero(keep)
+    if kept.size == 0:
+        return statuses
+
+    kept_dates = dates[kept].astype(date).tolist()
+    existing = {
+        row.tracking_date: row
+        for row in db.query(DailyTracking.tracking_date, *[getattr(DailyTracking, name) for name in METRIC_BOUNDS])
+        .filter(and_(
+            DailyTracking.user_id == user_id,
+            DailyTracking.tracking_date >= min(kept_dates),
+            DailyTracking.tracking_date <= max(kept_dates)
+        )).all()
+    }
+
+    records = []
+    changes = []
+    for index, day in zip(kept.tolist(), kept_dates):
+        record = {"user_id": user_id, "tracking_date": day, "revision": new_revision()}
+        record.update({name: _value(metrics[name][index], name) for name in METRIC_BOUNDS})
+        records.append(record)
+
+        current = existing.get(day)
+        merged = {
+            name: record[name] if record[name] is not None else (getattr(current, name) if current else None)
+            for name in METRIC_BOUNDS
+        }
+        before = TrackingValues(day, **{name: getattr(current, name) for name in ROLLUP_METRICS}) if current else None
+        after = TrackingValues(day, **{name: merged[name] for name in ROLLUP_METRICS})
+        changes.append((before, after))
+        statuses[index]["status"] = "updated" if current else "created"
+
+    # Rollups read the rows as they were, so fold the changes in before writing them
+    apply_tracking_changes(db, user_id, changes)
+
+    dialect_name = db.get_bind().dialect.name
+    for start in range(0, len(records), chunk_size):
+        statement = dialect_insert(dialect_name, _table).values(records[start:start + chunk_size])
+        db.execute(statement.on_conflict_do_update(
+            index_elements=["user_id", "tracking_date"],
+            set_={
+                **{name: func.coalesce(statement.excluded[name], _table.c[name]) for name in METRIC_BOUNDS},
+                "revision": statement.excluded.revision,
+                "updated_at": func.now(),
+            }
+        ))
+    return statuses
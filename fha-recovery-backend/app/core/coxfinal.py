@@ -520,3 +520,41 @@ def predict_period_recovery(userhrv: float, usermcd: float, timesinceperiod: int
     
     # Return first 180 days of probability distribution
     return pdf[:180] if len(pdf) >= 180 else np.pad(pdf, (0, max(0, 180 - len(pdf))), 'constant')
+
+
+def predict_period_recovery_batch(userhrv: np.ndarray, usermcd: np.ndarray, timesinceperiod: np.ndarray) -> np.ndarray:
+    """
+    Vectorized predict_period_recovery for many users.
+    
+    Args:
+        userhrv: Heart rate variability averages (ms), shape (users,)
+        usermcd: Mean cycle durations (days), shape (users,)
+        timesinceperiod: Days since last period, shape (users,)
+    
+    Returns:
+        numpy array of shape (users, 180); row i matches predict_period_recovery for user i
+    """
+    userhrv = np.asarray(userhrv, dtype=np.float64)
+    usermcd = np.asarray(usermcd, dtype=np.float64)
+    timesinceperiod = np.asarray(timesinceperiod, dtype=np.int64)
+    
+    base = np.asarray(baseline)
+    scale = -0.12 * (userhrv - 26.71)/(4.1959) - 1.02 * (usermcd - 477.48)/(143.7548)
+    hdf = base[np.newaxis, :] * scale[:, np.newaxis]
+    sdf = np.exp(-1 * np.cumsum(hdf, axis=1))
+    density = hdf * sdf
+    
+    # Sum of density[t:] for each user's offset t
+    tail_sums = np.cumsum(density[:, ::-1], axis=1)[:, ::-1]
+    tail_sums = np.concatenate([tail_sums, np.zeros((density.shape[0], 1))], axis=1)
+    offsets = np.clip(timesinceperiod, 0, len(base))
+    totals = tail_sums[np.arange(density.shape[0]), offsets]
+    
+    # density[t:t + 180] per user, zero-padded past the end of the baseline
+    columns = offsets[:, np.newaxis] + np.arange(180)[np.newaxis, :]
+    padded = np.concatenate([density, np.zeros((density.shape[0], 180))], axis=1)
+    windows = np.take_along_axis(padded, columns, axis=1)
+    
+    # Past the end of the baseline nothing is left; predict_period_recovery returns zeros there
+    safe_totals = np.where(totals != 0, totals, 1.0)
+    return np.where(totals[:, np.newaxis] != 0, windows / safe_totals[:, np.newaxis], 0.0)
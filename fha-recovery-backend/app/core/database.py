@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
+import uuid
 
 # Database URL - using SQLite for development, can be changed to PostgreSQL for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./fha_recovery.db")
@@ -13,7 +14,9 @@ else:
     engine = create_engine(DATABASE_URL)
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Sessions live for one request, so keep loaded state after commit instead of
+# re-SELECTing every object the response serializes
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Create Base class
 Base = declarative_base()
@@ -28,9 +31,29 @@ def get_db():
         db.close()
 
 
+# Opaque token for a row's `revision` column; a new one is stored on every write
+def new_revision() -> str:
+    return uuid.uuid4().hex
+
+
+# Dialect-specific INSERT supporting ON CONFLICT upserts (SQLite and PostgreSQL)
+def dialect_insert(dialect_name: str, table):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
 # Create tables
 def create_tables():
     # Import all models to ensure they're registered with Base
     from app.models.health_profile import HealthProfile
     from app.models.daily_tracking import DailyTracking
+    from app.models.api_usage import ApiUsageCounter
+    from app.models.recipe_cache import RecipeCacheEntry
+    from app.models.meal import Meal
+    from app.models.bbt_reading import BBTReading
+    from app.models.user_metric_rollup import UserMetricRollup
+    from app.models.hrv_sample import HRVSampleBlock, HRVDailyStats
     Base.metadata.create_all(bind=engine)
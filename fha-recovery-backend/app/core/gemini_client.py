@@ -1,169 +1,236 @@
 import os
-import json
+import re
 import google.generativeai as genai
-from google import genai as google_genai
 from google.genai import types
-from typing import Optional, List
-import base64
+from typing import Optional, List, Callable, Iterator, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor, wait
 import uuid
 from PIL import Image
 from io import BytesIO
-from app.schemas.meal_analysis import MealAnalysisResponse, NutrientInfo, HealthAspect
-from app.schemas.ai import MealInspirationResponse, MealInspiration, FullRecipe
+from app.schemas.meal_analysis import (
+    MealAnalysisResponse, MealAnalysisPayload, MealBatchAnalysisPayload, NutrientInfo, HealthAspect
+)
+from app.schemas.ai import MealInspirationResponse, MealInspiration, MealInspirationPayload, FullRecipe
+from app.core.json_stream import StreamingArrayExtractor, parse_json_tolerant
+from app.core.structured_output import (
+    ANALYSIS_RESPONSE_SCHEMA, BATCH_ANALYSIS_RESPONSE_SCHEMA, INSPIRATION_RESPONSE_SCHEMA, RECIPE_RESPONSE_SCHEMA,
+    json_output_config, parse_model
+)
+from app.core.image_pipeline import PreparedImage, has_image, prepare_meal_image
+from app.core.resilience import ResilientCaller
+from app.core.llm_backend import LLMBackend, create_backend
+from app.core.static_content import (
+    PLACEHOLDER_IMAGE_URL, fallback_inspiration, fallback_recipe, fallback_svg_image
+)
+from app.core.prompts import (
+    CALORIE_MARKER, DAILY_CALORIE_TARGET, build_analysis_prompt, build_batch_analysis_prompt, build_inspiration_prompt,
+    build_recipe_prompt, meal_calories
+)
+
+_CALORIE_NUMBER = re.compile(r'\d+')
+
+# Introductory filler Gemini sometimes puts before the analysis text
+_RESPONSE_PREFIX = re.compile(
+    r"^\s*(?:"
+    r"(?:okay,\s*)?here(?:'s| is) (?:a response|the analysis|my analysis"
+    r"|the encouraging analysis(?: of the (?:breakfast |lunch |dinner |snack )?meal)?)"
+    r"|(?:the )?encouraging analysis|analysis|response"
+    r")\s*:\s*",
+    re.IGNORECASE
+)
 
 
 class GeminiClient:
-    def __init__(self):
-        # Configure Gemini API
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-        self.genai_client = google_genai.Client(api_key=api_key)
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        # Real Gemini API by default; LLM_BACKEND=stub runs offline without an API key
+        self.backend = backend or create_backend()
+        
+        # Bounded fan-out for per-suggestion post-processing (images, recipe prefetch)
+        self.postprocess_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("INSPIRATION_FANOUT_WORKERS", 4)),
+            thread_name_prefix="inspiration-postprocess"
+        )
+        self.image_timeout = float(os.getenv("MEAL_IMAGE_TIMEOUT_SECONDS", 4))
+        
+        # JSON mode with a response schema for the non-streaming calls
+        self.analysis_config = json_output_config(ANALYSIS_RESPONSE_SCHEMA)
+        self.batch_analysis_config = json_output_config(BATCH_ANALYSIS_RESPONSE_SCHEMA)
+        self.inspiration_config = json_output_config(INSPIRATION_RESPONSE_SCHEMA)
+        self.recipe_config = json_output_config(RECIPE_RESPONSE_SCHEMA)
+        
+        # Retries, hedging and circuit breaking around every generate_content call
+        self.resilience = ResilientCaller.from_env("gemini")
+
+    def _generate(self, contents, stream: bool = False, generation_config: Optional[genai.GenerationConfig] = None):
+        """Single entry point for Gemini text calls; raises CircuitOpenError while the API is unhealthy"""
+        return self.resilience.call(
+            self.backend.generate_content, contents,
+            stream=stream, generation_config=generation_config, hedge=not stream
+        )
 
-    def analyze_meal(self, meal_type: str, description: str, image_base64: Optional[str] = None) -> MealAnalysisResponse:
+    def circuit_open(self) -> bool:
+        """True while the circuit breaker is rejecting Gemini calls"""
+        return self.resilience.breaker.is_open()
+
+    def analyze_meal(self, meal_type: str, description: str, image_base64: Optional[str] = None,
+                     prepared_image: Optional[PreparedImage] = None) -> MealAnalysisResponse:
         """Analyze a meal using Gemini API for nutritional assessment"""
         
         # Construct the prompt for FHA-focused nutritional analysis
-        prompt = self._create_analysis_prompt(meal_type, description)
+        prompt = self._create_analysis_prompt(meal_type, description, structured=True)
         
         try:
-            # For text-only analysis (no image)
-            if not image_base64 or image_base64.strip() == "" or image_base64 == "null":
-                # Simple text prompt
-                response = self.model.generate_content(prompt)
-            else:
-                # Handle image + text analysis
-                # Remove data URL prefix if present
-                if image_base64.startswith('data:image'):
-                    image_base64 = image_base64.split(',')[1]
-                
-                try:
-                    image_data = base64.b64decode(image_base64)
-                    content = [
-                        prompt,
-                        {
-                            'mime_type': 'image/jpeg',
-                            'data': image_data
-                        }
-                    ]
-                    response = self.model.generate_content(content)
-                except Exception as img_error:
-                    print(f"Image processing failed, falling back to text-only: {img_error}")
-                    # Fall back to text-only if image processing fails
-                    response = self.model.generate_content(prompt)
+            response = self._generate_with_optional_image(prompt, image_base64, prepared_image=prepared_image,
+                                                          generation_config=self.analysis_config)
             
             # Check if response is valid
             if not response or not response.text:
                 raise ValueError("Empty response from Gemini API")
             
             # Parse the structured response
-            return self._parse_gemini_response(response.text, meal_type)
+            return self._parse_structured_analysis(response.text, meal_type)
             
         except Exception as e:
             print(f"Gemini API error in analyze_meal: {str(e)}")
             # Return a fallback response if Gemini fails
             return self._create_fallback_response(meal_type, f"Error: {str(e)}")
 
-    def _create_analysis_prompt(self, meal_type: str, description: str) -> str:
-        """Create a detailed prompt for Gemini to analyze meals with encouraging feedback and calorie estimation"""
-        return f"""
-You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Analyze this {meal_type} meal and provide a warm, encouraging response that highlights what's nutritionally beneficial about each component, followed by an estimated calorie count.
-
-Meal Description: {description}
-
-Write a natural, conversational response (2-3 sentences) that:
-- Celebrates the specific nutritional benefits of each food component
-- Mentions why these foods are great for energy and health
-- Uses encouraging, positive language
-- Includes specific details (e.g., "eggs are calorie-dense and provide complete protein")
-- Feels personal and supportive
-- Ends with a brief suggestion for how to improve the meal or a complementary food/drink
+    def analyze_meals_batch(self, meals: List[Tuple[str, str]]) -> List[Optional[MealAnalysisResponse]]:
+        """Analyze several text-only (meal_type, description) pairs in one Gemini call
+        
+        Results are in input order; meals the response skipped come back as None.
+        Raises on API or parse errors so the caller can fall back per meal.
+        """
+        prompt = build_batch_analysis_prompt(meals)
+        response = self._generate(prompt, generation_config=self.batch_analysis_config)
+        if not response or not response.text:
+            raise ValueError("Empty response from Gemini API")
+        
+        payload = parse_model(response.text, MealBatchAnalysisPayload)
+        results: List[Optional[MealAnalysisResponse]] = [None] * len(meals)
+        for item in payload.analyses:
+            position = item.index - 1
+            if 0 <= position < len(meals) and results[position] is None:
+                meal_type = meals[position][0]
+                results[position] = self._build_analysis_response(
+                    item.analysis, item.estimated_calories, meal_type, item.analysis
+                )
+        print(f"Batch analysis - Gemini returned {sum(r is not None for r in results)}/{len(meals)} meals")
+        return results
 
-After your encouraging analysis, provide an estimated calorie count for the meal on a new line in this exact format:
-ESTIMATED_CALORIES: [number]
+    def _generate_with_optional_image(self, prompt: str, image_base64: Optional[str], stream: bool = False,
+                                      prepared_image: Optional[PreparedImage] = None,
+                                      generation_config: Optional[genai.GenerationConfig] = None):
+        """Send the prompt alone, or with the preprocessed meal photo when one was provided"""
+        if prepared_image is None and has_image(image_base64):
+            try:
+                prepared_image = prepare_meal_image(image_base64)
+            except Exception as img_error:
+                print(f"Image processing failed, falling back to text-only: {img_error}")
+        
+        # For text-only analysis (no image)
+        if prepared_image is None:
+            return self._generate(prompt, stream=stream, generation_config=generation_config)
+        
+        content = [
+            prompt,
+            {
+                'mime_type': prepared_image.mime_type,
+                'data': prepared_image.data
+            }
+        ]
+        return self._generate(content, stream=stream, generation_config=generation_config)
 
-Analysis priorities (incorporate naturally without explicitly mentioning):
-- Adequate calorie density for metabolic recovery
-- Healthy fats for hormone production (omega-3s, monounsaturated fats)
-- Complex carbohydrates for energy restoration
-- Quality protein for tissue repair
-- Micronutrients supporting metabolic health
-- Celebrating nourishing, energy-dense choices
+    def stream_meal_analysis(self, meal_type: str, description: str, image_base64: Optional[str] = None,
+                             prepared_image: Optional[PreparedImage] = None) -> Iterator[Tuple[str, Any]]:
+        """Stream a meal analysis as ("delta", text) events, ending with ("result", MealAnalysisResponse)
+        
+        The calorie line is held back from the deltas and only reported in the final result.
+        """
+        prompt = self._create_analysis_prompt(meal_type, description)
+        full_text = ""
+        emitted = 0
+        marker_seen = False
+        
+        try:
+            for chunk in self._generate_with_optional_image(prompt, image_base64, stream=True,
+                                                            prepared_image=prepared_image):
+                chunk_text = getattr(chunk, 'text', '') or ''
+                if not chunk_text:
+                    continue
+                full_text += chunk_text
+                if marker_seen:
+                    continue
+                
+                marker_at = full_text.find(CALORIE_MARKER)
+                if marker_at != -1:
+                    marker_seen = True
+                    safe_end = marker_at
+                else:
+                    # Hold back a possible partial marker at the end of the buffer
+                    safe_end = max(emitted, len(full_text) - len(CALORIE_MARKER))
+                
+                if safe_end > emitted:
+                    yield "delta", full_text[emitted:safe_end]
+                    emitted = safe_end
+            
+            if not full_text.strip():
+                raise ValueError("Empty response from Gemini API")
+            if not marker_seen and len(full_text) > emitted:
+                yield "delta", full_text[emitted:]
+            
+            yield "result", self._parse_gemini_response(full_text, meal_type)
+        
+        except Exception as e:
+            print(f"Gemini API error in stream_meal_analysis: {str(e)}")
+            yield "error", str(e)
+            yield "result", self._create_fallback_response(meal_type, f"Error: {str(e)}")
 
-Example style: "What a fantastic breakfast choice! The eggs provide calorie-dense complete protein and healthy fats that support hormone production, while the avocado adds heart-healthy monounsaturated fats. The berries bring antioxidants and fiber for gut health. You're giving your body exactly what it needs to thrive and maintain steady energy throughout the morning! Consider adding a glass of whole milk or a handful of nuts for extra calcium and healthy fats.
-ESTIMATED_CALORIES: 450"
+    def _create_analysis_prompt(self, meal_type: str, description: str, structured: bool = False) -> str:
+        """Create a detailed prompt for Gemini to analyze meals with encouraging feedback and calorie estimation
+        
+        structured=True asks for the JSON fields used with the response schema; otherwise the
+        calorie estimate follows the text on an ESTIMATED_CALORIES line (used when streaming).
+        """
+        return build_analysis_prompt(meal_type, description, structured)
 
-IMPORTANT: Provide ONLY the analysis text followed by the calorie estimate. Do not include any prefixes like "Here is a response:" or "Analysis:" - just the encouraging nutritional feedback and calorie count.
-"""
+    def _parse_structured_analysis(self, response_text: str, meal_type: str) -> MealAnalysisResponse:
+        """Validate a JSON-mode analysis, falling back to the text parser if Gemini ignored the schema"""
+        try:
+            payload = parse_model(response_text, MealAnalysisPayload)
+        except ValueError as e:
+            print(f"Structured analysis parse failed, using text parser: {e}")
+            return self._parse_gemini_response(response_text, meal_type)
+        
+        print(f"Extracted calorie estimate: {payload.estimated_calories} for {meal_type}")
+        return self._build_analysis_response(payload.analysis, payload.estimated_calories, meal_type, response_text)
 
     def _parse_gemini_response(self, response_text: str, meal_type: str) -> MealAnalysisResponse:
         """Parse Gemini's natural language response into our schema with calorie extraction"""
-        # Clean up the response text
-        analysis_text = response_text.strip()
+        analysis_text, _, calorie_part = response_text.partition(CALORIE_MARKER)
         
-        # Extract calorie estimate from response
         estimated_calories = None
-        if "ESTIMATED_CALORIES:" in analysis_text:
-            try:
-                # Split by the calorie marker
-                parts = analysis_text.split("ESTIMATED_CALORIES:")
-                analysis_text = parts[0].strip()  # Text before calories
-                calorie_part = parts[1].strip()  # Text after calories
-                
-                # Extract just the number from the calorie part
-                import re
-                calorie_match = re.search(r'\d+', calorie_part)
-                if calorie_match:
-                    estimated_calories = int(calorie_match.group())
-                    print(f"Extracted calorie estimate: {estimated_calories} for {meal_type}")
-            except (ValueError, IndexError) as e:
-                print(f"Error parsing calorie estimate: {e}")
-                estimated_calories = None
+        calorie_match = _CALORIE_NUMBER.search(calorie_part)
+        if calorie_match:
+            estimated_calories = int(calorie_match.group())
+            print(f"Extracted calorie estimate: {estimated_calories} for {meal_type}")
         
         # Remove any markdown formatting if present
-        if "```" in analysis_text:
-            # Remove code block markers
-            analysis_text = analysis_text.replace("```", "").strip()
-        
-        # Remove common AI response prefixes and unnecessary introductory text
-        prefixes_to_remove = [
-            "Here is a response:",
-            "Here's a response:",
-            "Analysis:",
-            "Here is the analysis:",
-            "Here's the analysis:",
-            "Response:",
-            "Here is my analysis:",
-            "Here's my analysis:",
-            "Okay, here's the encouraging analysis of the breakfast meal:",
-            "Okay, here's the encouraging analysis of the lunch meal:",
-            "Okay, here's the encouraging analysis of the dinner meal:",
-            "Okay, here's the encouraging analysis of the snack meal:",
-            "Okay, here's the encouraging analysis of the meal:",
-            "Okay, here's the encouraging analysis:",
-            "Here's the encouraging analysis of the breakfast meal:",
-            "Here's the encouraging analysis of the lunch meal:",
-            "Here's the encouraging analysis of the dinner meal:",
-            "Here's the encouraging analysis of the snack meal:",
-            "Here's the encouraging analysis of the meal:",
-            "Here's the encouraging analysis:",
-            "The encouraging analysis:",
-            "Encouraging analysis:"
-        ]
+        analysis_text = analysis_text.replace("```", "")
         
-        # Try multiple passes to catch nested prefixes
-        for _ in range(3):  # Maximum 3 passes to avoid infinite loops
-            original_text = analysis_text
-            for prefix in prefixes_to_remove:
-                if analysis_text.lower().startswith(prefix.lower()):
-                    analysis_text = analysis_text[len(prefix):].strip()
-                    break
-            # If no changes were made, break the loop
-            if analysis_text == original_text:
+        return self._build_analysis_response(analysis_text, estimated_calories, meal_type, response_text)
+
+    def _build_analysis_response(self, analysis_text: str, estimated_calories: Optional[int],
+                                 meal_type: str, response_text: str) -> MealAnalysisResponse:
+        """Wrap the analysis text in our schema after stripping introductory prefixes"""
+        analysis_text = analysis_text.strip()
+        
+        # Nested prefixes ("Okay, here's the analysis: Analysis: ...") are stripped up to 3 deep
+        for _ in range(3):
+            prefix = _RESPONSE_PREFIX.match(analysis_text)
+            if not prefix:
                 break
+            analysis_text = analysis_text[prefix.end():]
         
         # Generate a simple score based on response positivity (basic heuristic)
         score = 8 if any(word in analysis_text.lower() for word in ['fantastic', 'excellent', 'wonderful', 'perfect', 'amazing']) else 7
@@ -210,16 +277,17 @@ IMPORTANT: Provide ONLY the analysis text followed by the calorie estimate. Do n
             estimated_calories=None
         )
 
-    def generate_meal_inspiration(self, logged_meals: List[dict]) -> MealInspirationResponse:
-        """Generate personalized meal suggestions based on user's daily meals"""
+    def generate_meal_inspiration(self, logged_meals: List[dict],
+                                  on_suggestion: Optional[Callable[[str], None]] = None) -> MealInspirationResponse:
+        """Generate personalized meal suggestions based on user's daily meals
         
-        # Calculate total calories for logging
-        total_calories = 0
-        for meal in logged_meals:
-            calories = meal.get('calorieCount', 0) or (meal.get('analysis', {}).get('estimated_calories', 0) if meal.get('analysis') else 0)
-            total_calories += calories
+        on_suggestion is called with each suggested title as soon as it is parsed
+        (e.g. to prefetch its recipe) and must not block.
+        """
         
-        remaining_calories = max(0, 2500 - total_calories)
+        # Calculate total calories for logging
+        total_calories = sum(meal_calories(meal) for meal in logged_meals)
+        remaining_calories = max(0, DAILY_CALORIE_TARGET - total_calories)
         print(f"Recipe generation - Total calories consumed: {total_calories}, Remaining: {remaining_calories}")
         
         # Create prompt for meal inspiration
@@ -227,38 +295,20 @@ IMPORTANT: Provide ONLY the analysis text followed by the calorie estimate. Do n
         
         try:
             print(f"Recipe generation - Sending prompt to AI with {len(logged_meals)} meals")
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt, generation_config=self.inspiration_config)
             print(f"Recipe generation - AI response received, parsing JSON...")
             
-            # Parse the JSON response
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
+            payload = parse_model(response.text, MealInspirationPayload)
+            print(f"Recipe generation - Successfully parsed {len(payload.suggestions)} recipe suggestions")
             
-            data = json.loads(response_text)
-            print(f"Recipe generation - Successfully parsed {len(data.get('suggestions', []))} recipe suggestions")
-            
-            # Create MealInspiration objects with generated image URLs
-            suggestions = []
-            for suggestion in data.get('suggestions', []):
-                # Generate image for each suggestion
-                image_url = self._generate_meal_image(suggestion['title'])
-                
-                suggestions.append(MealInspiration(
-                    id=str(uuid.uuid4()),
-                    title=suggestion['title'],
-                    description=suggestion['description'],
-                    image_url=image_url,
-                    prep_time=suggestion['prep_time'],
-                    nutrition_highlights=suggestion['nutrition_highlights'],
-                    why_recommended=suggestion['why_recommended']
-                ))
+            # Create MealInspiration objects with images generated concurrently
+            suggestions = self._postprocess_suggestions(
+                [suggestion.model_dump() for suggestion in payload.suggestions], on_suggestion
+            )
             
             result = MealInspirationResponse(
-                daily_analysis=data.get('daily_analysis', 'Your nutrition choices today show great care for your body.'),
-                encouragement=data.get('encouragement', 'Keep up the wonderful work of nourishing yourself!'),
+                daily_analysis=payload.daily_analysis,
+                encouragement=payload.encouragement,
                 suggestions=suggestions
             )
             print(f"Recipe generation - Successfully created response with {len(suggestions)} suggestions")
@@ -268,47 +318,106 @@ IMPORTANT: Provide ONLY the analysis text followed by the calorie estimate. Do n
             print(f"Error generating meal inspiration: {str(e)}")
             return self._create_fallback_inspiration()
 
-    def generate_full_recipe(self, meal_title: str) -> FullRecipe:
-        """Generate a complete recipe for a specific meal"""
+    def stream_meal_inspiration(self, logged_meals: List[dict],
+                                on_suggestion: Optional[Callable[[str], None]] = None) -> Iterator[Tuple[str, Any]]:
+        """Stream meal inspiration as ("suggestion", MealInspiration) events as each one is parsed,
+        ending with ("result", MealInspirationResponse)"""
+        prompt = self._create_inspiration_prompt(logged_meals)
+        extractor = StreamingArrayExtractor('suggestions')
+        streamed: List[MealInspiration] = []
+        
+        try:
+            for chunk in self._generate(prompt, stream=True, generation_config=self.inspiration_config):
+                chunk_text = getattr(chunk, 'text', '') or ''
+                for raw_suggestion in extractor.feed(chunk_text):
+                    try:
+                        suggestion = self._postprocess_suggestions([raw_suggestion], on_suggestion)[0]
+                    except (KeyError, TypeError) as e:
+                        print(f"Skipping incomplete streamed suggestion: {e}")
+                        continue
+                    streamed.append(suggestion)
+                    yield "suggestion", suggestion
+            
+            try:
+                data = parse_json_tolerant(extractor.buffer)
+            except ValueError:
+                if not streamed:
+                    raise
+                data = {}
+            
+            yield "result", MealInspirationResponse(
+                daily_analysis=data.get('daily_analysis', 'Your nutrition choices today show great care for your body.'),
+                encouragement=data.get('encouragement', 'Keep up the wonderful work of nourishing yourself!'),
+                suggestions=streamed
+            )
+        
+        except Exception as e:
+            print(f"Error streaming meal inspiration: {str(e)}")
+            yield "error", str(e)
+            yield "result", self._create_fallback_inspiration()
+
+    def generate_full_recipe(self, meal_title: str, fallback_on_error: bool = True) -> FullRecipe:
+        """Generate a complete recipe for a specific meal (raises instead of falling back when fallback_on_error is False)"""
         
         print(f"Full recipe generation - Creating recipe for: {meal_title}")
         prompt = self._create_recipe_prompt(meal_title)
         
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Parse the JSON response
-            response_text = response.text.strip()
+            response = self._generate(prompt, generation_config=self.recipe_config)
+            response_text = response.text
             print(f"Raw recipe response: {response_text[:200]}...")  # Debug log
             
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3].strip()
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3].strip()
-            
-            data = json.loads(response_text)
-            print(f"Parsed recipe data: {data.get('title', 'No title')}")  # Debug log
-            
-            result = FullRecipe(
-                title=data['title'],
-                description=data['description'],
-                prep_time=data['prep_time'],
-                cook_time=data['cook_time'],
-                servings=data['servings'],
-                ingredients=data['ingredients'],
-                instructions=data['instructions'],
-                nutrition_notes=data['nutrition_notes'],
-                tips=data['tips'],
-                encouragement=data['encouragement']
-            )
+            result = parse_model(response_text, FullRecipe)
+            print(f"Parsed recipe data: {result.title}")  # Debug log
             print(f"Full recipe generation - Successfully created recipe for: {meal_title}")
             return result
             
         except Exception as e:
             print(f"Error generating recipe for '{meal_title}': {str(e)}")
             print(f"Response text: {response_text if 'response_text' in locals() else 'No response'}")
+            if not fallback_on_error:
+                raise
             return self._create_fallback_recipe(meal_title)
 
+    def _postprocess_suggestions(self, raw_suggestions: List[dict],
+                                 on_suggestion: Optional[Callable[[str], None]] = None) -> List[MealInspiration]:
+        """Generate suggestion images concurrently and assemble results in their original order
+        
+        All image generations share one deadline; any that miss it (or fail) get the
+        local SVG placeholder, so latency stays at roughly one image call instead of N.
+        """
+        futures = []
+        for suggestion in raw_suggestions:
+            futures.append(self.postprocess_executor.submit(self._generate_meal_image, suggestion['title']))
+            if on_suggestion:
+                try:
+                    on_suggestion(suggestion['title'])
+                except Exception as e:
+                    print(f"Suggestion hook failed for '{suggestion['title']}': {e}")
+        
+        wait(futures, timeout=self.image_timeout)
+        
+        suggestions = []
+        for suggestion, future in zip(raw_suggestions, futures):
+            if future.done() and future.exception() is None:
+                image_url = future.result()
+            else:
+                future.cancel()
+                print(f"Image for '{suggestion['title']}' missed the deadline or failed, using placeholder")
+                image_url = self._create_fallback_svg_image(suggestion['title'])
+            
+            suggestions.append(MealInspiration(
+                id=str(uuid.uuid4()),
+                title=suggestion['title'],
+                description=suggestion['description'],
+                image_url=image_url,
+                prep_time=suggestion['prep_time'],
+                nutrition_highlights=suggestion['nutrition_highlights'],
+                why_recommended=suggestion['why_recommended']
+            ))
+        
+        return suggestions
+
     def _generate_meal_image(self, meal_title: str) -> str:
         """Generate a meal image using Gemini 2.5 Flash Image Preview"""
         
@@ -325,324 +434,28 @@ IMPORTANT: Provide ONLY the analysis text followed by the calorie estimate. Do n
         
         try:
             # Return placeholder image URL since image generation is complex
-            return "https://via.placeholder.com/400x300/87C4BB/FFFFFF?text=Delicious+Meal"
+            return PLACEHOLDER_IMAGE_URL
             
         except Exception as e:
             print(f"Error generating meal image: {str(e)}")
-            return "https://via.placeholder.com/400x300/87C4BB/FFFFFF?text=Delicious+Meal"
+            return PLACEHOLDER_IMAGE_URL
 
     def _create_fallback_svg_image(self, meal_title: str) -> str:
-        """Create an attractive SVG image placeholder for meals"""
-        
-        # Enhanced mapping of meal types to food emojis
-        food_emojis = {
-            'salmon': '🐟', 'fish': '🐟', 'tuna': '🐟',
-            'chicken': '🍗', 'turkey': '🍗', 'poultry': '🍗',
-            'beef': '🥩', 'steak': '🥩', 'meat': '🥩',
-            'quinoa': '🌾', 'grain': '🌾', 'rice': '🍚',
-            'bowl': '🥗', 'salad': '🥗', 'greens': '🥬',
-            'soup': '🍲', 'stew': '🍲', 'broth': '🍲',
-            'pasta': '🍝', 'noodle': '🍜', 'spaghetti': '🍝',
-            'oats': '🥣', 'oatmeal': '🥣', 'porridge': '🥣',
-            'smoothie': '🥤', 'shake': '🥤', 'drink': '🥤',
-            'avocado': '🥑', 'toast': '🍞', 'bread': '🍞',
-            'eggs': '🥚', 'egg': '🥚', 'omelet': '🥚',
-            'vegetables': '🥬', 'veggie': '🥬', 'greens': '🥬',
-            'fruit': '🍓', 'berry': '🍓', 'apple': '🍎',
-            'nuts': '🥜', 'almond': '🥜', 'walnut': '🥜',
-            'yogurt': '🥛', 'dairy': '🥛', 'milk': '🥛',
-            'sweet potato': '🍠', 'potato': '🥔',
-            'pancake': '🥞', 'waffle': '🧇'
-        }
-        
-        # Find matching emoji based on meal title
-        title_lower = meal_title.lower()
-        emoji = '🍽️'  # Default plate emoji
-        
-        for keyword, food_emoji in food_emojis.items():
-            if keyword in title_lower:
-                emoji = food_emoji
-                break
-        
-        # Create a more sophisticated SVG with better styling
-        svg_content = f'''
-    <svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
-        <defs>
-            <linearGradient id="bgGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-                <stop offset="0%" style="stop-color:#F0F8F7;stop-opacity:1" />
-                <stop offset="50%" style="stop-color:#FFF5F3;stop-opacity:1" />
-                <stop offset="100%" style="stop-color:#F5F0FF;stop-opacity:1" />
-            </linearGradient>
-            <linearGradient id="borderGrad" x1="0%" y1="0%" x2="100%" y2="100%">
-                <stop offset="0%" style="stop-color:#87C4BB;stop-opacity:0.4" />
-                <stop offset="100%" style="stop-color:#C1A7E1;stop-opacity:0.4" />
-            </linearGradient>
-            <filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">
-                <feDropShadow dx="0" dy="2" stdDeviation="4" flood-color="#87C4BB" flood-opacity="0.1"/>
-            </filter>
-        </defs>
-        <rect width="300" height="200" fill="url(#bgGrad)" stroke="url(#borderGrad)" stroke-width="2" rx="16" filter="url(#shadow)"/>
-        <circle cx="150" cy="75" r="35" fill="#87C4BB" fill-opacity="0.1"/>
-        <text x="150" y="85" font-family="system-ui, -apple-system, sans-serif" font-size="42" text-anchor="middle" fill="#333">{emoji}</text>
-        <text x="150" y="130" font-family="system-ui, -apple-system, sans-serif" font-size="16" text-anchor="middle" fill="#333" font-weight="600">{meal_title[:28]}</text>
-        <text x="150" y="150" font-family="system-ui, -apple-system, sans-serif" font-size="13" text-anchor="middle" fill="#87C4BB" font-weight="500">Nourishing Choice</text>
-        <circle cx="50" cy="170" r="3" fill="#FFB4A2" fill-opacity="0.6"/>
-        <circle cx="250" cy="30" r="2" fill="#C1A7E1" fill-opacity="0.6"/>
-        <circle cx="270" cy="170" r="2.5" fill="#87C4BB" fill-opacity="0.6"/>
-    </svg>
-    '''
-        
-        # Convert SVG to data URL
-        svg_base64 = base64.b64encode(svg_content.encode('utf-8')).decode('utf-8')
-        return f"data:image/svg+xml;base64,{svg_base64}"
+        """Create an attractive SVG image placeholder for meals (cached per title)"""
+        return fallback_svg_image(meal_title)
 
     def _create_inspiration_prompt(self, logged_meals: List[dict]) -> str:
         """Create prompt for generating meal inspiration based on daily meals with calorie consideration"""
-        
-        meals_summary = ""
-        total_calories = 0
-        
-        if logged_meals:
-            meal_details = []
-            for meal in logged_meals:
-                analysis = meal.get('analysis', {})
-                # Get calories from calorieCount field (frontend) or analysis.estimated_calories (fallback)
-                calories = meal.get('calorieCount', 0) or (analysis.get('estimated_calories', 0) if analysis else 0)
-                if calories:
-                    total_calories += calories
-                
-                meal_info = f"- {meal.get('meal_type', 'Unknown')}: {analysis.get('overall_assessment', 'No analysis available yet') if analysis else 'Analysis pending'}"
-                if calories:
-                    meal_info += f" (Estimated: {calories} calories)"
-                meal_details.append(meal_info)
-            
-            meals_summary = "\n".join(meal_details)
-        else:
-            meals_summary = "No meals logged yet today"
-        
-        remaining_calories = max(0, 2500 - total_calories)
-        calorie_guidance = ""
-        
-        if remaining_calories > 1500:
-            calorie_guidance = "Focus on substantial, nourishing meals that provide excellent energy density to support optimal daily nourishment."
-        elif remaining_calories > 800:
-            calorie_guidance = "Suggest satisfying meals that help reach optimal nourishment and energy levels."
-        elif remaining_calories > 300:
-            calorie_guidance = "Recommend lighter but still nourishing options that complement today's eating."
-        else:
-            calorie_guidance = "Daily nourishment goals are well met! Suggest gentle, satisfying options if additional fuel is desired."
-        
-        return f"""
-You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Based on the AI nutritional analysis of the user's meals logged today, suggest 3 personalized meal ideas that would complement their nutrition and support their recovery journey.
-
-Today's meal analyses (from AI nutritional assessment):
-{meals_summary}
-
-Total calories consumed today: {total_calories}
-{calorie_guidance}
-
-Based on these detailed nutritional analyses, suggest meals that would:
-- Complement the nutritional profile already established
-- Fill any gaps identified in the analyses
-- Build upon the positive aspects noted
-- Provide variety while maintaining nutritional excellence
-- Support continued metabolic and hormonal health recovery
-- Help reach optimal daily nourishment in a gentle, encouraging way
-
-Return your response as valid JSON with this exact structure:
-{{
-    "daily_analysis": "Brief analysis of their current nutrition (2-3 sentences)",
-    "encouragement": "Warm, encouraging message about their food choices (1-2 sentences)",
-    "suggestions": [
-        {{
-            "title": "Meal Name",
-            "description": "Brief appetizing description (1 sentence)",
-            "prep_time": "X minutes",
-            "nutrition_highlights": "Key nutritional benefits (1-2 sentences)",
-            "why_recommended": "Why this complements their day (1-2 sentences)"
-        }},
-        {{
-            "title": "Meal Name 2",
-            "description": "Brief appetizing description (1 sentence)",
-            "prep_time": "X minutes", 
-            "nutrition_highlights": "Key nutritional benefits (1-2 sentences)",
-            "why_recommended": "Why this complements their day (1-2 sentences)"
-        }},
-        {{
-            "title": "Meal Name 3",
-            "description": "Brief appetizing description (1 sentence)",
-            "prep_time": "X minutes",
-            "nutrition_highlights": "Key nutritional benefits (1-2 sentences)", 
-            "why_recommended": "Why this complements their day (1-2 sentences)"
-        }}
-    ]
-}}
-
-Focus on recovery-friendly meals that are:
-- Appropriately nourishing for remaining daily needs
-- Rich in healthy fats for hormone production (from diverse sources like nuts, seeds, olive oil, coconut, eggs, etc.)
-- Include quality protein (vary between chicken, turkey, beef, pork, eggs, beans, lentils, tofu, etc.)
-- Complex carbohydrates (explore rice, pasta, potatoes, oats, barley, etc.)
-- Contain micronutrients for metabolic health
-- Appealing and not restrictive
-- Sized appropriately to help reach optimal daily nourishment without being overwhelming
-
-IMPORTANT: 
-1. Provide diverse, creative meal suggestions. Avoid repeatedly suggesting the same ingredients like salmon, quinoa, or avocado. Explore different cuisines, cooking methods, and ingredient combinations to keep suggestions fresh and exciting.
-2. Consider the remaining energy needs when suggesting portion sizes and meal types - substantial meals when more nourishment is needed, lighter options when less is needed.
-3. NEVER mention specific calorie numbers, calorie goals, calorie targets, or any numeric calorie values in user-facing content. Always frame recommendations positively around nourishment and energy.
-4. Use gentle, non-triggering language focused on wellness, nourishment, and energy rather than numbers or targets.
-"""
+        return build_inspiration_prompt(logged_meals)
 
     def _create_recipe_prompt(self, meal_title: str) -> str:
         """Create prompt for generating a full recipe"""
-        
-        return f"""
-You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Create a complete, detailed recipe for "{meal_title}" that supports recovery and is delicious.
-
-The recipe should be:
-- Nourishing and energy-adequate
-- Rich in nutrients that support metabolic and hormonal health
-- Easy to follow with clear instructions
-- Include helpful tips for success
-- Encouraging and positive in tone
-
-Return your response as valid JSON with this exact structure:
-{{
-    "title": "{meal_title}",
-    "description": "Appetizing description of the dish (2-3 sentences)",
-    "prep_time": "X minutes",
-    "cook_time": "X minutes",
-    "servings": 2,
-    "ingredients": [
-        "Ingredient 1 with amount",
-        "Ingredient 2 with amount",
-        "etc."
-    ],
-    "instructions": [
-        "Step 1 instruction",
-        "Step 2 instruction", 
-        "etc."
-    ],
-    "nutrition_notes": "Key nutritional benefits and why this supports recovery (2-3 sentences)",
-    "tips": [
-        "Helpful tip 1",
-        "Helpful tip 2",
-        "etc."
-    ],
-    "encouragement": "Encouraging message about making this recipe (1-2 sentences)"
-}}
-
-Focus on creating a recipe that is:
-- Energy-dense and satisfying
-- Rich in healthy fats, quality protein, and complex carbohydrates
-- Contains micronutrients that support hormonal and metabolic health
-- Realistic to make at home
-- Delicious and appealing
-
-IMPORTANT: Never mention specific calorie numbers or calorie targets in the recipe content. Focus on nourishment and energy language instead.
-"""
+        return build_recipe_prompt(meal_title)
 
     def _create_fallback_inspiration(self) -> MealInspirationResponse:
-        """Create fallback meal inspiration when API fails"""
-        
-        # Diverse fallback suggestions to avoid repetitive salmon/quinoa
-        import random
-        
-        all_suggestions = [
-            MealInspiration(
-                id=str(uuid.uuid4()),
-                title="Mediterranean Chickpea Pasta",
-                description="Hearty pasta with chickpeas, olives, tomatoes, and fresh herbs.",
-                image_url=self._generate_meal_image("Mediterranean Chickpea Pasta"),
-                prep_time="20 minutes",
-                nutrition_highlights="Plant-based protein from chickpeas and complex carbs for sustained energy.",
-                why_recommended="A satisfying meal that provides both protein and carbohydrates for recovery."
-            ),
-            MealInspiration(
-                id=str(uuid.uuid4()),
-                title="Loaded Sweet Potato Toast",
-                description="Thick sweet potato slices topped with avocado, eggs, and seeds.",
-                image_url=self._generate_meal_image("Loaded Sweet Potato Toast"),
-                prep_time="15 minutes",
-                nutrition_highlights="Healthy fats from avocado and complete protein from eggs support hormone production.",
-                why_recommended="Perfect balance of nutrients in a delicious, Instagram-worthy format."
-            ),
-            MealInspiration(
-                id=str(uuid.uuid4()),
-                title="Thai Coconut Curry Bowl",
-                description="Creamy coconut curry with vegetables and jasmine rice.",
-                image_url=self._generate_meal_image("Thai Coconut Curry Bowl"),
-                prep_time="25 minutes",
-                nutrition_highlights="Coconut provides healthy saturated fats while spices boost metabolism.",
-                why_recommended="Warming spices and rich coconut milk make this both nourishing and comforting."
-            ),
-            MealInspiration(
-                id=str(uuid.uuid4()),
-                title="Breakfast Burrito Bowl",
-                description="Scrambled eggs with black beans, cheese, and fresh salsa.",
-                image_url=self._generate_meal_image("Breakfast Burrito Bowl"),
-                prep_time="12 minutes",
-                nutrition_highlights="High-protein combination supports muscle recovery and stable blood sugar.",
-                why_recommended="A hearty breakfast that keeps you satisfied and energized all morning."
-            ),
-            MealInspiration(
-                id=str(uuid.uuid4()),
-                title="Mushroom Risotto",
-                description="Creamy arborio rice with mixed mushrooms and parmesan.",
-                image_url=self._generate_meal_image("Mushroom Risotto"),
-                prep_time="30 minutes",
-                nutrition_highlights="Complex carbs from rice and B-vitamins from mushrooms support energy production.",
-                why_recommended="A comforting, calorie-dense meal perfect for evening nourishment."
-            ),
-            MealInspiration(
-                id=str(uuid.uuid4()),
-                title="Peanut Butter Banana Pancakes",
-                description="Fluffy pancakes with natural peanut butter and sliced banana.",
-                image_url=self._generate_meal_image("Peanut Butter Banana Pancakes"),
-                prep_time="18 minutes",
-                nutrition_highlights="Healthy fats from peanut butter and natural sugars provide quick energy.",
-                why_recommended="A delicious way to start the day with adequate calories and satisfaction."
-            )
-        ]
-        
-        # Select 3 random suggestions to provide variety
-        suggestions = random.sample(all_suggestions, 3)
-        
-        return MealInspirationResponse(
-            suggestions=suggestions,
-            daily_analysis="Your meal choices show great intention toward nourishing your body.",
-            encouragement="Keep up the wonderful work of fueling yourself with care and intention!"
-        )
+        """Prebuilt fallback meal inspiration for when the API fails (shared instance; don't mutate)"""
+        return fallback_inspiration()
 
     def _create_fallback_recipe(self, meal_title: str) -> FullRecipe:
         """Create fallback recipe when API fails"""
-        
-        return FullRecipe(
-            title=meal_title,
-            description="A nourishing and delicious meal that supports your recovery journey.",
-            prep_time="15 minutes",
-            cook_time="20 minutes", 
-            servings=2,
-            ingredients=[
-                "2 cups main ingredient",
-                "1 tbsp healthy oil",
-                "1/2 cup vegetables",
-                "Herbs and spices to taste",
-                "Optional protein source"
-            ],
-            instructions=[
-                "Prepare all ingredients",
-                "Heat oil in a pan",
-                "Cook main ingredients until tender",
-                "Season with herbs and spices",
-                "Serve warm and enjoy mindfully"
-            ],
-            nutrition_notes="This meal provides balanced nutrition to support your body's healing and energy needs.",
-            tips=[
-                "Feel free to customize with your favorite vegetables",
-                "Add extra healthy fats like avocado or nuts",
-                "Listen to your body's hunger and fullness cues"
-            ],
-            encouragement="You're taking such good care of yourself by preparing nourishing meals!"
-        )
+        return fallback_recipe(meal_title)
@@ -0,0 +1,255 @@
+# Intraday HRV ingestion: raw RR intervals in, daily RMSSD/mean/percentiles out
+# Uploads are split into packed float32 blocks (no row per beat) and folded
+# into a per-day running aggregate as they arrive:
+#   - sums and sums of squares of accepted intervals -> mean, SDNN
+#   - sum of squared successive differences -> RMSSD
+#   - a 1 ms histogram of accepted intervals -> percentiles
+# so each write costs O(samples in the upload), not O(samples that day).
+# Blocks that arrive out of order trigger a replay of the day's blocks.
+
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.core.metric_rollups import TrackingValues, apply_tracking_change
+from app.core.tracking_sync import get_or_create_tracking
+from app.models.hrv_sample import HRVSampleBlock, HRVDailyStats
+
+# Physiologically plausible RR interval range (ms); anything else is treated as an artifact
+RR_MIN_MS = int(os.getenv("HRV_RR_MIN_MS", 300))
+RR_MAX_MS = int(os.getenv("HRV_RR_MAX_MS", 2000))
+# Consecutive blocks closer than this are treated as one continuous recording
+MAX_GAP_SECONDS = float(os.getenv("HRV_MAX_GAP_SECONDS", 5))
+BLOCK_MAX_SAMPLES = int(os.getenv("HRV_BLOCK_MAX_SAMPLES", 4096))
+# Successive differences needed before the day's RMSSD is written to DailyTracking
+MIN_INTERVALS_FOR_DAILY = int(os.getenv("HRV_MIN_INTERVALS_FOR_DAILY", 30))
+MAX_UPLOAD_SAMPLES = int(os.getenv("HRV_MAX_UPLOAD_SAMPLES", 50000))
+
+PERCENTILES = (10, 50, 90)
+_BINS = RR_MAX_MS - RR_MIN_MS
+
+_stats_table = HRVDailyStats.__table__
+
+
+def pack_intervals(rr_intervals: np.ndarray) -> bytes:
+    return np.ascontiguousarray(rr_intervals, dtype="<f4").tobytes()
+
+
+def unpack_intervals(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f4")
+
+
+@dataclass
+class DailyAccumulator:
+    """In-memory form of an HRVDailyStats row's running state"""
+    sample_count: int = 0
+    rejected_count: int = 0
+    rr_sum: float = 0.0
+    rr_sum_sq: float = 0.0
+    diff_count: int = 0
+    diff_sum_sq: float = 0.0
+    last_rr: Optional[float] = None
+    last_time: Optional[datetime] = None
+    histogram: np.ndarray = field(default_factory=lambda: np.zeros(_BINS, dtype=np.uint32))
+
+    @classmethod
+    def from_row(cls, stats: HRVDailyStats) -> "DailyAccumulator":
+        histogram = np.zeros(_BINS, dtype=np.uint32)
+        if stats.histogram:
+            # Copy: frombuffer views are read-only
+            histogram = np.frombuffer(stats.histogram, dtype="<u4").astype(np.uint32)
+        return cls(
+            sample_count=stats.sample_count or 0,
+            rejected_count=stats.rejected_count or 0,
+            rr_sum=stats.rr_sum or 0.0,
+            rr_sum_sq=stats.rr_sum_sq or 0.0,
+            diff_count=stats.diff_count or 0,
+            diff_sum_sq=stats.diff_sum_sq or 0.0,
+            last_rr=stats.last_rr,
+            last_time=stats.last_time,
+            histogram=histogram,
+        )
+
+    @property
+    def compatible(self) -> bool:
+        """False when the histogram was built with a different RR range setting"""
+        return self.histogram.size == _BINS
+
+    def add_block(self, start_time: datetime, rr_intervals: np.ndarray, end_time: datetime):
+        """Fold one block, which must not start before the previous block ended"""
+        rr = rr_intervals.astype(np.float64)
+        accepted = accepted_intervals(rr)
+        values = rr[accepted]
+
+        self.sample_count += int(values.size)
+        self.rejected_count += int(rr.size - values.size)
+        self.rr_sum += float(values.sum())
+        self.rr_sum_sq += float(np.dot(values, values))
+        self.histogram += np.bincount(
+            (values - RR_MIN_MS).astype(np.int64), minlength=_BINS
+        ).astype(np.uint32)
+
+        # Successive differences only between adjacent beats that were both accepted
+        adjacent = accepted[1:] & accepted[:-1]
+        diffs = np.diff(rr)[adjacent]
+        self.diff_count += int(diffs.size)
+        self.diff_sum_sq += float(np.dot(diffs, diffs))
+
+        # Bridge to the previous block if this one continues the same recording
+        continues = (
+            self.last_rr is not None and self.last_time is not None and rr.size and accepted[0]
+            and timedelta(0) <= start_time - self.last_time <= timedelta(seconds=MAX_GAP_SECONDS)
+        )
+        if continues:
+            self.diff_count += 1
+            self.diff_sum_sq += (rr[0] - self.last_rr) ** 2
+
+        self.last_rr = float(rr[-1]) if rr.size and accepted[-1] else None
+        self.last_time = end_time
+
+    def percentile(self, q: float) -> Optional[float]:
+        if self.sample_count == 0:
+            return None
+        cumulative = np.cumsum(self.histogram, dtype=np.int64)
+        index = int(np.searchsorted(cumulative, max(1, math.ceil(q / 100 * cumulative[-1]))))
+        return RR_MIN_MS + min(index, _BINS - 1) + 0.5
+
+    def metrics(self) -> Dict[str, Optional[float]]:
+        mean = self.rr_sum / self.sample_count if self.sample_count else None
+        variance = max(0.0, self.rr_sum_sq / self.sample_count - mean * mean) if mean is not None else None
+        return {
+            "rmssd": math.sqrt(self.diff_sum_sq / self.diff_count) if self.diff_count else None,
+            "mean_rr": mean,
+            "sdnn": math.sqrt(variance) if variance is not None else None,
+            **{f"p{q}_rr": self.percentile(q) for q in PERCENTILES},
+        }
+
+    def store(self, stats: HRVDailyStats):
+        stats.sample_count = self.sample_count
+        stats.rejected_count = self.rejected_count
+        stats.rr_sum = self.rr_sum
+        stats.rr_sum_sq = self.rr_sum_sq
+        stats.diff_count = self.diff_count
+        stats.diff_sum_sq = self.diff_sum_sq
+        stats.last_rr = self.last_rr
+        stats.last_time = self.last_time
+        stats.histogram = self.histogram.astype("<u4").tobytes()
+        for name, value in self.metrics().items():
+            setattr(stats, name, value)
+
+
+def accepted_intervals(rr: np.ndarray) -> np.ndarray:
+    """Mask of plausible intervals; NaN, negative and out-of-range values are artifacts"""
+    with np.errstate(invalid="ignore"):
+        return (rr >= RR_MIN_MS) & (rr < RR_MAX_MS)
+
+
+def _split_blocks(user_id: str, start_time: datetime, rr_intervals: np.ndarray) -> List[HRVSampleBlock]:
+    """Chunk an upload into blocks, each timestamped from the cumulative sum of accepted intervals"""
+    # Offsets of each beat from start_time; float64 so long recordings don't drift. Artifacts
+    # (NaN, negative, absurdly large) add no time, so they can't overflow or reverse timestamps
+    durations = np.where(accepted_intervals(rr_intervals), rr_intervals.astype(np.float64), 0.0)
+    offsets_ms = np.concatenate(([0.0], np.cumsum(durations)))
+    blocks = []
+    for first in range(0, rr_intervals.size, BLOCK_MAX_SAMPLES):
+        last = min(first + BLOCK_MAX_SAMPLES, rr_intervals.size)
+        block_start = start_time + timedelta(milliseconds=float(offsets_ms[first]))
+        blocks.append(HRVSampleBlock(
+            user_id=user_id,
+            sample_date=block_start.date(),
+            start_time=block_start,
+            end_time=start_time + timedelta(milliseconds=float(offsets_ms[last])),
+            sample_count=last - first,
+            rr_intervals=pack_intervals(rr_intervals[first:last]),
+        ))
+    return blocks
+
+
+def _locked_stats(db: Session, user_id: str, sample_date: date) -> HRVDailyStats:
+    """The day's stats row, created if needed and locked for update where supported"""
+    db.execute(
+        dialect_insert(db.get_bind().dialect.name, _stats_table)
+        .values(user_id=user_id, sample_date=sample_date)
+        .on_conflict_do_nothing(index_elements=["user_id", "sample_date"])
+    )
+    return db.query(HRVDailyStats).filter(and_(
+        HRVDailyStats.user_id == user_id,
+        HRVDailyStats.sample_date == sample_date
+    )).with_for_update().populate_existing().one()
+
+
+def _replay_day(db: Session, user_id: str, sample_date: date, pending: Sequence[HRVSampleBlock]) -> DailyAccumulator:
+    """Rebuild a day's aggregate from every stored block in time order"""
+    stored = db.query(HRVSampleBlock).filter(and_(
+        HRVSampleBlock.user_id == user_id,
+        HRVSampleBlock.sample_date == sample_date
+    )).all()
+    accumulator = DailyAccumulator()
+    for block in sorted([*stored, *pending], key=lambda b: (b.start_time, b.end_time)):
+        accumulator.add_block(block.start_time, unpack_intervals(block.rr_intervals), block.end_time)
+    return accumulator
+
+
+def ingest_samples(db: Session, user_id: str, start_time: datetime,
+                   rr_intervals: Sequence[float]) -> List[HRVDailyStats]:
+    """
+    Store an upload of RR intervals (ms) starting at start_time and update the
+    daily aggregates and DailyTracking.heart_rate_variability for every day it
+    touches. Returns the updated stats rows; the caller commits.
+    """
+    # Keep the client's wall-clock time so sample_date is their local day
+    start_time = start_time.replace(tzinfo=None)
+    with np.errstate(over="ignore"):  # Huge values become inf and are rejected as artifacts
+        rr = np.asarray(rr_intervals, dtype=np.float32)
+    blocks = _split_blocks(user_id, start_time, rr)
+
+    by_day: Dict[date, List[HRVSampleBlock]] = {}
+    for block in blocks:
+        by_day.setdefault(block.sample_date, []).append(block)
+
+    updated = []
+    with db.no_autoflush:
+        for sample_date, day_blocks in sorted(by_day.items()):
+            stats = _locked_stats(db, user_id, sample_date)
+            accumulator = DailyAccumulator.from_row(stats)
+            in_order = accumulator.compatible and (
+                accumulator.last_time is None or day_blocks[0].start_time >= accumulator.last_time
+            )
+            if in_order:
+                for block in day_blocks:
+                    accumulator.add_block(block.start_time, unpack_intervals(block.rr_intervals), block.end_time)
+            else:
+                accumulator = _replay_day(db, user_id, sample_date, day_blocks)
+            accumulator.store(stats)
+            db.add_all(day_blocks)
+            _sync_daily_hrv(db, user_id, stats)
+            updated.append(stats)
+    return updated
+
+
+def _sync_daily_hrv(db: Session, user_id: str, stats: HRVDailyStats):
+    """Mirror the day's RMSSD onto the tracking row once there are enough beats"""
+    if stats.rmssd is None or stats.diff_count < MIN_INTERVALS_FOR_DAILY:
+        return
+    entry = get_or_create_tracking(db, user_id, stats.sample_date)
+    before = TrackingValues.of(entry)
+    entry.heart_rate_variability = round(stats.rmssd, 1)
+    apply_tracking_change(db, user_id, before, TrackingValues.of(entry))
+
+
+def load_day_samples(db: Session, user_id: str, sample_date: date) -> np.ndarray:
+    """All of a day's RR intervals in time order, as one float32 array"""
+    blocks = db.query(HRVSampleBlock.rr_intervals).filter(and_(
+        HRVSampleBlock.user_id == user_id,
+        HRVSampleBlock.sample_date == sample_date
+    )).order_by(HRVSampleBlock.start_time, HRVSampleBlock.id).all()
+    if not blocks:
+        return np.empty(0, dtype=np.float32)
+    return np.concatenate([unpack_intervals(block.rr_intervals) for block in blocks])
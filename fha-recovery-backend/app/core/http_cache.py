@@ -0,0 +1,50 @@
+# Conditional GETs for read-mostly endpoints
+# Routes compute a weak ETag from the `revision` tokens of the rows they would
+# return (a narrow query), and answer 304 Not Modified before loading and
+# serializing the full response when the client already has that version.
+
+import hashlib
+import os
+from typing import Optional
+
+from fastapi import Request, Response
+
+# Browsers may keep the response but must revalidate it with the ETag on every use
+CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+
+def weak_etag(*parts: object) -> str:
+    """W/"<hash>" over the given parts (revisions, filters, ...)"""
+    digest = hashlib.blake2b(digest_size=12)
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            for item in part:
+                digest.update(str(item).encode())
+                digest.update(b",")
+        else:
+            digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires (shared by every conditional GET)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set ETag and Cache-Control on the route's response; returns a 304 response
+    to send instead if the client's copy is current, otherwise None.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
@@ -0,0 +1,117 @@
+# Meal photo preprocessing before Gemini analysis
+# Validates uploads, applies EXIF orientation, downsamples, strips metadata
+# and re-encodes to JPEG so phone photos don't go over the wire unchanged
+
+import asyncio
+import base64
+import binascii
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.perceptual_hash import ImageFingerprint, fingerprint
+
+MAX_DIMENSION = int(os.getenv("MEAL_IMAGE_MAX_DIMENSION", 1024))
+JPEG_QUALITY = int(os.getenv("MEAL_IMAGE_JPEG_QUALITY", 85))
+MAX_UPLOAD_BYTES = int(float(os.getenv("MEAL_IMAGE_MAX_UPLOAD_MB", 15)) * 1024 * 1024)
+MAX_PIXELS = 50_000_000  # Reject decompression bombs before decoding
+ALLOWED_FORMATS = {"JPEG", "MPO", "PNG", "WEBP", "GIF", "BMP", "HEIF"}
+
+# Image decoding/resizing runs here so request handlers never block on Pillow
+_pipeline_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MEAL_IMAGE_WORKERS", 2)),
+    thread_name_prefix="meal-image"
+)
+
+
+class ImageValidationError(ValueError):
+    """Raised when an uploaded meal photo can't be used"""
+
+
+@dataclass
+class PreparedImage:
+    data: bytes  # Re-encoded JPEG bytes sent to Gemini
+    mime_type: str
+    width: int
+    height: int
+    original_size: int  # Bytes uploaded by the client
+    fingerprint: ImageFingerprint  # Perceptual hashes of the processed image
+
+    @property
+    def phash(self) -> str:
+        return self.fingerprint.key
+
+
+def has_image(image_base64: Optional[str]) -> bool:
+    """True when the client actually sent a photo"""
+    return bool(image_base64 and image_base64.strip() and image_base64 != "null")
+
+
+def decode_image_base64(image_base64: str) -> bytes:
+    """Decode a base64 upload, accepting an optional data URL prefix"""
+    if image_base64.startswith('data:'):
+        image_base64 = image_base64.split(',', 1)[-1]
+    try:
+        raw = base64.b64decode(image_base64, validate=False)
+    except (binascii.Error, ValueError) as e:
+        raise ImageValidationError(f"Image is not valid base64: {e}")
+    if not raw:
+        raise ImageValidationError("Image is empty")
+    if len(raw) > MAX_UPLOAD_BYTES:
+        raise ImageValidationError(f"Image is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    return raw
+
+
+def prepare_meal_image(image_base64: str) -> PreparedImage:
+    """Validate, orient, downsample, strip metadata and re-encode a meal photo"""
+    raw = decode_image_base64(image_base64)
+
+    try:
+        with Image.open(BytesIO(raw)) as probe:
+            image_format = probe.format
+            if probe.width * probe.height > MAX_PIXELS:
+                raise ImageValidationError("Image dimensions are too large")
+            probe.verify()
+    except ImageValidationError:
+        raise
+    except (UnidentifiedImageError, OSError, SyntaxError) as e:
+        raise ImageValidationError(f"Unreadable image: {e}")
+
+    if image_format not in ALLOWED_FORMATS:
+        raise ImageValidationError(f"Unsupported image format: {image_format}")
+
+    # verify() leaves the file unusable, so decode again for processing
+    with Image.open(BytesIO(raw)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+
+        # Saving without exif/icc arguments drops all metadata
+        output = BytesIO()
+        image.save(output, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+
+        return PreparedImage(
+            data=output.getvalue(),
+            mime_type="image/jpeg",
+            width=image.width,
+            height=image.height,
+            original_size=len(raw),
+            fingerprint=fingerprint(image),
+        )
+
+
+async def prepare_meal_image_async(image_base64: str) -> PreparedImage:
+    """Run prepare_meal_image in the image worker pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pipeline_executor, prepare_meal_image, image_base64)
@@ -0,0 +1,166 @@
+# Incremental JSON helpers for streamed Gemini output
+# Lets callers act on each complete array element before the full response arrives
+
+import json
+from typing import List, Optional
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a leading ```json / ``` fence and a trailing ``` fence if present"""
+    text = text.strip()
+    if text.startswith('```'):
+        newline = text.find('\n')
+        text = text[newline + 1:] if newline != -1 else text[3:]
+        if text.lstrip().lower().startswith('json'):
+            text = text.lstrip()[4:]
+    if text.rstrip().endswith('```'):
+        text = text.rstrip()[:-3]
+    return text.strip()
+
+
+class StreamingArrayExtractor:
+    """
+    Pulls complete objects out of a JSON array as text streams in.
+
+    Feed chunks of a response like {"daily_analysis": ..., "suggestions": [{...}, {...}]}
+    and each call to feed() returns the objects of the named array that have
+    been fully received since the previous call.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.buffer = ""
+        self._array_start: Optional[int] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object_start: Optional[int] = None
+        self._finished = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        self.buffer += chunk
+        if self._finished:
+            return []
+        if self._array_start is None:
+            self._array_start = self._find_array_start()
+            if self._array_start is None:
+                return []
+            self._pos = self._array_start + 1
+        return self._scan()
+
+    def _find_array_start(self) -> Optional[int]:
+        key_at = self.buffer.find(f'"{self.array_key}"')
+        if key_at == -1:
+            return None
+        bracket = self.buffer.find('[', key_at)
+        return bracket if bracket != -1 else None
+
+    def _scan(self) -> List[dict]:
+        completed = []
+        text = self.buffer
+        while self._pos < len(text):
+            char = text[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0 and char == '{':
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0 and char == ']':
+                    self._finished = True
+                    self._pos += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    try:
+                        completed.append(json.loads(text[self._object_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._object_start = None
+            self._pos += 1
+        return completed
+
+
+def _close_brackets(stack: List[str]) -> str:
+    return ''.join('}' if opener == '{' else ']' for opener in reversed(stack))
+
+
+def repair_truncated_json(text: str, max_attempts: int = 50):
+    """
+    Best-effort parse of JSON that was cut off mid-stream.
+
+    Closes an unterminated string and any open objects/arrays; if that still
+    doesn't parse (e.g. a dangling key), backs off to the last complete
+    element before each earlier comma. Raises ValueError when nothing parses.
+    """
+    stack: List[str] = []
+    commas = []  # (position, open brackets at that position)
+    in_string = False
+    escaped = False
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append(char)
+        elif char in '}]':
+            if stack:
+                stack.pop()
+        elif char == ',':
+            commas.append((position, list(stack)))
+
+    candidates = []
+    tail = text[:-1] if escaped else text
+    candidates.append(tail + ('"' if in_string else '') + _close_brackets(stack))
+    for position, open_brackets in reversed(commas[-max_attempts:]):
+        candidates.append(text[:position] + _close_brackets(open_brackets))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Could not repair truncated JSON")
+
+
+def parse_json_tolerant(text: str):
+    """Parse model output that may be fenced, wrapped in prose, or truncated"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    text = strip_code_fences(text)
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object found in response")
+    text = text[min(starts):]
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    # Drop trailing prose after the last closing bracket before attempting repair
+    last_close = max(text.rfind('}'), text.rfind(']'))
+    if last_close != -1:
+        try:
+            return json.loads(text[:last_close + 1])
+        except json.JSONDecodeError:
+            pass
+    return repair_truncated_json(text)
@@ -0,0 +1,200 @@
+# Pluggable text-generation backends for GeminiClient
+# "gemini" talks to the real API; "stub" is a deterministic local stand-in with
+# configurable latency and error rate so the AI routes can run and be
+# load-tested offline without an API key or quota
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator, List, Optional, Tuple
+
+import google.generativeai as genai
+
+
+class LLMBackend(ABC):
+    """
+    Minimal interface GeminiClient depends on. Mirrors
+    GenerativeModel.generate_content: returns an object with `.text`, or an
+    iterator of such chunks when stream=True.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def generate_content(self, contents, stream: bool = False, generation_config=None):
+        ...
+
+
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+
+        from google import genai as google_genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name or os.getenv("GEMINI_MODEL", "gemini-2.0-flash"))
+        self.genai_client = google_genai.Client(api_key=api_key)
+
+    def generate_content(self, contents, stream: bool = False, generation_config=None):
+        return self.model.generate_content(contents, stream=stream, generation_config=generation_config)
+
+
+class StubUnavailableError(ConnectionError):
+    """Injected failure from the stub backend (treated as retryable)"""
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+_STUB_SUGGESTIONS = [
+    ("Miso Glazed Chicken Rice Bowl", "Sticky miso chicken over jasmine rice with sesame greens", "25 minutes"),
+    ("Creamy Tuscan White Bean Pasta", "Orecchiette tossed with cannellini beans, sun-dried tomatoes and parmesan", "20 minutes"),
+    ("Peanut Butter Banana Overnight Oats", "Oats soaked in whole milk with peanut butter, banana and chia", "10 minutes"),
+    ("Beef and Sweet Potato Hash", "Crispy sweet potato cubes with seasoned ground beef and a fried egg", "30 minutes"),
+    ("Coconut Lentil Dal", "Red lentils simmered in coconut milk with ginger, served with naan", "35 minutes"),
+]
+
+
+class StubBackend(LLMBackend):
+    """
+    Deterministic fake Gemini. Latency is log-normal around `latency_ms`
+    (spread `latency_sigma`); `error_rate` of calls raise StubUnavailableError.
+    Responses are canned per prompt type and honour JSON mode.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = 800, latency_sigma: float = 0.5,
+                 error_rate: float = 0.0, seed: int = 42, chunk_size: int = 48):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls) -> "StubBackend":
+        return cls(
+            latency_ms=float(os.getenv("LLM_STUB_LATENCY_MS", 800)),
+            latency_sigma=float(os.getenv("LLM_STUB_LATENCY_SIGMA", 0.5)),
+            error_rate=float(os.getenv("LLM_STUB_ERROR_RATE", 0)),
+            seed=int(os.getenv("LLM_STUB_SEED", 42)),
+        )
+
+    def generate_content(self, contents, stream: bool = False, generation_config=None):
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+            latency = self.latency_ms / 1000 * self._rng.lognormvariate(0, self.latency_sigma) \
+                if self.latency_ms > 0 else 0
+            fail = self._rng.random() < self.error_rate
+
+        prompt = contents[0] if isinstance(contents, list) else contents
+        json_mode = getattr(generation_config, "response_mime_type", None) == "application/json"
+        text = self._render(prompt, json_mode, call_number)
+
+        if stream:
+            return self._stream(text, latency, fail)
+        time.sleep(latency)
+        if fail:
+            raise StubUnavailableError("Stub backend injected failure")
+        return _StubResponse(text)
+
+    def _stream(self, text: str, latency: float, fail: bool) -> Iterator[_StubResponse]:
+        # Time-to-first-chunk is half the latency; the rest is spread across chunks
+        time.sleep(latency / 2)
+        if fail:
+            raise StubUnavailableError("Stub backend injected failure")
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+        for chunk in chunks:
+            time.sleep(latency / 2 / max(1, len(chunks)))
+            yield _StubResponse(chunk)
+
+    # Canned responses
+
+    def _render(self, prompt: str, json_mode: bool, call_number: int) -> str:
+        if '"analyses"' in prompt:
+            return json.dumps(self._batch_analysis(prompt))
+        if '"suggestions"' in prompt:
+            return json.dumps(self._inspiration(call_number))
+        recipe_title = re.search(r'detailed recipe for "(.+?)"', prompt)
+        if recipe_title:
+            return json.dumps(self._recipe(recipe_title.group(1)))
+        return self._analysis(prompt, json_mode)
+
+    @staticmethod
+    def _describe(description: str) -> Tuple[str, int]:
+        calories = 250 + len(description) * 7 % 600
+        analysis = (f"What a nourishing choice! {description.capitalize()} brings steady energy, "
+                    f"quality protein and healthy fats that support hormone production. "
+                    f"Consider adding a glass of whole milk for extra calcium.")
+        return analysis, calories
+
+    def _analysis(self, prompt: str, json_mode: bool) -> str:
+        description = re.search(r"Meal Description: (.*)", prompt)
+        analysis, calories = self._describe(description.group(1).strip() if description else "this meal")
+        if json_mode:
+            return json.dumps({"analysis": analysis, "estimated_calories": calories})
+        return f"{analysis}\nESTIMATED_CALORIES: {calories}"
+
+    def _batch_analysis(self, prompt: str) -> dict:
+        analyses = []
+        for index, description in re.findall(r"^(\d+)\. \w+: (.*)$", prompt, re.MULTILINE):
+            analysis, calories = self._describe(description.strip())
+            analyses.append({"index": int(index), "analysis": analysis, "estimated_calories": calories})
+        return {"analyses": analyses}
+
+    def _inspiration(self, call_number: int) -> dict:
+        offset = call_number % len(_STUB_SUGGESTIONS)
+        picks: List[tuple] = (_STUB_SUGGESTIONS[offset:] + _STUB_SUGGESTIONS[:offset])[:3]
+        return {
+            "daily_analysis": "You've built a solid foundation today with a good mix of protein and carbohydrates.",
+            "encouragement": "Every meal you log is a step toward feeling more energized!",
+            "suggestions": [
+                {
+                    "title": title,
+                    "description": description,
+                    "prep_time": prep_time,
+                    "nutrition_highlights": "Balanced protein, complex carbohydrates and healthy fats.",
+                    "why_recommended": "Rounds out today's meals with steady, satisfying energy.",
+                }
+                for title, description, prep_time in picks
+            ],
+        }
+
+    def _recipe(self, title: str) -> dict:
+        return {
+            "title": title,
+            "description": f"A comforting, nourishing take on {title.lower()}.",
+            "prep_time": "15 minutes",
+            "cook_time": "20 minutes",
+            "servings": 2,
+            "ingredients": ["2 cups cooked rice", "2 tbsp olive oil", "1 cup seasonal vegetables", "2 eggs"],
+            "instructions": ["Prepare the ingredients", "Cook everything together until golden", "Serve warm"],
+            "nutrition_notes": "Provides complex carbohydrates, healthy fats and complete protein.",
+            "tips": ["Make a double batch for tomorrow's lunch"],
+            "encouragement": "You deserve delicious, nourishing food!",
+        }
+
+
+def create_backend(name: Optional[str] = None) -> LLMBackend:
+    """Build the backend selected by LLM_BACKEND (default: gemini)"""
+    name = (name or os.getenv("LLM_BACKEND", "gemini")).lower()
+    if name == "stub":
+        print("✅ Using local stub LLM backend")
+        return StubBackend.from_env()
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected 'gemini' or 'stub')")
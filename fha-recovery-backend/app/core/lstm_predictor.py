@@ -116,3 +116,42 @@ class LSTMPredictor:
             sequence[i] = [calorie_deficit, hrv_avg, body_temp]
         
         return sequence
+    
+    def prepare_sequences_batch(self, windows: np.ndarray) -> np.ndarray:
+        """
+        Vectorized prepare_sequence_from_daily_data for many users
+        
+        Args:
+            windows: Array of shape (users, 60, 3) with NaN for missing values,
+                e.g. TrackingSnapshot.windows(60, channels=LSTM channels)
+        
+        Returns:
+            np.ndarray: Sequences of shape (users, 60, 3) with the same defaults
+            as the single-user path (deficit 0, HRV estimated from deficit, BBT 98.6)
+        """
+        windows = np.asarray(windows, dtype=np.float64)
+        calorie_deficit = np.nan_to_num(windows[:, :, 0], nan=0.0)
+        estimated_hrv = np.maximum(30, 50 - np.abs(calorie_deficit) / 50)
+        hrv = np.where(np.isnan(windows[:, :, 1]), estimated_hrv, windows[:, :, 1])
+        body_temp = np.where(np.isnan(windows[:, :, 2]) | (windows[:, :, 2] == 0), 98.6, windows[:, :, 2])
+        return np.stack([calorie_deficit, hrv, body_temp], axis=2)
+    
+    def predict_batch(self, sequences: np.ndarray, batch_size: int = 256) -> np.ndarray:
+        """
+        Predict recovery probabilities for many users at once
+        
+        Args:
+            sequences (np.ndarray): Array of shape (users, 60, 3), see prepare_sequences_batch
+        
+        Returns:
+            np.ndarray: Probabilities of shape (users,)
+        """
+        if not self.is_available():
+            raise ValueError("LSTM model is not available")
+        
+        if sequences.ndim != 3 or sequences.shape[1:] != (60, 3):
+            raise ValueError(f"Expected input shape (users, 60, 3), got {sequences.shape}")
+        
+        normalized = (sequences - self.norm_mean) / self.norm_std
+        probabilities = self.model.predict(normalized, batch_size=batch_size, verbose=0)[:, 0]
+        return np.clip(probabilities, 0.0, 1.0)
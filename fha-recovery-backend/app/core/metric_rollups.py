@@ -0,0 +1,209 @@
+# Incremental rolling statistics for DailyTracking metrics
+# Each user has one user_metric_rollups row per window holding running sums,
+# counts and sums of squares, so rolling means/standard deviations are a
+# single-row lookup instead of a scan over raw tracking rows.
+#
+# Write paths snapshot the tracking row before and after a change and pass both
+# to apply_tracking_change() before committing; windows slide forward lazily by
+# subtracting the days that fell out of them.
+
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.models.daily_tracking import DailyTracking
+from app.models.user_metric_rollup import UserMetricRollup
+
+ROLLUP_WINDOWS = (7, 30, 60, 90)
+
+# API metric name -> (column prefix in user_metric_rollups, DailyTracking column)
+METRICS = {
+    "heart_rate_variability": ("hrv", DailyTracking.heart_rate_variability),
+    "body_temperature": ("bbt", DailyTracking.body_temperature),
+    "calorie_deficit": ("deficit", DailyTracking.calorie_deficit),
+}
+STAT_COLUMNS = [f"{prefix}_{stat}" for prefix, _ in METRICS.values() for stat in ("sum", "count", "sum_sq")]
+
+_table = UserMetricRollup.__table__
+
+
+@dataclass
+class TrackingValues:
+    """The parts of a DailyTracking row that feed the rollups"""
+    tracking_date: date
+    heart_rate_variability: Optional[float] = None
+    body_temperature: Optional[float] = None
+    calorie_deficit: Optional[float] = None
+
+    @classmethod
+    def of(cls, entry: DailyTracking) -> "TrackingValues":
+        return cls(
+            tracking_date=entry.tracking_date,
+            **{metric: getattr(entry, metric) for metric in METRICS}
+        )
+
+    def contributions(self) -> Dict[str, float]:
+        """Amounts this row adds to each stat column"""
+        amounts = {}
+        for metric, (prefix, _) in METRICS.items():
+            value = getattr(self, metric)
+            if value is not None:
+                amounts[f"{prefix}_sum"] = value
+                amounts[f"{prefix}_count"] = 1
+                amounts[f"{prefix}_sum_sq"] = value * value
+        return amounts
+
+
+def _aggregate(db: Session, user_id: str, start: date, end: date) -> Dict[str, float]:
+    """Stat column values over raw tracking rows dated start..end inclusive"""
+    if start > end:
+        return dict.fromkeys(STAT_COLUMNS, 0)
+    columns = []
+    for _, column in METRICS.values():
+        columns += [func.coalesce(func.sum(column), 0), func.count(column), func.coalesce(func.sum(column * column), 0)]
+    row = db.query(*columns).filter(
+        and_(
+            DailyTracking.user_id == user_id,
+            DailyTracking.tracking_date >= start,
+            DailyTracking.tracking_date <= end
+        )
+    ).one()
+    return dict(zip(STAT_COLUMNS, row))
+
+
+def _rebuild_window(db: Session, user_id: str, window: int, as_of: date):
+    stats = _aggregate(db, user_id, as_of - timedelta(days=window - 1), as_of)
+    statement = dialect_insert(db.get_bind().dialect.name, _table).values(
+        user_id=user_id, window_days=window, as_of_date=as_of, **stats
+    )
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["user_id", "window_days"],
+        set_={"as_of_date": as_of, **stats}
+    ))
+
+
+def _advance_window(db: Session, user_id: str, rollup, as_of: date):
+    """Slide a window forward to end on as_of: drop days that left it, add days that entered"""
+    window = rollup.window_days
+    previous = rollup.as_of_date
+    if previous == as_of:
+        return
+    if not previous < as_of < previous + timedelta(days=window):
+        _rebuild_window(db, user_id, window, as_of)
+        return
+
+    leaving = _aggregate(db, user_id, previous - timedelta(days=window - 1), as_of - timedelta(days=window))
+    entering = _aggregate(db, user_id, previous + timedelta(days=1), as_of)
+    # The as_of_date guard makes a concurrent advance of the same row a no-op
+    db.execute(
+        update(_table)
+        .where(and_(_table.c.id == rollup.id, _table.c.as_of_date == previous))
+        .values(as_of_date=as_of, **{
+            column: _table.c[column] - leaving[column] + entering[column] for column in STAT_COLUMNS
+        })
+    )
+
+
+def ensure_current(db: Session, user_id: str, as_of: Optional[date] = None):
+    """Create or slide the user's rollups so every window ends on as_of (default today)"""
+    as_of = as_of or date.today()
+    with db.no_autoflush:
+        existing = {
+            rollup.window_days: rollup
+            for rollup in db.execute(select(_table).where(_table.c.user_id == user_id)).all()
+        }
+        for window in ROLLUP_WINDOWS:
+            if window in existing:
+                _advance_window(db, user_id, existing[window], as_of)
+            else:
+                _rebuild_window(db, user_id, window, as_of)
+
+
+def apply_tracking_change(db: Session, user_id: str,
+                          before: Optional[TrackingValues], after: Optional[TrackingValues]):
+    """
+    Fold one tracking row's change into the user's rollups. `before` is None
+    for a new row and `after` is None for a deleted one.
+
+    Call before committing, with the change not yet flushed: rollups that have
+    to be created or slid forward are computed from the rows as they were.
+    """
+    apply_tracking_changes(db, user_id, [(before, after)])
+
+
+def apply_tracking_changes(db: Session, user_id: str,
+                           changes: Iterable[Tuple[Optional[TrackingValues], Optional[TrackingValues]]]):
+    """apply_tracking_change for many rows of one user, with one UPDATE per affected window"""
+    as_of = date.today()
+    deltas: Dict[int, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for before, after in changes:
+        for values, sign in ((before, -1), (after, 1)):
+            if values is None:
+                continue
+            age = (as_of - values.tracking_date).days
+            for column, amount in values.contributions().items():
+                for window in ROLLUP_WINDOWS:
+                    if 0 <= age < window:
+                        deltas[window][column] += sign * amount
+
+    with db.no_autoflush:
+        ensure_current(db, user_id, as_of)
+        for window, amounts in deltas.items():
+            amounts = {column: amount for column, amount in amounts.items() if amount}
+            if not amounts:
+                continue
+            db.execute(
+                update(_table)
+                .where(and_(
+                    _table.c.user_id == user_id,
+                    _table.c.window_days == window,
+                    _table.c.as_of_date == as_of
+                ))
+                .values(**{column: _table.c[column] + amount for column, amount in amounts.items()})
+            )
+
+
+def get_rolling_stats(db: Session, user_id: str, window: int) -> dict:
+    """
+    {"as_of_date": ..., metric: {"mean", "std", "count"}} for the trailing
+    window. Slides the rollup forward if needed; the caller commits.
+    """
+    if window not in ROLLUP_WINDOWS:
+        raise ValueError(f"window must be one of {ROLLUP_WINDOWS}")
+    ensure_current(db, user_id)
+    rollup = db.execute(
+        select(_table).where(and_(_table.c.user_id == user_id, _table.c.window_days == window))
+    ).one()
+
+    stats = {"as_of_date": rollup.as_of_date}
+    for metric, (prefix, _) in METRICS.items():
+        count = getattr(rollup, f"{prefix}_count")
+        if count <= 0:
+            stats[metric] = {"mean": None, "std": None, "count": 0}
+            continue
+        mean = getattr(rollup, f"{prefix}_sum") / count
+        # Running sums can drift slightly negative for near-constant series
+        variance = max(0.0, getattr(rollup, f"{prefix}_sum_sq") / count - mean * mean)
+        stats[metric] = {"mean": mean, "std": math.sqrt(variance), "count": count}
+    return stats
+
+
+def rebuild_rollups(db: Session, user_id: Optional[str] = None) -> int:
+    """Recompute rollups from raw rows for one user or everyone; returns users rebuilt"""
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = [row[0] for row in db.query(DailyTracking.user_id).distinct().all()]
+        db.execute(_table.delete())
+
+    as_of = date.today()
+    for current_user in user_ids:
+        for window in ROLLUP_WINDOWS:
+            _rebuild_window(db, current_user, window, as_of)
+    return len(user_ids)
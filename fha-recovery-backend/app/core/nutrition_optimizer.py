@@ -1,11 +1,18 @@
 # API optimization system to minimize Gemini calls while maintaining functionality
 # Focuses on local nutrition estimation with strategic API usage
 
+import asyncio
 import json
 import hashlib
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import os
+from app.core.portion_parser import parse_food_quantities, quantity_to_grams
+from app.core.single_flight import SingleFlight
+from app.core.image_pipeline import (
+    ImageValidationError, has_image, prepare_meal_image, prepare_meal_image_async
+)
+from app.core.perceptual_hash import PerceptualHashIndex
 
 class NutritionOptimizer:
     """
@@ -13,11 +20,15 @@ class NutritionOptimizer:
     only calling Gemini API for complex or unusual meals
     """
     
-    def __init__(self, gemini_client=None):
+    def __init__(self, gemini_client=None, api_budget=None, single_flight=None):
         self.gemini_client = gemini_client
+        self.api_budget = api_budget  # Shared cross-worker quota for Gemini calls
+        self.single_flight = single_flight or SingleFlight()  # Dedupes concurrent identical analyses
         self.local_cache = {}
-        self.daily_api_calls = 0
-        self.max_daily_calls = 50  # Increased limit for better functionality
+        # Near-identical photos (same description) reuse earlier photo analyses
+        self.image_index = PerceptualHashIndex(max_distance=int(os.getenv("MEAL_IMAGE_MATCH_DISTANCE", 6)))
+        # Meals packed into a single Gemini call by analyze_meals_batch
+        self.batch_size = int(os.getenv("MEAL_BATCH_MAX_ITEMS", 8))
         
         # Common food nutrition database (local estimation)
         self.food_database = {
@@ -46,13 +57,59 @@ class NutritionOptimizer:
             'spinach': {'energy': 23, 'protein': 2.9, 'fat': 0.4, 'carbs': 3.6},
             'broccoli': {'energy': 34, 'protein': 2.8, 'fat': 0.4, 'carbs': 7},
         }
+        
+        # Default weights for one typical portion of each food (in grams)
+        self.default_weights = {
+            'eggs': 50,  # 1 egg
+            'chicken breast': 150,
+            'salmon': 120,
+            'tofu': 100,
+            'greek yogurt': 150,
+            'avocado': 150,  # half avocado
+            'olive oil': 15,  # 1 tbsp
+            'nuts': 30,
+            'nut butter': 20,  # 1 tbsp
+            'quinoa': 80,  # cooked portion
+            'oats': 40,  # dry weight
+            'sweet potato': 150,
+            'brown rice': 80,  # cooked
+            'banana': 120,
+            'apple': 150,
+            'spinach': 100,
+            'broccoli': 100
+        }
+        
+        # Grams per cup for converting volume measures (cups, tbsp, tsp, ml)
+        self.grams_per_cup = {
+            'eggs': 243,  # beaten
+            'chicken breast': 140,  # diced
+            'salmon': 140,  # flaked
+            'tofu': 250,
+            'greek yogurt': 245,
+            'avocado': 150,
+            'olive oil': 216,
+            'nuts': 140,
+            'nut butter': 256,
+            'quinoa': 185,  # cooked
+            'oats': 80,  # dry
+            'sweet potato': 200,
+            'brown rice': 195,  # cooked
+            'banana': 150,
+            'apple': 125,
+            'spinach': 30,  # raw
+            'broccoli': 91
+        }
     
-    def should_use_api(self, meal_description: str) -> bool:
+    def should_use_api(self, meal_description: str, user_id: Optional[str] = None) -> bool:
         """
         Determines if we should use Gemini API or local estimation
         """
-        # Check daily API limit
-        if self.daily_api_calls >= self.max_daily_calls:
+        # Skip the API entirely while its circuit breaker is open
+        if self.gemini_client and self.gemini_client.circuit_open():
+            return False
+        
+        # Check the shared API budget without consuming it
+        if self.api_budget and not self.api_budget.has_capacity("analyze", user_id):
             return False
         
         # Use API for complex meals or unusual combinations
@@ -94,28 +151,11 @@ class NutritionOptimizer:
         description_lower = meal_description.lower()
         
         # Extract portions and foods
-        estimated_nutrition = {'energy': 0, 'protein': 0, 'fat': 0, 'carbs': 0}
-        portion_multiplier = self._estimate_portion_size(description_lower, meal_type)
-        
-        # Match foods in description
-        matched_foods = []
-        for food, nutrition in self.food_database.items():
-            if food in description_lower:
-                matched_foods.append((food, nutrition))
+        estimated_nutrition, matched_foods = self._sum_matched_nutrition(description_lower, meal_type)
         
         if not matched_foods:
             # Fallback estimation based on meal type
             estimated_nutrition = self._fallback_estimation(meal_type)
-        else:
-            # Calculate based on matched foods
-            for food, nutrition in matched_foods:
-                weight_estimate = self._estimate_food_weight(food, description_lower)
-                for nutrient in estimated_nutrition:
-                    estimated_nutrition[nutrient] += (nutrition[nutrient] * weight_estimate / 100)
-        
-        # Apply portion multiplier
-        for nutrient in estimated_nutrition:
-            estimated_nutrition[nutrient] *= portion_multiplier
         
         # Generate encouraging message
         encouraging_message = self._generate_local_encouragement(
@@ -150,41 +190,40 @@ class NutritionOptimizer:
         
         return base_multiplier
     
-    def _estimate_food_weight(self, food: str, description: str) -> float:
-        """Estimates weight in grams for a food item"""
+    def _sum_matched_nutrition(self, description_lower: str, meal_type: str):
+        """
+        Sums nutrition over the foods recognized in a description.
+        Each food is weighed from its own parsed quantity; the meal-level portion
+        multiplier only applies to foods the user didn't give an amount for.
+        """
+        totals = {'energy': 0, 'protein': 0, 'fat': 0, 'carbs': 0}
+        matched_foods = [
+            (food, nutrition) for food, nutrition in self.food_database.items()
+            if food in description_lower
+        ]
+        if not matched_foods:
+            return totals, matched_foods
         
-        # Default weights for common foods (in grams)
-        default_weights = {
-            'eggs': 50,  # 1 egg
-            'chicken breast': 150,
-            'salmon': 120,
-            'tofu': 100,
-            'greek yogurt': 150,
-            'avocado': 150,  # half avocado
-            'olive oil': 15,  # 1 tbsp
-            'nuts': 30,
-            'nut butter': 20,  # 1 tbsp
-            'quinoa': 80,  # cooked portion
-            'oats': 40,  # dry weight
-            'sweet potato': 150,
-            'brown rice': 80,  # cooked
-            'banana': 120,
-            'apple': 150,
-            'spinach': 100,
-            'broccoli': 100
-        }
+        quantities = parse_food_quantities(description_lower, [food for food, _ in matched_foods])
+        portion_multiplier = self._estimate_portion_size(description_lower, meal_type)
+        
+        for food, nutrition in matched_foods:
+            quantity = quantities.get(food)
+            weight_estimate = self._estimate_food_weight(food, quantity)
+            if quantity is None:
+                weight_estimate *= portion_multiplier
+            for nutrient in totals:
+                totals[nutrient] += nutrition[nutrient] * weight_estimate / 100
         
-        # Look for quantity indicators
-        if '2' in description or 'two' in description:
-            return default_weights.get(food, 100) * 2
-        elif '3' in description or 'three' in description:
-            return default_weights.get(food, 100) * 3
-        elif 'cup' in description:
-            return default_weights.get(food, 100) * 1.2
-        elif 'tbsp' in description or 'tablespoon' in description:
-            return default_weights.get(food, 100) * 0.3
-        
-        return default_weights.get(food, 100)
+        return totals, matched_foods
+    
+    def _estimate_food_weight(self, food: str, quantity=None) -> float:
+        """Estimates weight in grams for a food item from its parsed quantity"""
+        return quantity_to_grams(
+            quantity,
+            self.default_weights.get(food, 100),
+            self.grams_per_cup.get(food)
+        )
     
     def _fallback_estimation(self, meal_type: str) -> Dict:
         """Fallback nutrition estimation when no foods are recognized"""
@@ -283,23 +322,11 @@ class NutritionOptimizer:
         Returns a MealAnalysisResponse-compatible dict
         """
         description_lower = description.lower()
-        matched_foods = []
-        total_nutrition = {'energy': 0, 'protein': 0, 'fat': 0, 'carbs': 0}
-        
-        # Match foods in description
-        for food, nutrition in self.food_database.items():
-            if food in description_lower:
-                # Estimate portion size (rough approximation)
-                portion_multiplier = self._estimate_portion_size(description_lower, food)
-                matched_foods.append((food, portion_multiplier))
-                
-                # Add to totals
-                for nutrient, value in nutrition.items():
-                    total_nutrition[nutrient] += value * portion_multiplier
+        total_nutrition, matched_foods = self._sum_matched_nutrition(description_lower, meal_type)
         
         # If no matches, use fallback values
         if not matched_foods:
-            total_nutrition = self._get_fallback_nutrition(meal_type)
+            total_nutrition = self._fallback_estimation(meal_type)
         
         # Generate encouraging message
         encouragement = self._generate_local_encouragement(total_nutrition, meal_type, matched_foods)
@@ -307,7 +334,7 @@ class NutritionOptimizer:
         # Create response in expected format
         return {
             "meal_id": "local_estimate",
-            "overall_score": min(8, max(6, total_nutrition['energy'] / 50)),  # 6-8 range
+            "overall_score": int(min(8, max(6, total_nutrition['energy'] / 50))),  # 6-8 range
             "overall_assessment": encouragement,
             "key_nutrients": [],
             "positive_aspects": [],
@@ -318,25 +345,39 @@ class NutritionOptimizer:
             "estimated_calories": int(total_nutrition['energy'])
         }
     
-    def _estimate_portion_size(self, description: str, food: str) -> float:
-        """Estimates portion size multiplier based on description context"""
-        # Look for portion indicators
-        if any(word in description for word in ['large', 'big', 'huge', 'extra']):
-            return 1.5
-        elif any(word in description for word in ['small', 'little', 'mini']):
-            return 0.7
-        elif any(word in description for word in ['2', 'two', 'double']):
-            return 2.0
-        elif any(word in description for word in ['3', 'three', 'triple']):
-            return 3.0
-        else:
-            return 1.0  # Standard portion
-    
-    def get_cache_key(self, meal_description: str, meal_type: str) -> str:
-        """Generates cache key for meal analysis"""
+    def get_cache_key(self, meal_description: str, meal_type: str, image_hash: Optional[str] = None) -> str:
+        """Generates cache key for meal analysis (photo analyses include the image's perceptual hash)"""
         content = f"{meal_type}:{meal_description.lower().strip()}"
+        if image_hash:
+            content += f":img:{image_hash}"
         return hashlib.md5(content.encode()).hexdigest()
     
+    def _resolve_cache_key(self, meal_description: str, meal_type: str, prepared_image=None) -> str:
+        """
+        Cache key for an analysis. For photos, an earlier analysis of a
+        near-identical photo with the same description is reused when the
+        exact key has nothing cached.
+        """
+        if prepared_image is None:
+            return self.get_cache_key(meal_description, meal_type)
+        
+        exact_key = self.get_cache_key(meal_description, meal_type, prepared_image.phash)
+        if self.get_cached_result(exact_key) is not None:
+            return exact_key
+        similar_key = self.image_index.find(
+            self.get_cache_key(meal_description, meal_type), prepared_image.fingerprint
+        )
+        if similar_key and self.get_cached_result(similar_key) is not None:
+            return similar_key
+        return exact_key
+    
+    def _remember_image_key(self, meal_description: str, meal_type: str, prepared_image, cache_key: str):
+        """Index a photo analysis so near-identical re-uploads can find it"""
+        if prepared_image is not None:
+            self.image_index.add(
+                self.get_cache_key(meal_description, meal_type), prepared_image.fingerprint, cache_key
+            )
+    
     def cache_result(self, cache_key: str, result: Dict):
         """Caches analysis result"""
         self.local_cache[cache_key] = {
@@ -354,34 +395,176 @@ class NutritionOptimizer:
                 return cached['result']
         return None
     
-    async def analyze_meal_optimized(self, meal_type: str, description: str, image_base64: Optional[str] = None):
+    def _acquire_api_call(self, user_id: Optional[str] = None) -> bool:
+        """Reserves one Gemini analysis call from the shared budget (never while the circuit is open)"""
+        if not self.gemini_client or self.gemini_client.circuit_open():
+            return False
+        if not self.api_budget:
+            return True
+        return self.api_budget.acquire("analyze", user_id)
+    
+    async def analyze_meal_optimized(self, meal_type: str, description: str, image_base64: Optional[str] = None,
+                                     user_id: Optional[str] = None):
         """
         Optimized meal analysis that uses local estimation first,
         only calls Gemini API when necessary
         """
-        # Check cache first
-        cache_key = self.get_cache_key(description, meal_type)
+        # Downsample/strip the photo off the event loop; its hash is part of the cache key
+        prepared_image = None
+        if has_image(image_base64):
+            try:
+                prepared_image = await prepare_meal_image_async(image_base64)
+            except ImageValidationError as e:
+                print(f"Ignoring unusable meal photo: {e}")
+        
+        # Check cache first (including near-identical photos)
+        cache_key = self._resolve_cache_key(description, meal_type, prepared_image)
         cached_result = self.get_cached_result(cache_key)
         if cached_result:
             return cached_result
         
-        # Try local estimation first
-        complexity = self._assess_meal_complexity(description)
+        # Identical analyses already in flight share one Gemini call
+        return await self.single_flight.do(
+            f"analyze:{cache_key}", self._analyze_uncached,
+            cache_key, meal_type, description, prepared_image, user_id
+        )
+    
+    def stream_meal_analysis(self, meal_type: str, description: str, image_base64: Optional[str] = None,
+                             user_id: Optional[str] = None):
+        """
+        Streaming variant of analyze_meal_optimized yielding (event, payload) pairs.
+        Cached and local results arrive as a single "result" event; Gemini results
+        stream "delta" text first and are cached once the final result is parsed.
+        """
+        prepared_image = None
+        if has_image(image_base64):
+            try:
+                prepared_image = prepare_meal_image(image_base64)
+            except ImageValidationError as e:
+                print(f"Ignoring unusable meal photo: {e}")
         
-        # Always try Gemini API first if available, only fallback to local for simple meals when limit reached
-        if self.gemini_client and self.daily_api_calls < self.max_daily_calls:
+        cache_key = self._resolve_cache_key(description, meal_type, prepared_image)
+        cached_result = self.get_cached_result(cache_key)
+        if cached_result:
+            yield "result", cached_result
+            return
+        
+        if not self._acquire_api_call(user_id):
+            # Degraded result: not cached, so the next request tries Gemini again
+            yield "result", self._estimate_locally(description, meal_type)
+            return
+        
+        for event, payload in self.gemini_client.stream_meal_analysis(
+                meal_type, description, prepared_image=prepared_image):
+            if event == "result" and not payload.meal_id.endswith("_fallback"):
+                self.cache_result(cache_key, payload)
+                self._remember_image_key(description, meal_type, prepared_image, cache_key)
+            yield event, payload
+    
+    def _analyze_uncached(self, cache_key: str, meal_type: str, description: str,
+                          prepared_image=None, user_id: Optional[str] = None):
+        """
+        Runs the Gemini-or-local analysis for a cache miss. Only Gemini results
+        are cached: a local estimate made during an outage or budget refusal is
+        cheap to redo, and caching it would keep serving it for a day.
+        """
+        # Always try Gemini API first if available, only fallback to local when the budget is spent
+        if self._acquire_api_call(user_id):
             try:
-                result = self.gemini_client.analyze_meal(meal_type, description, image_base64)
-                self.daily_api_calls += 1
+                result = self.gemini_client.analyze_meal(meal_type, description, prepared_image=prepared_image)
+                if result.meal_id.endswith("_fallback"):
+                    raise RuntimeError(result.overall_assessment)
                 self.cache_result(cache_key, result)
+                self._remember_image_key(description, meal_type, prepared_image, cache_key)
                 return result
             except Exception as e:
                 print(f"Gemini API failed, falling back to local estimation: {e}")
-                result = self._estimate_locally(description, meal_type)
-                self.cache_result(cache_key, result)
-                return result
+                return self._estimate_locally(description, meal_type)
         else:
-            # Use local estimation when API limit reached or no client
-            result = self._estimate_locally(description, meal_type)
-            self.cache_result(cache_key, result)
-            return result
+            # Use local estimation when API budget is exhausted or no client
+            return self._estimate_locally(description, meal_type)
+    
+    async def analyze_meals_batch(self, meals: List, user_id: Optional[str] = None) -> List:
+        """
+        Analyzes several meals at once, returning results in input order.
+        Cache hits and meals simple enough for local estimation are resolved
+        first; the remaining text-only meals share one Gemini call per
+        `batch_size` meals. Meals with photos go through the single-meal path.
+        """
+        results: List = [None] * len(meals)
+        # (user, cache key) -> [meal_type, description, result positions]; each user's meals are billed to them
+        pending: Dict[tuple, List] = {}
+        photo_jobs = []
+        
+        for position, meal in enumerate(meals):
+            meal_user = getattr(meal, 'user_id', None) or user_id
+            if has_image(meal.image_base64):
+                photo_jobs.append((position, self.analyze_meal_optimized(
+                    meal.meal_type, meal.description, meal.image_base64, meal_user
+                )))
+                continue
+            
+            cache_key = self.get_cache_key(meal.description, meal.meal_type)
+            pending_key = (meal_user, cache_key)
+            if pending_key in pending:
+                pending[pending_key][2].append(position)  # Same meal twice in one batch
+                continue
+            cached_result = self.get_cached_result(cache_key)
+            if cached_result:
+                results[position] = cached_result
+            elif not self.should_use_api(meal.description, meal_user):
+                # Not cached: /analyze-meal always tries Gemini first for this meal
+                results[position] = self._estimate_locally(meal.description, meal.meal_type)
+            else:
+                pending[pending_key] = [meal.meal_type, meal.description, [position]]
+        
+        # Chunks never mix users, so each Gemini call is charged to the user whose meals it analyzes
+        by_user: Dict[Optional[str], List[tuple]] = {}
+        for pending_key in pending:
+            by_user.setdefault(pending_key[0], []).append(pending_key)
+        chunks = [
+            keys[i:i + self.batch_size]
+            for keys in by_user.values()
+            for i in range(0, len(keys), self.batch_size)
+        ]
+        chunk_jobs = [
+            self.single_flight.do(
+                "analyze-batch:" + hashlib.md5("|".join(key for _, key in chunk).encode()).hexdigest(),
+                self._analyze_batch_uncached,
+                [(key, pending[(meal_user, key)][0], pending[(meal_user, key)][1]) for meal_user, key in chunk],
+                chunk[0][0]
+            )
+            for chunk in chunks
+        ]
+        
+        outcomes = await asyncio.gather(*chunk_jobs, *(job for _, job in photo_jobs))
+        for chunk, chunk_results in zip(chunks, outcomes[:len(chunks)]):
+            for pending_key, result in zip(chunk, chunk_results):
+                for position in pending[pending_key][2]:
+                    results[position] = result
+        for (position, _), result in zip(photo_jobs, outcomes[len(chunks):]):
+            results[position] = result
+        return results
+    
+    def _analyze_batch_uncached(self, items: List, user_id: Optional[str] = None) -> List:
+        """
+        One budgeted Gemini call for (cache_key, meal_type, description) items,
+        charged to user_id. Local estimates fill any gaps but aren't cached.
+        """
+        analyses = [None] * len(items)
+        if self._acquire_api_call(user_id):
+            try:
+                analyses = self.gemini_client.analyze_meals_batch(
+                    [(meal_type, description) for _, meal_type, description in items]
+                )
+            except Exception as e:
+                print(f"Gemini batch analysis failed, falling back to local estimation: {e}")
+        
+        results = []
+        for (cache_key, meal_type, description), analysis in zip(items, analyses):
+            if analysis is None:
+                results.append(self._estimate_locally(description, meal_type))
+                continue
+            self.cache_result(cache_key, analysis)
+            results.append(analysis)
+        return results
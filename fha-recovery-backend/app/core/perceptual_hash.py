@@ -0,0 +1,90 @@
+# Perceptual hashing for meal photos
+# aHash + dHash fingerprints and a Hamming-distance index so re-uploads of
+# the same (or re-compressed) photo reuse a cached analysis
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8  # 8x8 -> 64-bit hashes
+
+
+@dataclass(frozen=True)
+class ImageFingerprint:
+    ahash: int  # Average hash: pixels brighter than the mean
+    dhash: int  # Difference hash: pixels brighter than their right neighbour
+
+    @property
+    def key(self) -> str:
+        """Stable hex form used in cache keys"""
+        return f"{self.dhash:016x}{self.ahash:016x}"
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.astype(np.uint8).ravel()).tobytes(), "big")
+
+
+def average_hash(gray: Image.Image) -> int:
+    pixels = np.asarray(gray.resize((HASH_SIZE, HASH_SIZE), Image.LANCZOS), dtype=np.float32)
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def difference_hash(gray: Image.Image) -> int:
+    pixels = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, :-1] > pixels[:, 1:])
+
+
+def fingerprint(image: Image.Image) -> ImageFingerprint:
+    gray = image.convert("L")
+    return ImageFingerprint(ahash=average_hash(gray), dhash=difference_hash(gray))
+
+
+class PerceptualHashIndex:
+    """
+    Maps (text cache key, image fingerprint) to the cache key of an earlier
+    analysis whose photo is within `max_distance` bits on both hashes.
+
+    Fingerprints are grouped by the meal's text key so only photos logged
+    with the same description and meal type are compared; each group is
+    scanned with vectorized XOR + popcount.
+    """
+
+    def __init__(self, max_distance: int = 6, max_groups: int = 5000, max_per_group: int = 32):
+        self.max_distance = max_distance
+        self.max_groups = max_groups
+        self.max_per_group = max_per_group
+        self._groups: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, text_key: str, print_: ImageFingerprint, cache_key: str):
+        with self._lock:
+            group = self._groups.get(text_key)
+            if group is None:
+                group = {"ahash": np.empty(0, np.uint64), "dhash": np.empty(0, np.uint64), "keys": []}
+                self._groups[text_key] = group
+            self._groups.move_to_end(text_key)
+
+            group["ahash"] = np.append(group["ahash"], np.uint64(print_.ahash))[-self.max_per_group:]
+            group["dhash"] = np.append(group["dhash"], np.uint64(print_.dhash))[-self.max_per_group:]
+            group["keys"] = (group["keys"] + [cache_key])[-self.max_per_group:]
+
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+
+    def find(self, text_key: str, print_: ImageFingerprint) -> Optional[str]:
+        """Cache key of the closest matching photo, or None"""
+        with self._lock:
+            group = self._groups.get(text_key)
+            if group is None or not group["keys"]:
+                return None
+            a_dist = np.bitwise_count(group["ahash"] ^ np.uint64(print_.ahash))
+            d_dist = np.bitwise_count(group["dhash"] ^ np.uint64(print_.dhash))
+            within = (a_dist <= self.max_distance) & (d_dist <= self.max_distance)
+            if not within.any():
+                return None
+            total = np.where(within, a_dist.astype(np.int32) + d_dist, np.iinfo(np.int32).max)
+            return group["keys"][int(np.argmin(total))]
@@ -0,0 +1,224 @@
+# Per-ingredient quantity parsing for local nutrition estimation
+# Attributes "2 cups", "1/2", "a slice of" etc. to the food they describe
+# and converts them to grams so one quantity never scales the whole meal
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Grams per unit for mass units, and a water-equivalent baseline for volume
+# units (overridden per food via grams-per-cup when a density is known)
+MASS_UNITS = {
+    'g': 1.0, 'gram': 1.0, 'grams': 1.0,
+    'kg': 1000.0, 'kilogram': 1000.0, 'kilograms': 1000.0,
+    'oz': 28.35, 'ounce': 28.35, 'ounces': 28.35,
+    'lb': 453.6, 'lbs': 453.6, 'pound': 453.6, 'pounds': 453.6,
+}
+
+# Volume units expressed as fractions of a cup
+VOLUME_UNITS = {
+    'cup': 1.0, 'cups': 1.0,
+    'tbsp': 1 / 16, 'tablespoon': 1 / 16, 'tablespoons': 1 / 16,
+    'tsp': 1 / 48, 'teaspoon': 1 / 48, 'teaspoons': 1 / 48,
+    'ml': 1 / 240, 'milliliter': 1 / 240, 'milliliters': 1 / 240,
+    'l': 1000 / 240, 'liter': 1000 / 240, 'liters': 1000 / 240,
+}
+
+# Count-like units scale the food's default single-portion weight
+COUNT_UNITS = {
+    'slice': 1.0, 'slices': 1.0,
+    'piece': 1.0, 'pieces': 1.0,
+    'serving': 1.0, 'servings': 1.0,
+    'portion': 1.0, 'portions': 1.0,
+    'fillet': 1.0, 'fillets': 1.0,
+    'handful': 1.0, 'handfuls': 1.0,
+    'scoop': 1.0, 'scoops': 1.0,
+    'bowl': 1.5, 'bowls': 1.5,
+    'plate': 2.0, 'plates': 2.0,
+}
+
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'single': 1,
+    'two': 2, 'couple': 2, 'double': 2, 'pair': 2,
+    'three': 3, 'triple': 3, 'few': 3,
+    'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8,
+    'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12, 'dozen': 12,
+    'half': 0.5, 'quarter': 0.25,
+}
+
+UNICODE_FRACTIONS = {
+    '½': 0.5, '⅓': 1 / 3, '⅔': 2 / 3, '¼': 0.25, '¾': 0.75,
+    '⅕': 0.2, '⅛': 0.125,
+}
+
+# Words/punctuation that separate one ingredient from the next
+_SEGMENT_SPLIT = re.compile(r',|;|\+|&|\bwith\b|\band\b|\bplus\b|\bor\b|\bon\b|\btopped\b')
+
+_UNIT_NAMES = sorted(
+    list(MASS_UNITS) + list(VOLUME_UNITS) + list(COUNT_UNITS), key=len, reverse=True
+)
+_NUMBER_NAMES = sorted(NUMBER_WORDS, key=len, reverse=True)
+_FRACTION_CHARS = ''.join(UNICODE_FRACTIONS)
+
+_AMOUNT = (
+    rf"(?:(?:half|quarter)\s+(?:a|an)\b|\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+\s*[{_FRACTION_CHARS}]|\d+|[{_FRACTION_CHARS}]"
+    rf"|(?:{'|'.join(_NUMBER_NAMES)})\b(?:\s+(?:and\s+)?a\s+half\b)?)"
+)
+_QUANTITY = re.compile(
+    rf"(?<![\w.])(?P<amount>{_AMOUNT})\s*(?:-\s*)?"
+    rf"(?P<unit>(?:{'|'.join(re.escape(u) for u in _UNIT_NAMES)})\b)?(?:\s+of\b)?"
+)
+
+
+@dataclass
+class Quantity:
+    """A parsed amount with an optional unit (None means a plain count)"""
+    amount: float
+    unit: Optional[str] = None
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """Convert '2', '1/2', '1 1/2', '1½', '0.5', 'two', 'half' into a number"""
+    text = text.strip().lower()
+    if not text:
+        return None
+
+    half_suffix = re.search(r'\s+(?:and\s+)?a\s+half$', text)
+    if half_suffix:
+        base = parse_amount(text[:half_suffix.start()])
+        return base + 0.5 if base is not None else None
+
+    if text in NUMBER_WORDS:
+        return float(NUMBER_WORDS[text])
+
+    fraction_of_one = re.fullmatch(r'(half|quarter)\s+(?:a|an)', text)
+    if fraction_of_one:
+        return float(NUMBER_WORDS[fraction_of_one.group(1)])
+
+    if text[-1] in UNICODE_FRACTIONS:
+        whole = text[:-1].strip()
+        return (float(whole) if whole else 0.0) + UNICODE_FRACTIONS[text[-1]]
+
+    mixed = re.fullmatch(r'(\d+)\s+(\d+)/(\d+)', text)
+    if mixed:
+        whole, num, den = (int(g) for g in mixed.groups())
+        return whole + num / den if den else None
+
+    fraction = re.fullmatch(r'(\d+)/(\d+)', text)
+    if fraction:
+        num, den = (int(g) for g in fraction.groups())
+        return num / den if den else None
+
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _find_quantities(segment: str) -> List[Tuple[int, int, Quantity]]:
+    """Find all quantity expressions in a segment as (start, end, Quantity)"""
+    found = []
+    for match in _QUANTITY.finditer(segment):
+        amount = parse_amount(match.group('amount'))
+        if amount is None or amount <= 0:
+            continue
+        unit = match.group('unit')
+        # Single letters like 'l' and 'g' only count as units right after a number
+        if unit in ('l', 'g') and not match.group('amount')[-1].isdigit():
+            unit = None
+        found.append((match.start(), match.end(), Quantity(amount, unit)))
+    return found
+
+
+def _find_food_mentions(segment: str, foods: Iterable[str]) -> List[Tuple[int, str]]:
+    """Locate food names in a segment, preferring the longest overlapping name"""
+    mentions = []
+    taken = []
+    for food in sorted(foods, key=len, reverse=True):
+        for match in re.finditer(re.escape(food), segment):
+            span = (match.start(), match.end())
+            if any(span[0] < end and start < span[1] for start, end in taken):
+                continue
+            taken.append(span)
+            mentions.append((match.start(), food))
+    return sorted(mentions)
+
+
+def parse_food_quantities(description: str, foods: Iterable[str]) -> Dict[str, Quantity]:
+    """
+    Attribute quantities in a meal description to the nearest food mention.
+
+    The description is split into ingredient segments ("2 cups spinach and an
+    apple" -> "2 cups spinach" / "an apple"). Within a segment each food takes
+    the closest quantity before it, or the closest one after it ("spinach 2
+    cups" style) when nothing precedes it. A segment holding only a quantity
+    ("spinach, 2 cups") belongs to the last unquantified food before it. Foods
+    without a quantity are omitted so callers fall back to their default portion.
+    """
+    description = description.lower()
+    foods = list(foods)
+    quantities: Dict[str, Quantity] = {}
+    pending_food: Optional[str] = None
+
+    for segment in _SEGMENT_SPLIT.split(description):
+        mentions = _find_food_mentions(segment, foods)
+        candidates = _find_quantities(segment)
+        if not mentions:
+            if pending_food and candidates:
+                quantities[pending_food] = candidates[0][2]
+            pending_food = None
+            continue
+        # Ignore quantities that are part of a food name (e.g. "7 grain")
+        candidates = [
+            c for c in candidates
+            if not any(pos <= c[0] < pos + len(food) for pos, food in mentions)
+        ]
+        used = set()
+
+        for position, food in mentions:
+            if food in quantities:
+                continue
+            before = [
+                (position - end, i) for i, (start, end, _) in enumerate(candidates)
+                if end <= position and i not in used
+            ]
+            after = [
+                (start - position, i) for i, (start, end, _) in enumerate(candidates)
+                if start >= position + len(food) and i not in used
+            ]
+            chosen = min(before)[1] if before else (min(after)[1] if after else None)
+            if chosen is None:
+                continue
+            used.add(chosen)
+            quantities[food] = candidates[chosen][2]
+
+        last_food = mentions[-1][1]
+        pending_food = last_food if last_food not in quantities else None
+
+    return quantities
+
+
+def quantity_to_grams(
+    quantity: Optional[Quantity],
+    default_weight: float,
+    grams_per_cup: Optional[float] = None,
+) -> float:
+    """
+    Convert a parsed quantity into grams for a food.
+
+    Plain counts and count units multiply the food's default portion weight,
+    mass units convert directly, and volume units go through the food's
+    grams-per-cup density (water density when unknown).
+    """
+    if quantity is None:
+        return default_weight
+
+    unit = quantity.unit
+    if unit is None:
+        return quantity.amount * default_weight
+    if unit in MASS_UNITS:
+        return quantity.amount * MASS_UNITS[unit]
+    if unit in VOLUME_UNITS:
+        return quantity.amount * VOLUME_UNITS[unit] * (grams_per_cup or 240.0)
+    return quantity.amount * COUNT_UNITS.get(unit, 1.0) * default_weight
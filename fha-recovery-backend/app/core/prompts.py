@@ -0,0 +1,348 @@
+# Prompt templates for Gemini calls
+# Static instruction blocks are assembled once at import so each request only
+# joins in its dynamic parts; meal histories are trimmed to a token budget and
+# prompt sizes are tracked per endpoint
+
+import os
+import threading
+from string import Template
+from typing import List, Optional, Tuple
+
+CALORIE_MARKER = "ESTIMATED_CALORIES:"  # Separates streamed analysis text from the calorie estimate
+DAILY_CALORIE_TARGET = 2500
+MEAL_HISTORY_TOKEN_BUDGET = int(os.getenv("INSPIRATION_MEAL_TOKEN_BUDGET", 600))
+MAX_ASSESSMENT_CHARS = 160  # Per-meal cap applied when the history is over budget
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+class PromptStats:
+    """Per-endpoint prompt size counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, endpoint: str, prompt: str, truncated: bool = False):
+        tokens = estimate_tokens(prompt)
+        with self._lock:
+            stats = self._stats.setdefault(
+                endpoint, {"count": 0, "total_tokens": 0, "max_tokens": 0, "truncated": 0}
+            )
+            stats["count"] += 1
+            stats["total_tokens"] += tokens
+            stats["max_tokens"] = max(stats["max_tokens"], tokens)
+            stats["truncated"] += int(truncated)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {**stats, "avg_tokens": round(stats["total_tokens"] / stats["count"])}
+                for endpoint, stats in self._stats.items()
+            }
+
+
+prompt_stats = PromptStats()
+
+
+# Meal analysis
+
+_ANALYSIS_INTRO = """
+You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Analyze this """
+_ANALYSIS_DESCRIPTION = """ meal and provide a warm, encouraging response that highlights what's nutritionally beneficial about each component, followed by an estimated calorie count.
+
+Meal Description: """
+_ANALYSIS_GUIDELINES = """
+
+Write a natural, conversational response (2-3 sentences) that:
+- Celebrates the specific nutritional benefits of each food component
+- Mentions why these foods are great for energy and health
+- Uses encouraging, positive language
+- Includes specific details (e.g., "eggs are calorie-dense and provide complete protein")
+- Feels personal and supportive
+- Ends with a brief suggestion for how to improve the meal or a complementary food/drink
+
+"""
+_ANALYSIS_PRIORITIES = """
+
+Analysis priorities (incorporate naturally without explicitly mentioning):
+- Adequate calorie density for metabolic recovery
+- Healthy fats for hormone production (omega-3s, monounsaturated fats)
+- Complex carbohydrates for energy restoration
+- Quality protein for tissue repair
+- Micronutrients supporting metabolic health
+- Celebrating nourishing, energy-dense choices
+
+Example style: "What a fantastic breakfast choice! The eggs provide calorie-dense complete protein and healthy fats that support hormone production, while the avocado adds heart-healthy monounsaturated fats. The berries bring antioxidants and fiber for gut health. You're giving your body exactly what it needs to thrive and maintain steady energy throughout the morning! Consider adding a glass of whole milk or a handful of nuts for extra calcium and healthy fats."""
+
+_ANALYSIS_JSON_FORMAT = """Return JSON with two fields:
+- "analysis": your encouraging analysis text
+- "estimated_calories": an integer estimate of the calories in the whole meal"""
+_ANALYSIS_TEXT_FORMAT = f"""After your encouraging analysis, provide an estimated calorie count for the meal on a new line in this exact format:
+{CALORIE_MARKER} [number]"""
+
+_ANALYSIS_JSON_CLOSING = 'IMPORTANT: The "analysis" field must contain ONLY the encouraging nutritional feedback. Do not include any prefixes like "Here is a response:" or "Analysis:".'
+_ANALYSIS_TEXT_CLOSING = 'IMPORTANT: Provide ONLY the analysis text followed by the calorie estimate. Do not include any prefixes like "Here is a response:" or "Analysis:" - just the encouraging nutritional feedback and calorie count.'
+
+# Everything after the meal description, for JSON mode and for the streamed text format
+_ANALYSIS_SUFFIX_JSON = "".join([
+    _ANALYSIS_GUIDELINES, _ANALYSIS_JSON_FORMAT, _ANALYSIS_PRIORITIES,
+    '"\n\n', _ANALYSIS_JSON_CLOSING, "\n"
+])
+_ANALYSIS_SUFFIX_TEXT = "".join([
+    _ANALYSIS_GUIDELINES, _ANALYSIS_TEXT_FORMAT, _ANALYSIS_PRIORITIES, f"\n{CALORIE_MARKER} 450",
+    '"\n\n', _ANALYSIS_TEXT_CLOSING, "\n"
+])
+
+
+def build_analysis_prompt(meal_type: str, description: str, structured: bool = False) -> str:
+    """
+    Prompt for an encouraging meal analysis with a calorie estimate.
+    structured=True asks for the JSON fields used with the response schema;
+    otherwise the estimate follows the text on an ESTIMATED_CALORIES line.
+    """
+    suffix = _ANALYSIS_SUFFIX_JSON if structured else _ANALYSIS_SUFFIX_TEXT
+    prompt = "".join([_ANALYSIS_INTRO, meal_type, _ANALYSIS_DESCRIPTION, description, suffix])
+    prompt_stats.record("analyze", prompt)
+    return prompt
+
+
+# Multi-meal analysis
+
+_BATCH_ANALYSIS_INTRO = """
+You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Analyze each of the meals below separately and, for every meal, provide a warm, encouraging response that highlights what's nutritionally beneficial about each component, along with an estimated calorie count.
+
+Meals:
+"""
+_BATCH_ANALYSIS_FORMAT = """Return JSON with an "analyses" array containing one object per meal, with fields:
+- "index": the meal's number from the list above
+- "analysis": your encouraging analysis text for that meal only
+- "estimated_calories": an integer estimate of the calories in that meal"""
+_BATCH_ANALYSIS_SUFFIX = "".join([
+    _ANALYSIS_GUIDELINES, _BATCH_ANALYSIS_FORMAT, _ANALYSIS_PRIORITIES,
+    '"\n\n', 'IMPORTANT: Analyze every meal listed. Each "analysis" field must contain ONLY the encouraging nutritional feedback for that meal, without prefixes like "Here is a response:" or "Analysis:".', "\n"
+])
+
+
+def build_batch_analysis_prompt(meals: List[Tuple[str, str]]) -> str:
+    """Prompt analyzing several (meal_type, description) pairs in one JSON response, numbered from 1"""
+    meal_lines = "\n".join(
+        f"{index}. {meal_type}: {description}" for index, (meal_type, description) in enumerate(meals, start=1)
+    )
+    prompt = "".join([_BATCH_ANALYSIS_INTRO, meal_lines, _BATCH_ANALYSIS_SUFFIX])
+    prompt_stats.record("analyze_batch", prompt)
+    return prompt
+
+
+# Meal inspiration
+
+_INSPIRATION_INTRO = """
+You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Based on the AI nutritional analysis of the user's meals logged today, suggest 3 personalized meal ideas that would complement their nutrition and support their recovery journey.
+
+Today's meal analyses (from AI nutritional assessment):
+"""
+_INSPIRATION_SUFFIX = """
+
+Based on these detailed nutritional analyses, suggest meals that would:
+- Complement the nutritional profile already established
+- Fill any gaps identified in the analyses
+- Build upon the positive aspects noted
+- Provide variety while maintaining nutritional excellence
+- Support continued metabolic and hormonal health recovery
+- Help reach optimal daily nourishment in a gentle, encouraging way
+
+Return your response as valid JSON with this exact structure:
+{
+    "daily_analysis": "Brief analysis of their current nutrition (2-3 sentences)",
+    "encouragement": "Warm, encouraging message about their food choices (1-2 sentences)",
+    "suggestions": [
+        {
+            "title": "Meal Name",
+            "description": "Brief appetizing description (1 sentence)",
+            "prep_time": "X minutes",
+            "nutrition_highlights": "Key nutritional benefits (1-2 sentences)",
+            "why_recommended": "Why this complements their day (1-2 sentences)"
+        },
+        {
+            "title": "Meal Name 2",
+            "description": "Brief appetizing description (1 sentence)",
+            "prep_time": "X minutes", 
+            "nutrition_highlights": "Key nutritional benefits (1-2 sentences)",
+            "why_recommended": "Why this complements their day (1-2 sentences)"
+        },
+        {
+            "title": "Meal Name 3",
+            "description": "Brief appetizing description (1 sentence)",
+            "prep_time": "X minutes",
+            "nutrition_highlights": "Key nutritional benefits (1-2 sentences)", 
+            "why_recommended": "Why this complements their day (1-2 sentences)"
+        }
+    ]
+}
+
+Focus on recovery-friendly meals that are:
+- Appropriately nourishing for remaining daily needs
+- Rich in healthy fats for hormone production (from diverse sources like nuts, seeds, olive oil, coconut, eggs, etc.)
+- Include quality protein (vary between chicken, turkey, beef, pork, eggs, beans, lentils, tofu, etc.)
+- Complex carbohydrates (explore rice, pasta, potatoes, oats, barley, etc.)
+- Contain micronutrients for metabolic health
+- Appealing and not restrictive
+- Sized appropriately to help reach optimal daily nourishment without being overwhelming
+
+IMPORTANT: 
+1. Provide diverse, creative meal suggestions. Avoid repeatedly suggesting the same ingredients like salmon, quinoa, or avocado. Explore different cuisines, cooking methods, and ingredient combinations to keep suggestions fresh and exciting.
+2. Consider the remaining energy needs when suggesting portion sizes and meal types - substantial meals when more nourishment is needed, lighter options when less is needed.
+3. NEVER mention specific calorie numbers, calorie goals, calorie targets, or any numeric calorie values in user-facing content. Always frame recommendations positively around nourishment and energy.
+4. Use gentle, non-triggering language focused on wellness, nourishment, and energy rather than numbers or targets.
+"""
+
+
+def meal_calories(meal: dict) -> int:
+    """Calories from calorieCount (frontend) or analysis.estimated_calories (fallback)"""
+    analysis = meal.get('analysis') or {}
+    return meal.get('calorieCount', 0) or analysis.get('estimated_calories', 0) or 0
+
+
+def _meal_line(meal: dict, max_chars: int = 0) -> str:
+    analysis = meal.get('analysis') or {}
+    assessment = analysis.get('overall_assessment', 'No analysis available yet') if analysis else 'Analysis pending'
+    if max_chars and len(assessment) > max_chars:
+        # Keep the first sentence when it fits, otherwise cut at a word boundary
+        first_sentence = assessment.split('. ')[0]
+        if len(first_sentence) <= max_chars:
+            assessment = first_sentence.rstrip('.') + '.'
+        else:
+            assessment = assessment[:max_chars].rsplit(' ', 1)[0] + '...'
+    line = f"- {meal.get('meal_type', 'Unknown')}: {assessment}"
+    calories = meal_calories(meal)
+    if calories:
+        line += f" (Estimated: {calories} calories)"
+    return line
+
+
+def summarize_meal_history(logged_meals: List[dict], token_budget: Optional[int] = None) -> Tuple[str, bool]:
+    """
+    One line per logged meal, fitted to `token_budget` tokens. Over budget,
+    long assessments are shortened first; if that's still too long the most
+    recent meals are kept and earlier ones collapse into a single count line.
+    Returns (summary, truncated).
+    """
+    if not logged_meals:
+        return "No meals logged yet today", False
+    token_budget = token_budget or MEAL_HISTORY_TOKEN_BUDGET
+
+    lines = [_meal_line(meal) for meal in logged_meals]
+    summary = "\n".join(lines)
+    if estimate_tokens(summary) <= token_budget:
+        return summary, False
+
+    lines = [_meal_line(meal, MAX_ASSESSMENT_CHARS) for meal in logged_meals]
+    summary = "\n".join(lines)
+    if estimate_tokens(summary) <= token_budget:
+        return summary, True
+
+    kept: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        # Reserve room for the "earlier meals" line
+        if used + estimate_tokens(line) + 20 > token_budget and kept:
+            break
+        kept.insert(0, line)
+        used += estimate_tokens(line) + 1
+
+    dropped = logged_meals[:len(lines) - len(kept)]
+    if dropped:
+        dropped_calories = sum(meal_calories(meal) for meal in dropped)
+        earlier = f"- Earlier meals: {len(dropped)} more logged"
+        if dropped_calories:
+            earlier += f" (Estimated: {dropped_calories} calories combined)"
+        kept.insert(0, earlier)
+    return "\n".join(kept), True
+
+
+def _calorie_guidance(remaining_calories: int) -> str:
+    if remaining_calories > 1500:
+        return "Focus on substantial, nourishing meals that provide excellent energy density to support optimal daily nourishment."
+    if remaining_calories > 800:
+        return "Suggest satisfying meals that help reach optimal nourishment and energy levels."
+    if remaining_calories > 300:
+        return "Recommend lighter but still nourishing options that complement today's eating."
+    return "Daily nourishment goals are well met! Suggest gentle, satisfying options if additional fuel is desired."
+
+
+def build_inspiration_prompt(logged_meals: List[dict], token_budget: Optional[int] = None) -> str:
+    """Prompt for three meal suggestions complementing today's logged meals"""
+    meals_summary, truncated = summarize_meal_history(logged_meals, token_budget)
+    total_calories = sum(meal_calories(meal) for meal in logged_meals)
+    remaining_calories = max(0, DAILY_CALORIE_TARGET - total_calories)
+
+    prompt = "".join([
+        _INSPIRATION_INTRO, meals_summary,
+        """
+
+Total calories consumed today: """, str(total_calories),
+        """
+""", _calorie_guidance(remaining_calories),
+        _INSPIRATION_SUFFIX,
+    ])
+    prompt_stats.record("inspiration", prompt, truncated)
+    return prompt
+
+
+# Full recipe
+
+_RECIPE_TEMPLATE = Template("""
+You are an encouraging nutritionist specializing in metabolic and hormonal health recovery. Create a complete, detailed recipe for "$title" that supports recovery and is delicious.
+
+The recipe should be:
+- Nourishing and energy-adequate
+- Rich in nutrients that support metabolic and hormonal health
+- Easy to follow with clear instructions
+- Include helpful tips for success
+- Encouraging and positive in tone
+
+Return your response as valid JSON with this exact structure:
+{
+    "title": "$title",
+    "description": "Appetizing description of the dish (2-3 sentences)",
+    "prep_time": "X minutes",
+    "cook_time": "X minutes",
+    "servings": 2,
+    "ingredients": [
+        "Ingredient 1 with amount",
+        "Ingredient 2 with amount",
+        "etc."
+    ],
+    "instructions": [
+        "Step 1 instruction",
+        "Step 2 instruction", 
+        "etc."
+    ],
+    "nutrition_notes": "Key nutritional benefits and why this supports recovery (2-3 sentences)",
+    "tips": [
+        "Helpful tip 1",
+        "Helpful tip 2",
+        "etc."
+    ],
+    "encouragement": "Encouraging message about making this recipe (1-2 sentences)"
+}
+
+Focus on creating a recipe that is:
+- Energy-dense and satisfying
+- Rich in healthy fats, quality protein, and complex carbohydrates
+- Contains micronutrients that support hormonal and metabolic health
+- Realistic to make at home
+- Delicious and appealing
+
+IMPORTANT: Never mention specific calorie numbers or calorie targets in the recipe content. Focus on nourishment and energy language instead.
+""")
+
+
+def build_recipe_prompt(meal_title: str) -> str:
+    """Prompt for a complete recipe as JSON"""
+    prompt = _RECIPE_TEMPLATE.substitute(title=meal_title)
+    prompt_stats.record("recipe", prompt)
+    return prompt
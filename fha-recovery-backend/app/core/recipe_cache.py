@@ -0,0 +1,229 @@
+# Recipe cache keyed by normalized meal title
+# Serves FullRecipe objects from memory or the database, refreshes stale
+# entries in the background and prewarms titles from meal inspiration
+
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.database import SessionLocal
+from app.models.recipe_cache import RecipeCacheEntry
+from app.schemas.ai import FullRecipe
+
+
+def normalize_title(title: str) -> str:
+    """'  Thai Coconut-Curry Bowl! ' -> 'thai coconut curry bowl'"""
+    text = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode("ascii")
+    text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+    return text.strip()
+
+
+class RecipeCache:
+    """
+    Two-level recipe store: an in-memory LRU in front of the recipe_cache table.
+
+    Entries older than `ttl` are treated as missing. Entries older than
+    `refresh_after` are still served but regenerated in the background via
+    `generator`, which should return a FullRecipe or raise (never a fallback).
+
+    Database hits record last_accessed_at (used for size-cap eviction) at most
+    once per `touch_interval`, so the cached read path doesn't write every time.
+    """
+
+    def __init__(
+        self,
+        generator: Optional[Callable[[str], FullRecipe]] = None,
+        ttl: Optional[timedelta] = None,
+        refresh_after: Optional[timedelta] = None,
+        max_entries: Optional[int] = None,
+        memory_entries: Optional[int] = None,
+        workers: int = 2,
+        touch_interval: Optional[timedelta] = None,
+    ):
+        self.generator = generator
+        self.ttl = ttl or timedelta(hours=int(os.getenv("RECIPE_CACHE_TTL_HOURS", 24 * 14)))
+        self.refresh_after = refresh_after or timedelta(hours=int(os.getenv("RECIPE_CACHE_REFRESH_HOURS", 72)))
+        self.max_entries = max_entries or int(os.getenv("RECIPE_CACHE_MAX_ENTRIES", 2000))
+        self.memory_entries = memory_entries or int(os.getenv("RECIPE_CACHE_MEMORY_ENTRIES", 256))
+        self.touch_interval = touch_interval or timedelta(minutes=int(os.getenv("RECIPE_CACHE_TOUCH_MINUTES", 60)))
+
+        self._memory: "OrderedDict[str, Tuple[FullRecipe, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}  # Titles being generated in the background
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recipe-cache")
+        self.metrics = {"memory_hits": 0, "db_hits": 0, "misses": 0, "refreshes": 0, "prewarmed": 0}
+
+    # Lookups
+
+    def get(self, title: str) -> Optional[FullRecipe]:
+        """Return a cached recipe for the title, scheduling a refresh when stale"""
+        key = normalize_title(title)
+        if not key:
+            return None
+        now = datetime.now()
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached:
+                self._memory.move_to_end(key)
+
+        if cached:
+            recipe, refreshed_at = cached
+            if now - refreshed_at < self.ttl:
+                self._count("memory_hits")
+                self._refresh_if_stale(title, key, refreshed_at, now)
+                return recipe
+            with self._lock:
+                self._memory.pop(key, None)
+
+        loaded = self._load(key, now)
+        if not loaded:
+            self._count("misses")
+            return None
+
+        recipe, refreshed_at = loaded
+        self._count("db_hits")
+        self._remember(key, recipe, refreshed_at)
+        self._refresh_if_stale(title, key, refreshed_at, now)
+        return recipe
+
+    def pending(self, title: str) -> Optional[Future]:
+        """The background prewarm/refresh generating this title, if one is running"""
+        with self._lock:
+            return self._pending.get(normalize_title(title))
+
+    def put(self, title: str, recipe: FullRecipe):
+        """Store a freshly generated recipe in memory and in the database"""
+        key = normalize_title(title)
+        if not key:
+            return
+        now = datetime.now()
+        self._remember(key, recipe, now)
+
+        db = SessionLocal()
+        try:
+            entry = db.query(RecipeCacheEntry).filter(RecipeCacheEntry.normalized_title == key).first()
+            if entry:
+                entry.recipe_json = recipe.model_dump_json()
+                entry.refreshed_at = now
+                entry.last_accessed_at = now
+            else:
+                db.add(RecipeCacheEntry(
+                    normalized_title=key,
+                    title=title,
+                    recipe_json=recipe.model_dump_json(),
+                    hit_count=0,
+                    refreshed_at=now,
+                    last_accessed_at=now
+                ))
+            db.commit()
+            self._enforce_size_cap(db)
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Could not persist recipe for '{title}': {e}")
+        finally:
+            db.close()
+
+    # Background work
+
+    def prewarm(self, titles: Iterable[str]):
+        """Generate recipes for titles that aren't cached yet, without blocking the caller"""
+        for title in titles:
+            key = normalize_title(title)
+            if not key or not self.generator:
+                continue
+            with self._lock:
+                if key in self._memory or key in self._pending:
+                    continue
+                # Submitted under the lock so the worker can't finish before it's recorded
+                self._pending[key] = self._executor.submit(self._prewarm_one, title, key)
+
+    def _prewarm_one(self, title: str, key: str):
+        try:
+            if self._load(key, datetime.now(), touch=False):
+                return
+            self.put(title, self.generator(title))
+            self._count("prewarmed")
+        except Exception as e:
+            print(f"Recipe prewarm skipped for '{title}': {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _refresh_if_stale(self, title: str, key: str, refreshed_at: datetime, now: datetime):
+        if not self.generator or now - refreshed_at < self.refresh_after:
+            return
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending[key] = self._executor.submit(self._refresh_one, title, key)
+
+    def _refresh_one(self, title: str, key: str):
+        try:
+            self.put(title, self.generator(title))
+            self._count("refreshes")
+        except Exception as e:
+            print(f"Recipe refresh failed for '{title}', keeping cached copy: {e}")
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    # Storage helpers
+
+    def _remember(self, key: str, recipe: FullRecipe, refreshed_at: datetime):
+        with self._lock:
+            self._memory[key] = (recipe, refreshed_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _load(self, key: str, now: datetime, touch: bool = True) -> Optional[Tuple[FullRecipe, datetime]]:
+        db = SessionLocal()
+        try:
+            entry = db.query(RecipeCacheEntry).filter(RecipeCacheEntry.normalized_title == key).first()
+            if not entry:
+                return None
+            if now - entry.refreshed_at >= self.ttl:
+                db.delete(entry)
+                db.commit()
+                return None
+            recipe = FullRecipe.model_validate_json(entry.recipe_json)
+            refreshed_at = entry.refreshed_at
+            if touch and now - entry.last_accessed_at >= self.touch_interval:
+                # Sampled: hit_count counts these touches, not every read
+                entry.hit_count = (entry.hit_count or 0) + 1
+                entry.last_accessed_at = now
+                db.commit()
+            return recipe, refreshed_at
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Could not read cached recipe '{key}': {e}")
+            return None
+        finally:
+            db.close()
+
+    def _enforce_size_cap(self, db):
+        """Evict least recently accessed rows beyond max_entries"""
+        overflow = db.query(RecipeCacheEntry).count() - self.max_entries
+        if overflow <= 0:
+            return
+        stale_ids = [
+            row.id for row in db.query(RecipeCacheEntry.id)
+            .order_by(RecipeCacheEntry.last_accessed_at.asc())
+            .limit(overflow)
+        ]
+        db.query(RecipeCacheEntry).filter(RecipeCacheEntry.id.in_(stale_ids)).delete(synchronize_session=False)
+        db.commit()
+
+    def _count(self, metric: str):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.metrics, "memory_entries": len(self._memory), "pending": len(self._pending)}
@@ -0,0 +1,273 @@
+# Resilience layer for Gemini calls
+# Retries with exponential backoff + jitter, optional hedged requests after a
+# latency percentile, and a circuit breaker that fails fast while the API is down
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+try:
+    from google.api_core import exceptions as google_exceptions
+    RETRYABLE_API_ERRORS = (
+        google_exceptions.TooManyRequests,
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.GatewayTimeout,
+    )
+except ImportError:
+    RETRYABLE_API_ERRORS = ()
+
+RETRYABLE_ERRORS = RETRYABLE_API_ERRORS + (ConnectionError, TimeoutError)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the API while the circuit breaker is open"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient provider/network errors; bad requests and auth failures are not retried"""
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: sleep uniform(0, min(max_delay, base * 2**n))"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 4.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, retry_number: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry_number)))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies (seconds)"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at `pct` (0-100), or None until enough samples are collected"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures.
+    Open -> half-open once `reset_timeout` seconds pass; a single trial call is
+    let through and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.metrics = {"opened": 0, "short_circuited": 0, "failures": 0, "successes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected (half-open with a trial already running counts as open)"""
+        with self._lock:
+            state = self._current_state()
+            return state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_flight)
+
+    def allow(self) -> bool:
+        """Whether a call may proceed; reserves the trial slot when half-open"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.metrics["short_circuited"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.metrics["successes"] += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.metrics["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.metrics["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": retry_in,
+                **self.metrics,
+            }
+
+
+class ResilientCaller:
+    """
+    Wraps a blocking API call with the circuit breaker, retries and hedging.
+
+    Hedging (off unless `hedge_percentile` is set) starts a duplicate request
+    when the first one is slower than that percentile of recent latencies and
+    returns whichever finishes first. Streaming calls are never hedged, so callers
+    pass hedge=False for them, which also keeps them out of the latency percentiles.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: Optional[CircuitBreaker] = None,
+        retry: Optional[RetryPolicy] = None,
+        hedge_percentile: Optional[float] = None,
+        hedge_workers: int = 8,
+    ):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.retry = retry or RetryPolicy()
+        self.hedge_percentile = hedge_percentile
+        self.latency = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix=f"{name}-hedge") \
+            if hedge_percentile else None
+        self._lock = threading.Lock()
+        self.metrics = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+    @classmethod
+    def from_env(cls, name: str = "gemini") -> "ResilientCaller":
+        hedge_percentile = float(os.getenv("GEMINI_HEDGE_PERCENTILE", 0)) or None
+        return cls(
+            name,
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", 5)),
+                reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", 30)),
+            ),
+            retry=RetryPolicy(
+                max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", 3)),
+                base_delay=float(os.getenv("GEMINI_RETRY_BASE_DELAY", 0.5)),
+                max_delay=float(os.getenv("GEMINI_RETRY_MAX_DELAY", 4)),
+            ),
+            hedge_percentile=hedge_percentile,
+        )
+
+    def call(self, func: Callable, *args, hedge: bool = True, **kwargs) -> Any:
+        """Run func(*args, **kwargs); raises CircuitOpenError when the breaker rejects the call"""
+        self._count("calls")
+        for attempt in range(self.retry.max_attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit is open, skipping API call")
+            self._count("attempts")
+            started = time.monotonic()
+            try:
+                if hedge and self._executor:
+                    result = self._hedged(func, args, kwargs)
+                else:
+                    result = func(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The API answered; a bad request says nothing about its health
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt + 1 >= self.retry.max_attempts:
+                    raise
+                delay = self.retry.delay(attempt)
+                print(f"{self.name} call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                self._count("retries")
+                time.sleep(delay)
+                continue
+
+            if hedge:
+                # Only hedgeable calls set the hedge threshold; a stream's time to open says nothing about it
+                self.latency.record(time.monotonic() - started)
+            self.breaker.record_success()
+            return result
+
+    def _hedged(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        hedge_after = self.latency.percentile(self.hedge_percentile)
+        primary = self._executor.submit(func, *args, **kwargs)
+        if hedge_after is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        backup = self._executor.submit(func, *args, **kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _count(self, metric: str):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = dict(self.metrics)
+        hedge_after = self.latency.percentile(self.hedge_percentile) if self.hedge_percentile else None
+        return {
+            "breaker": self.breaker.snapshot(),
+            "p50_latency_seconds": self.latency.percentile(50),
+            "hedge_percentile": self.hedge_percentile,
+            "hedge_after_seconds": hedge_after,
+            **metrics,
+        }
@@ -0,0 +1,52 @@
+# Single-flight deduplication for expensive AI calls
+# Concurrent requests with the same key share one in-flight call and its result
+
+import asyncio
+import inspect
+from typing import Any, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single execution.
+
+    The first caller for a key starts the work as a background task; callers
+    arriving before it finishes await the same task. Blocking functions run in
+    a worker thread so the event loop stays free while the call is in flight.
+    A caller disconnecting does not cancel the shared task for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.metrics = {"executions": 0, "shared": 0}
+
+    async def do(self, key: str, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) once per key among concurrent callers"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.metrics["shared"] += 1
+        else:
+            self.metrics["executions"] += 1
+            task = asyncio.ensure_future(self._run(func, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda finished, key=key: self._forget(key, finished))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    @staticmethod
+    async def _run(func: Callable, *args, **kwargs) -> Any:
+        if inspect.iscoroutinefunction(func):
+            return await func(*args, **kwargs)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def snapshot(self) -> Dict[str, int]:
+        return {**self.metrics, "in_flight": self.in_flight()}
@@ -0,0 +1,309 @@
+# Static AI content served from memory
+# Canned and fallback payloads are built once at import and pre-serialized to
+# JSON bytes with an ETag, so serving them (the hot path during Gemini
+# outages) skips model construction, validation and encoding
+
+import base64
+import hashlib
+import itertools
+import random
+import uuid
+from functools import lru_cache
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.core.http_cache import CACHE_CONTROL, etag_matches
+from app.schemas.ai import Affirmation, FullRecipe, MealInspiration, MealInspirationResponse, MealSuggestion
+
+PLACEHOLDER_IMAGE_URL = "https://via.placeholder.com/400x300/87C4BB/FFFFFF?text=Delicious+Meal"
+
+# Content that never changes between deploys can be cached by clients for a day
+STATIC_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+# Fallbacks and randomized content: clients must revalidate (real content may be back)
+REVALIDATE_CACHE_CONTROL = CACHE_CONTROL
+
+
+def stable_id(kind: str, title: str) -> str:
+    """Deterministic UUID for canned content so ids (and ETags) don't change per request"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"fha-recovery:{kind}:{title}"))
+
+
+class StaticPayload:
+    """Pre-serialized response body with its ETag and cache policy"""
+
+    __slots__ = ("body", "etag", "cache_control", "media_type")
+
+    def __init__(self, body: bytes, cache_control: str, media_type: str = "application/json"):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.cache_control = cache_control
+        self.media_type = media_type
+
+    def response(self, request: Optional[Request] = None) -> Response:
+        """The stored bytes, or 304 Not Modified when the client already has them"""
+        headers = {"ETag": self.etag, "Cache-Control": self.cache_control}
+        if request is not None and etag_matches(request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type=self.media_type, headers=headers)
+
+
+class StaticContentRegistry:
+    """
+    Named pre-serialized payloads. Registered model instances can also be
+    looked up by identity, so code that returns a shared canned model (e.g. a
+    fallback from deep in the Gemini client) can be answered with its bytes.
+    """
+
+    def __init__(self):
+        self._by_name: Dict[str, StaticPayload] = {}
+        self._by_model: Dict[int, tuple] = {}
+
+    def register(self, name: str, model: BaseModel, cache_control: str = STATIC_CACHE_CONTROL) -> StaticPayload:
+        payload = StaticPayload(model.model_dump_json().encode(), cache_control)
+        self._by_name[name] = payload
+        # Keep the model referenced so its id() can't be reused by another object
+        self._by_model[id(model)] = (model, payload)
+        return payload
+
+    def get(self, name: str) -> StaticPayload:
+        return self._by_name[name]
+
+    def response_for(self, model, request: Optional[Request] = None) -> Optional[Response]:
+        """Pre-serialized response for a registered model instance, or None for anything else"""
+        entry = self._by_model.get(id(model))
+        if entry is None or entry[0] is not model:
+            return None
+        return entry[1].response(request)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+
+static_content = StaticContentRegistry()
+
+
+# Placeholder meal images
+
+_FOOD_EMOJIS = {
+    'salmon': '🐟', 'fish': '🐟', 'tuna': '🐟',
+    'chicken': '🍗', 'turkey': '🍗', 'poultry': '🍗',
+    'beef': '🥩', 'steak': '🥩', 'meat': '🥩',
+    'quinoa': '🌾', 'grain': '🌾', 'rice': '🍚',
+    'bowl': '🥗', 'salad': '🥗', 'greens': '🥬',
+    'soup': '🍲', 'stew': '🍲', 'broth': '🍲',
+    'pasta': '🍝', 'noodle': '🍜', 'spaghetti': '🍝',
+    'oats': '🥣', 'oatmeal': '🥣', 'porridge': '🥣',
+    'smoothie': '🥤', 'shake': '🥤', 'drink': '🥤',
+    'avocado': '🥑', 'toast': '🍞', 'bread': '🍞',
+    'eggs': '🥚', 'egg': '🥚', 'omelet': '🥚',
+    'vegetables': '🥬', 'veggie': '🥬', 'greens': '🥬',
+    'fruit': '🍓', 'berry': '🍓', 'apple': '🍎',
+    'nuts': '🥜', 'almond': '🥜', 'walnut': '🥜',
+    'yogurt': '🥛', 'dairy': '🥛', 'milk': '🥛',
+    'sweet potato': '🍠', 'potato': '🥔',
+    'pancake': '🥞', 'waffle': '🧇'
+}
+
+
+@lru_cache(maxsize=512)
+def fallback_svg_image(meal_title: str) -> str:
+    """SVG data URL placeholder for a meal (cached per title)"""
+    title_lower = meal_title.lower()
+    emoji = '🍽️'  # Default plate emoji
+    for keyword, food_emoji in _FOOD_EMOJIS.items():
+        if keyword in title_lower:
+            emoji = food_emoji
+            break
+
+    svg_content = f'''
+    <svg width="300" height="200" xmlns="http://www.w3.org/2000/svg">
+        <defs>
+            <linearGradient id="bgGrad" x1="0%" y1="0%" x2="100%" y2="100%">
+                <stop offset="0%" style="stop-color:#F0F8F7;stop-opacity:1" />
+                <stop offset="50%" style="stop-color:#FFF5F3;stop-opacity:1" />
+                <stop offset="100%" style="stop-color:#F5F0FF;stop-opacity:1" />
+            </linearGradient>
+            <linearGradient id="borderGrad" x1="0%" y1="0%" x2="100%" y2="100%">
+                <stop offset="0%" style="stop-color:#87C4BB;stop-opacity:0.4" />
+                <stop offset="100%" style="stop-color:#C1A7E1;stop-opacity:0.4" />
+            </linearGradient>
+            <filter id="shadow" x="-20%" y="-20%" width="140%" height="140%">
+                <feDropShadow dx="0" dy="2" stdDeviation="4" flood-color="#87C4BB" flood-opacity="0.1"/>
+            </filter>
+        </defs>
+        <rect width="300" height="200" fill="url(#bgGrad)" stroke="url(#borderGrad)" stroke-width="2" rx="16" filter="url(#shadow)"/>
+        <circle cx="150" cy="75" r="35" fill="#87C4BB" fill-opacity="0.1"/>
+        <text x="150" y="85" font-family="system-ui, -apple-system, sans-serif" font-size="42" text-anchor="middle" fill="#333">{emoji}</text>
+        <text x="150" y="130" font-family="system-ui, -apple-system, sans-serif" font-size="16" text-anchor="middle" fill="#333" font-weight="600">{meal_title[:28]}</text>
+        <text x="150" y="150" font-family="system-ui, -apple-system, sans-serif" font-size="13" text-anchor="middle" fill="#87C4BB" font-weight="500">Nourishing Choice</text>
+        <circle cx="50" cy="170" r="3" fill="#FFB4A2" fill-opacity="0.6"/>
+        <circle cx="250" cy="30" r="2" fill="#C1A7E1" fill-opacity="0.6"/>
+        <circle cx="270" cy="170" r="2.5" fill="#87C4BB" fill-opacity="0.6"/>
+    </svg>
+    '''
+
+    svg_base64 = base64.b64encode(svg_content.encode('utf-8')).decode('utf-8')
+    return f"data:image/svg+xml;base64,{svg_base64}"
+
+
+# Fallback meal inspiration: every 3-of-6 combination is prebuilt and serialized
+
+_FALLBACK_SUGGESTIONS = [
+    MealInspiration(
+        id=stable_id("inspiration", title),
+        title=title,
+        description=description,
+        image_url=PLACEHOLDER_IMAGE_URL,
+        prep_time=prep_time,
+        nutrition_highlights=nutrition_highlights,
+        why_recommended=why_recommended
+    )
+    for title, description, prep_time, nutrition_highlights, why_recommended in [
+        ("Mediterranean Chickpea Pasta",
+         "Hearty pasta with chickpeas, olives, tomatoes, and fresh herbs.",
+         "20 minutes",
+         "Plant-based protein from chickpeas and complex carbs for sustained energy.",
+         "A satisfying meal that provides both protein and carbohydrates for recovery."),
+        ("Loaded Sweet Potato Toast",
+         "Thick sweet potato slices topped with avocado, eggs, and seeds.",
+         "15 minutes",
+         "Healthy fats from avocado and complete protein from eggs support hormone production.",
+         "Perfect balance of nutrients in a delicious, Instagram-worthy format."),
+        ("Thai Coconut Curry Bowl",
+         "Creamy coconut curry with vegetables and jasmine rice.",
+         "25 minutes",
+         "Coconut provides healthy saturated fats while spices boost metabolism.",
+         "Warming spices and rich coconut milk make this both nourishing and comforting."),
+        ("Breakfast Burrito Bowl",
+         "Scrambled eggs with black beans, cheese, and fresh salsa.",
+         "12 minutes",
+         "High-protein combination supports muscle recovery and stable blood sugar.",
+         "A hearty breakfast that keeps you satisfied and energized all morning."),
+        ("Mushroom Risotto",
+         "Creamy arborio rice with mixed mushrooms and parmesan.",
+         "30 minutes",
+         "Complex carbs from rice and B-vitamins from mushrooms support energy production.",
+         "A comforting, calorie-dense meal perfect for evening nourishment."),
+        ("Peanut Butter Banana Pancakes",
+         "Fluffy pancakes with natural peanut butter and sliced banana.",
+         "18 minutes",
+         "Healthy fats from peanut butter and natural sugars provide quick energy.",
+         "A delicious way to start the day with adequate calories and satisfaction."),
+    ]
+]
+
+_FALLBACK_INSPIRATIONS = [
+    MealInspirationResponse(
+        suggestions=list(combination),
+        daily_analysis="Your meal choices show great intention toward nourishing your body.",
+        encouragement="Keep up the wonderful work of fueling yourself with care and intention!"
+    )
+    for combination in itertools.combinations(_FALLBACK_SUGGESTIONS, 3)
+]
+for _number, _inspiration in enumerate(_FALLBACK_INSPIRATIONS):
+    static_content.register(f"fallback-inspiration-{_number}", _inspiration, REVALIDATE_CACHE_CONTROL)
+
+
+def fallback_inspiration() -> MealInspirationResponse:
+    """One of the prebuilt fallback inspirations (shared instance; don't mutate)"""
+    return random.choice(_FALLBACK_INSPIRATIONS)
+
+
+# Fallback recipe: everything except the title is shared
+
+_FALLBACK_RECIPE = FullRecipe(
+    title="",
+    description="A nourishing and delicious meal that supports your recovery journey.",
+    prep_time="15 minutes",
+    cook_time="20 minutes",
+    servings=2,
+    ingredients=[
+        "2 cups main ingredient",
+        "1 tbsp healthy oil",
+        "1/2 cup vegetables",
+        "Herbs and spices to taste",
+        "Optional protein source"
+    ],
+    instructions=[
+        "Prepare all ingredients",
+        "Heat oil in a pan",
+        "Cook main ingredients until tender",
+        "Season with herbs and spices",
+        "Serve warm and enjoy mindfully"
+    ],
+    nutrition_notes="This meal provides balanced nutrition to support your body's healing and energy needs.",
+    tips=[
+        "Feel free to customize with your favorite vegetables",
+        "Add extra healthy fats like avocado or nuts",
+        "Listen to your body's hunger and fullness cues"
+    ],
+    encouragement="You're taking such good care of yourself by preparing nourishing meals!"
+)
+
+
+def fallback_recipe(meal_title: str) -> FullRecipe:
+    return _FALLBACK_RECIPE.model_copy(update={"title": meal_title})
+
+
+# Canned meal suggestion and daily affirmations
+
+MEAL_SUGGESTION = MealSuggestion(
+    title="Nourishing Quinoa Bowl",
+    description=(
+        "A gentle, nutrient-dense meal perfect for your recovery journey"
+    ),
+    ingredients=[
+        "1/2 cup quinoa",
+        "1/4 avocado, sliced",
+        "1/2 cup steamed broccoli",
+        "1 tbsp olive oil",
+        "1 tbsp pumpkin seeds",
+        "Fresh herbs to taste",
+    ],
+    instructions=[
+        "Cook quinoa according to package instructions",
+        "Steam broccoli until tender",
+        "Combine quinoa and broccoli in a bowl",
+        "Top with avocado slices and pumpkin seeds",
+        "Drizzle with olive oil and herbs",
+        "Enjoy mindfully",
+    ],
+    nutrition_notes=(
+        "Rich in healthy fats, protein, and micronutrients to support "
+        "hormonal health"
+    ),
+    encouragement=(
+        "This meal provides gentle nourishment for your body's healing "
+        "process"
+    ),
+)
+static_content.register("meal-suggestion", MEAL_SUGGESTION)
+
+AFFIRMATIONS = [
+    Affirmation(
+        text=text,
+        category="self-love",
+        encouragement=(
+            "Remember: healing is not linear, and every day you choose "
+            "recovery is a victory."
+        ),
+    )
+    for text in [
+        "I am worthy of healing and recovery",
+        "My body is strong and capable of restoration",
+        "I honor my journey with patience and compassion",
+        "Every small step forward is progress",
+        "I trust my body's wisdom and timing",
+        "I am deserving of gentle care and nourishment",
+        "My recovery is a beautiful act of self-love",
+    ]
+]
+for _number, _affirmation in enumerate(AFFIRMATIONS):
+    static_content.register(f"affirmation-{_number}", _affirmation, REVALIDATE_CACHE_CONTROL)
+
+
+def random_affirmation() -> Affirmation:
+    return random.choice(AFFIRMATIONS)
@@ -0,0 +1,113 @@
+# Structured (JSON mode) output for Gemini calls
+# Response schemas sent with each request, plus a parser that validates the
+# raw text in one pass and only falls back to tolerant repair when needed
+
+from typing import Optional, Type, TypeVar
+
+import google.generativeai as genai
+from pydantic import BaseModel, ValidationError
+
+from app.core.json_stream import parse_json_tolerant
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _string(description: Optional[str] = None) -> dict:
+    schema = {"type": "STRING"}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def _string_list() -> dict:
+    return {"type": "ARRAY", "items": {"type": "STRING"}}
+
+
+ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "analysis": _string("Encouraging 2-3 sentence analysis of the meal"),
+        "estimated_calories": {"type": "INTEGER", "description": "Estimated calories for the whole meal"},
+    },
+    "required": ["analysis", "estimated_calories"],
+}
+
+BATCH_ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "analyses": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "index": {"type": "INTEGER", "description": "Number of the meal being analyzed"},
+                    **ANALYSIS_RESPONSE_SCHEMA["properties"],
+                },
+                "required": ["index", "analysis", "estimated_calories"],
+            },
+        },
+    },
+    "required": ["analyses"],
+}
+
+INSPIRATION_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "daily_analysis": _string(),
+        "encouragement": _string(),
+        "suggestions": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "title": _string(),
+                    "description": _string(),
+                    "prep_time": _string(),
+                    "nutrition_highlights": _string(),
+                    "why_recommended": _string(),
+                },
+                "required": ["title", "description", "prep_time", "nutrition_highlights", "why_recommended"],
+            },
+        },
+    },
+    "required": ["daily_analysis", "encouragement", "suggestions"],
+}
+
+RECIPE_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "title": _string(),
+        "description": _string(),
+        "prep_time": _string(),
+        "cook_time": _string(),
+        "servings": {"type": "INTEGER"},
+        "ingredients": _string_list(),
+        "instructions": _string_list(),
+        "nutrition_notes": _string(),
+        "tips": _string_list(),
+        "encouragement": _string(),
+    },
+    "required": [
+        "title", "description", "prep_time", "cook_time", "servings",
+        "ingredients", "instructions", "nutrition_notes", "tips", "encouragement",
+    ],
+}
+
+
+def json_output_config(schema: dict) -> genai.GenerationConfig:
+    """Generation config asking Gemini for JSON matching `schema`"""
+    return genai.GenerationConfig(response_mime_type="application/json", response_schema=schema)
+
+
+def parse_model(text: str, model: Type[ModelT]) -> ModelT:
+    """
+    Validate a JSON response straight into `model`.
+
+    Well-formed JSON-mode output takes the single-pass pydantic path; fenced,
+    prose-wrapped or truncated text is repaired first. Raises ValueError
+    (including pydantic's ValidationError) when neither works.
+    """
+    try:
+        return model.model_validate_json(text)
+    except ValidationError:
+        return model.model_validate(parse_json_tolerant(text))
@@ -0,0 +1,206 @@
+# Columnar snapshots of the daily tracking time series
+# An export job streams daily_tracking into a dense (users, days, channels)
+# float32 .npy file; readers memory-map it, so batch analytics and model
+# scoring slice thousands of users' windows without touching the database.
+#
+# Layout of a snapshot directory:
+#   series.npy     float32 (users, days, channels), NaN for missing values
+#   users.npy      sorted user ids, row order of series.npy
+#   manifest.json  date range, channel names, row counts
+#   tracking.parquet  optional long-format copy (needs pyarrow or fastparquet)
+# <root>/LATEST names the newest complete snapshot.
+
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+from app.models.daily_tracking import DailyTracking
+
+SNAPSHOT_DIR = Path(os.getenv("TRACKING_SNAPSHOT_DIR", "./snapshots"))
+SNAPSHOT_KEEP = int(os.getenv("TRACKING_SNAPSHOT_KEEP", 3))
+
+# The first three channels are in LSTM feature order
+CHANNELS = ("calorie_deficit", "heart_rate_variability", "body_temperature", "total_calories")
+
+_LATEST = "LATEST"
+
+
+def write_snapshot(
+    db: Session,
+    root: Optional[Union[str, Path]] = None,
+    days: int = 365,
+    end_date: Optional[date] = None,
+    parquet: bool = False,
+    batch_size: int = 10000,
+) -> Path:
+    """
+    Export the last `days` days (ending end_date, default today) for every
+    user with tracking data. Rows are streamed into a memory-mapped output, so
+    memory use stays flat however many users there are. The snapshot is
+    published atomically by renaming its directory and updating LATEST.
+    """
+    root = Path(root or SNAPSHOT_DIR)
+    end_date = end_date or date.today()
+    start_date = end_date - timedelta(days=days - 1)
+    in_range = and_(DailyTracking.tracking_date >= start_date, DailyTracking.tracking_date <= end_date)
+
+    users = np.array(sorted(
+        row[0] for row in db.query(DailyTracking.user_id).filter(in_range).distinct()
+    ), dtype=str)
+
+    snapshot_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    staging = root / f".{snapshot_id}.tmp"
+    staging.mkdir(parents=True, exist_ok=True)
+
+    series = np.lib.format.open_memmap(
+        staging / "series.npy", mode="w+", dtype=np.float32, shape=(users.size, days, len(CHANNELS))
+    )
+    series[:] = np.nan
+
+    columns = [getattr(DailyTracking, channel) for channel in CHANNELS]
+    query = (
+        db.query(DailyTracking.user_id, DailyTracking.tracking_date, *columns)
+        .filter(in_range)
+        .order_by(DailyTracking.user_id)
+        .yield_per(batch_size)
+    )
+
+    rows_written = 0
+    long_format = []  # Only kept for the optional Parquet copy
+    batch = []
+    for row in query:
+        batch.append(tuple(row))
+        if len(batch) >= batch_size:
+            rows_written += _write_batch(series, users, start_date, batch)
+            long_format.extend(batch if parquet else ())
+            batch = []
+    rows_written += _write_batch(series, users, start_date, batch)
+    long_format.extend(batch if parquet else ())
+    series.flush()
+    del series
+
+    np.save(staging / "users.npy", users)
+    manifest = {
+        "snapshot_id": snapshot_id,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "days": days,
+        "users": int(users.size),
+        "rows": rows_written,
+        "channels": list(CHANNELS),
+        "created_at": datetime.now().isoformat(),
+    }
+    if parquet:
+        manifest["parquet"] = _write_parquet(staging / "tracking.parquet", long_format)
+    (staging / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    final = root / snapshot_id
+    os.replace(staging, final)
+    pointer = root / f".{_LATEST}.tmp"
+    pointer.write_text(snapshot_id)
+    os.replace(pointer, root / _LATEST)
+    _prune(root, keep=SNAPSHOT_KEEP)
+    return final
+
+
+def _write_batch(series: np.ndarray, users: np.ndarray, start_date: date, batch: List[tuple]) -> int:
+    if not batch:
+        return 0
+    user_ids, dates, *values = zip(*batch)
+    user_rows = np.searchsorted(users, np.asarray(user_ids, dtype=str))
+    day_columns = (np.asarray(dates, dtype="datetime64[D]") - np.datetime64(start_date, "D")).astype(np.int64)
+    # None -> NaN
+    series[user_rows, day_columns, :] = np.array(values, dtype=np.float64).T
+    return len(batch)
+
+
+def _write_parquet(path: Path, rows: List[tuple]) -> bool:
+    try:
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=["user_id", "tracking_date", *CHANNELS])
+        frame.to_parquet(path, index=False)
+        return True
+    except (ImportError, ValueError) as e:
+        print(f"❌ Skipping Parquet export (install pyarrow or fastparquet): {e}")
+        return False
+
+
+def _prune(root: Path, keep: int):
+    snapshots = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in snapshots[:-keep] if keep > 0 else []:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class TrackingSnapshot:
+    """
+    Read-only, memory-mapped view of one snapshot. Slices of `series` are
+    views into the mapped file; only pages actually touched are read.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / "manifest.json").read_text())
+        self.start_date = date.fromisoformat(self.manifest["start_date"])
+        self.end_date = date.fromisoformat(self.manifest["end_date"])
+        self.channels = tuple(self.manifest["channels"])
+        self.users = np.load(self.path / "users.npy")
+        self.series = np.load(self.path / "series.npy", mmap_mode="r")
+        self._rows: Dict[str, int] = {user_id: row for row, user_id in enumerate(self.users.tolist())}
+
+    @classmethod
+    def latest(cls, root: Optional[Union[str, Path]] = None) -> "TrackingSnapshot":
+        root = Path(root or SNAPSHOT_DIR)
+        pointer = root / _LATEST
+        if not pointer.exists():
+            raise FileNotFoundError(f"No tracking snapshot found in {root}; run export_tracking_snapshot.py")
+        return cls(root / pointer.read_text().strip())
+
+    @property
+    def age_seconds(self) -> float:
+        return time.time() - (self.path / "manifest.json").stat().st_mtime
+
+    def has_user(self, user_id: str) -> bool:
+        return user_id in self._rows
+
+    def channel(self, name: str) -> np.ndarray:
+        """(users, days) view of one metric"""
+        return self.series[:, :, self.channels.index(name)]
+
+    def _day_slice(self, days: int, end_date: Optional[date]) -> slice:
+        end = self.series.shape[1] if end_date is None else (end_date - self.start_date).days + 1
+        if days > end or end > self.series.shape[1]:
+            raise ValueError(f"Window of {days} days ending {end_date} is outside the snapshot")
+        return slice(end - days, end)
+
+    def windows(self, days: int, end_date: Optional[date] = None,
+                channels: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        (users, days, channels) window for every user, ending on end_date
+        (default: the snapshot's last day). Zero-copy when the requested
+        channels are a contiguous run, e.g. the three LSTM features.
+        """
+        day_slice = self._day_slice(days, end_date)
+        if channels is None:
+            return self.series[:, day_slice, :]
+        indices = [self.channels.index(name) for name in channels]
+        if indices == list(range(indices[0], indices[0] + len(indices))):
+            return self.series[:, day_slice, indices[0]:indices[-1] + 1]
+        return self.series[:, day_slice][:, :, indices]
+
+    def user_windows(self, user_ids: Sequence[str], days: int, end_date: Optional[date] = None,
+                     channels: Optional[Sequence[str]] = None) -> np.ndarray:
+        """Windows for specific users (copies their rows); raises KeyError for unknown users"""
+        rows = np.array([self._rows[user_id] for user_id in user_ids], dtype=np.int64)
+        return self.windows(days, end_date, channels)[rows]
+
+    def observed_days(self, window: np.ndarray) -> np.ndarray:
+        """Days per user with at least one recorded value in a (users, days, channels) window"""
+        return np.count_nonzero(~np.isnan(window).all(axis=2), axis=1)
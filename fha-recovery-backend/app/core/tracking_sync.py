@@ -0,0 +1,55 @@
+# Keeps DailyTracking in step with rows logged through other routers
+# Callers own the transaction: these helpers only stage changes on the session
+from datetime import date
+
+from sqlalchemy import and_, func, update
+from sqlalchemy.orm import Session
+
+from app.core.database import dialect_insert
+from app.core.metric_rollups import TrackingValues, apply_tracking_change
+from app.models.daily_tracking import DailyTracking
+
+
+def _tracking_filter(user_id: str, tracking_date: date):
+    return and_(
+        DailyTracking.user_id == user_id,
+        DailyTracking.tracking_date == tracking_date
+    )
+
+
+def _ensure_tracking_row(db: Session, user_id: str, tracking_date: date):
+    """Insert an empty row for the day unless one exists (a concurrent insert is not an error)"""
+    statement = dialect_insert(db.get_bind().dialect.name, DailyTracking.__table__).values(
+        user_id=user_id, tracking_date=tracking_date, total_calories=0
+    )
+    db.execute(statement.on_conflict_do_nothing(index_elements=["user_id", "tracking_date"]))
+
+
+def get_or_create_tracking(db: Session, user_id: str, tracking_date: date) -> DailyTracking:
+    """Fetch the user's tracking row for a day, adding an empty one if missing"""
+    entry = db.query(DailyTracking).filter(_tracking_filter(user_id, tracking_date)).first()
+
+    if not entry:
+        _ensure_tracking_row(db, user_id, tracking_date)
+        entry = db.query(DailyTracking).filter(_tracking_filter(user_id, tracking_date)).one()
+    return entry
+
+
+def add_meal_calories(db: Session, user_id: str, meal_date: date, calories: int):
+    """Add a logged meal's calories to that day's total (atomic, so concurrent meals all count)"""
+    _ensure_tracking_row(db, user_id, meal_date)
+    db.execute(
+        update(DailyTracking)
+        .where(_tracking_filter(user_id, meal_date))
+        .values(total_calories=func.coalesce(DailyTracking.total_calories, 0) + calories)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def sync_body_temperature(db: Session, user_id: str, reading_date: date, temperature: float) -> DailyTracking:
+    """Mirror the latest BBT reading for a day onto the tracking row"""
+    entry = get_or_create_tracking(db, user_id, reading_date)
+    before = TrackingValues.of(entry)
+    entry.body_temperature = temperature
+    apply_tracking_change(db, user_id, before, TrackingValues.of(entry))
+    return entry
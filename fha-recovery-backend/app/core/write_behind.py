@@ -0,0 +1,251 @@
+# Optional write-behind buffer for bursty daily tracking updates
+# Meal logging fires several calorie/health-metric PATCHes for the same day in
+# quick succession. With TRACKING_WRITE_BEHIND_ENABLED=true, those updates are
+# merged in memory per (user_id, tracking_date) and written by a background
+# thread as one upsert per user every TRACKING_WRITE_BEHIND_MAX_DELAY_MS.
+#
+# Single worker only: the buffer lives in one process's memory. Under several
+# workers, another worker reading or writing the same rows misses the pending
+# updates, and a later flush overwrites its newer values. start() refuses to
+# run when WEB_CONCURRENCY (read by uvicorn and gunicorn) asks for more than one
+# worker; don't enable it alongside `--workers N` either.
+#
+# Guarantees (within that one process):
+#   - read-your-writes: anything that reads or directly writes a user's
+#     tracking rows calls tracking_write_buffer.flush(user_id) first
+#   - pending updates are flushed on shutdown (app.main) and when the buffer
+#     holds TRACKING_WRITE_BEHIND_MAX_PENDING days
+#   - a crash loses at most MAX_DELAY_MS worth of buffered updates; leave the
+#     buffer disabled where that is not acceptable
+#
+# Only updates to rows that already exist are buffered, so responses always
+# have a real id; clearing a field (explicit null) is also written through.
+
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+
+from app.core.bbt_analytics import bbt_analytics_cache
+from app.core.database import SessionLocal, dialect_insert, new_revision
+from app.core.metric_rollups import TrackingValues, apply_tracking_changes
+from app.models.daily_tracking import DailyTracking
+
+WRITE_BEHIND_ENABLED = os.getenv("TRACKING_WRITE_BEHIND_ENABLED", "false").lower() == "true"
+WRITE_BEHIND_MAX_DELAY_MS = int(os.getenv("TRACKING_WRITE_BEHIND_MAX_DELAY_MS", 500))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("TRACKING_WRITE_BEHIND_MAX_PENDING", 1000))
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", 1))
+
+# Columns the buffer may set; everything else goes through the normal write path
+BUFFERED_FIELDS = ("body_temperature", "heart_rate_variability", "total_calories", "calorie_deficit", "daily_notes")
+
+_table = DailyTracking.__table__
+
+
+@dataclass
+class PendingUpdate:
+    """Merged, not yet written changes to one tracking row"""
+    values: Dict[str, object] = field(default_factory=dict)  # Absolute values, last write wins
+    calories_delta: int = 0  # Added on top of the stored total_calories
+    queued_at: float = field(default_factory=time.monotonic)
+
+    def set_values(self, values: Dict[str, object]):
+        self.values.update(values)
+        if "total_calories" in values:
+            self.calories_delta = 0
+
+    def add_calories(self, calories: int):
+        if "total_calories" in self.values:
+            self.values["total_calories"] += calories
+        else:
+            self.calories_delta += calories
+
+    def merge(self, other: "PendingUpdate"):
+        """Fold in updates that were queued after this one"""
+        self.set_values(other.values)
+        self.add_calories(other.calories_delta)
+        self.queued_at = min(self.queued_at, other.queued_at)
+
+    def apply_to(self, entry: DailyTracking):
+        """Overlay the pending changes on a loaded row"""
+        for name, value in self.values.items():
+            setattr(entry, name, value)
+        if self.calories_delta:
+            entry.total_calories = (entry.total_calories or 0) + self.calories_delta
+
+
+class TrackingWriteBuffer:
+    """Coalesces tracking updates per (user_id, tracking_date) and flushes them in the background"""
+
+    def __init__(self, enabled: bool = WRITE_BEHIND_ENABLED, max_delay_ms: int = WRITE_BEHIND_MAX_DELAY_MS,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING):
+        self.enabled = enabled
+        self.max_delay = max_delay_ms / 1000
+        self.max_pending = max_pending
+        self._pending: Dict[Tuple[str, date], PendingUpdate] = {}
+        self._lock = threading.Lock()
+        # Held while writing, so a flush(user_id) also waits for that user's in-flight batch
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.rows_written = 0
+
+    def start(self):
+        if self.enabled and SERVER_WORKERS > 1:
+            # Pending updates would be invisible to the other workers; write through instead
+            print(f"❌ Tracking write-behind buffer needs a single worker (WEB_CONCURRENCY={SERVER_WORKERS}), disabled")
+            self.enabled = False
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tracking-write-behind", daemon=True)
+        self._thread.start()
+        print(f"✅ Tracking write-behind buffer started (max delay {int(self.max_delay * 1000)} ms)")
+
+    def stop(self):
+        """Stop the background thread and write everything still pending"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=max(5.0, self.max_delay * 4))
+            self._thread = None
+        self.flush()
+
+    def enqueue(self, user_id: str, tracking_date: date, values: Optional[Dict[str, object]] = None,
+                calories_delta: int = 0) -> PendingUpdate:
+        """Queue changes for an existing row; returns everything now pending for it"""
+        update = PendingUpdate()
+        update.set_values(values or {})
+        update.add_calories(calories_delta)
+        key = (user_id, tracking_date)
+        with self._lock:
+            if key in self._pending:
+                self._pending[key].merge(update)
+            else:
+                self._pending[key] = update
+            merged = self._pending[key]
+            snapshot = PendingUpdate(dict(merged.values), merged.calories_delta, merged.queued_at)
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+        return snapshot
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _take(self, user_id: Optional[str] = None, older_than: Optional[float] = None) -> Dict[Tuple[str, date], PendingUpdate]:
+        with self._lock:
+            keys = [
+                key for key, update in self._pending.items()
+                if (user_id is None or key[0] == user_id)
+                and (older_than is None or update.queued_at <= older_than)
+            ]
+            return {key: self._pending.pop(key) for key in keys}
+
+    def _requeue(self, taken: Dict[Tuple[str, date], PendingUpdate]):
+        """Put back updates that failed to write, ahead of anything queued since"""
+        with self._lock:
+            for key, update in taken.items():
+                if key in self._pending:
+                    update.merge(self._pending[key])
+                self._pending[key] = update
+
+    def flush(self, user_id: Optional[str] = None) -> int:
+        """Write pending updates (one user's, or everyone's) now; returns rows written"""
+        if not self._pending and not self._flush_lock.locked():
+            return 0
+        with self._flush_lock:
+            return self._write(self._take(user_id))
+
+    def _write(self, taken: Dict[Tuple[str, date], PendingUpdate]) -> int:
+        if not taken:
+            return 0
+        try:
+            written = _write_updates(taken)
+        except Exception:
+            self._requeue(taken)
+            raise
+        self.flushes += 1
+        self.rows_written += written
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(timeout=self.max_delay / 2)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            # Over the size limit: write everything; otherwise only what has waited long enough
+            older_than = None if self.pending_count() >= self.max_pending else time.monotonic() - self.max_delay
+            with self._flush_lock:
+                try:
+                    self._write(self._take(older_than=older_than))
+                except Exception as e:
+                    print(f"❌ Tracking write-behind flush failed, will retry: {e}")
+
+
+def _write_updates(updates: Dict[Tuple[str, date], PendingUpdate]) -> int:
+    """One transaction; per user, one locking read and one multi-row upsert"""
+    by_user: Dict[str, List[Tuple[date, PendingUpdate]]] = defaultdict(list)
+    for (user_id, tracking_date), update in updates.items():
+        by_user[user_id].append((tracking_date, update))
+
+    db = SessionLocal()
+    try:
+        dialect_name = db.get_bind().dialect.name
+        for user_id, day_updates in by_user.items():
+            dates = [tracking_date for tracking_date, _ in day_updates]
+            current = {
+                entry.tracking_date: entry
+                for entry in db.query(DailyTracking).filter(and_(
+                    DailyTracking.user_id == user_id,
+                    or_(*[DailyTracking.tracking_date == tracking_date for tracking_date in dates])
+                )).with_for_update().all()
+            }
+
+            records = []
+            changes = []
+            for tracking_date, update in day_updates:
+                entry = current.get(tracking_date)
+                before = TrackingValues.of(entry) if entry else None
+                record = {name: getattr(entry, name) if entry else None for name in BUFFERED_FIELDS}
+                record.update(update.values)
+                if update.calories_delta:
+                    record["total_calories"] = (record["total_calories"] or 0) + update.calories_delta
+                records.append({"user_id": user_id, "tracking_date": tracking_date, "revision": new_revision(), **record})
+                changes.append((before, TrackingValues(tracking_date, **{
+                    name: record[name] for name in ("heart_rate_variability", "body_temperature", "calorie_deficit")
+                })))
+
+            with db.no_autoflush:
+                apply_tracking_changes(db, user_id, changes)
+            statement = dialect_insert(dialect_name, _table).values(records)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["user_id", "tracking_date"],
+                set_={
+                    **{name: statement.excluded[name] for name in BUFFERED_FIELDS},
+                    "revision": statement.excluded.revision,
+                    "updated_at": func.now(),
+                }
+            ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for user_id in by_user:
+        bbt_analytics_cache.invalidate(user_id)
+    return len(updates)
+
+
+tracking_write_buffer = TrackingWriteBuffer()
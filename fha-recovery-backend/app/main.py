@@ -10,8 +10,11 @@ load_dotenv(dotenv_path=env_path)
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import health, bbt, meals, ai, health_profile, daily_tracking, period_prediction, lstm_prediction
+from fastapi.responses import ORJSONResponse
+from app.routers import health, bbt, meals, ai, health_profile, daily_tracking, period_prediction, lstm_prediction, hrv
 from app.core.database import create_tables
+from app.core.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from app.core.write_behind import tracking_write_buffer
 
 app = FastAPI(
     title="FHA Recovery API",
@@ -19,8 +22,14 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson is several times faster than the stdlib encoder and serializes NumPy arrays directly
+    default_response_class=ORJSONResponse,
 )
 
+# Compress large JSON responses (Brotli if installed, else gzip); see app/core/compression.py
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
 # Configure CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -34,10 +43,17 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     create_tables()
+    tracking_write_buffer.start()
+
+# Write out buffered tracking updates before the process exits
+@app.on_event("shutdown")
+async def shutdown_event():
+    tracking_write_buffer.stop()
 
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(bbt.router, prefix="/api/bbt", tags=["bbt"])
+app.include_router(hrv.router, prefix="/api/hrv", tags=["hrv"])
 app.include_router(meals.router, prefix="/api/meals", tags=["meals"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai"])
 app.include_router(health_profile.router, prefix="/api/health-profile", tags=["health-profile"])
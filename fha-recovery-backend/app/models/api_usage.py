@@ -0,0 +1,24 @@
+# Shared API usage counters for Gemini rate limiting and budgets
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ApiUsageCounter(Base):
+    __tablename__ = "api_usage_counters"
+    __table_args__ = (
+        UniqueConstraint("scope", "endpoint", "window", name="uq_api_usage_scope_endpoint_window"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)  # "global" or "user:<user_id>"
+    endpoint = Column(String, nullable=False)  # analyze, inspiration, recipe or "all"
+    window = Column(String, nullable=False)  # e.g. "day:2025-09-13" or "minute:2025-09-13T12:30"
+    count = Column(Integer, nullable=False, default=0)
+    expires_at = Column(DateTime, nullable=False, index=True)  # When this window can be purged
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ApiUsageCounter(scope={self.scope}, endpoint={self.endpoint}, window={self.window}, count={self.count})>"
@@ -0,0 +1,24 @@
+# Basal body temperature readings; the latest reading for a day is mirrored to
+# DailyTracking.body_temperature
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class BBTReading(Base):
+    __tablename__ = "bbt_readings"
+    __table_args__ = (
+        Index("ix_bbt_readings_user_date", "user_id", "date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)  # User identifier
+    date = Column(Date, nullable=False)  # Day of the reading
+    temperature = Column(Float, nullable=False)  # Basal body temperature (°F)
+    notes = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<BBTReading(user_id={self.user_id}, date={self.date}, temp={self.temperature})>"
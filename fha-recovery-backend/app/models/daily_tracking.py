@@ -1,12 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, null
 from datetime import datetime, date
-from app.core.database import Base
+from app.core.database import Base, new_revision
 
 
 class DailyTracking(Base):
     __tablename__ = "daily_tracking"
+    __table_args__ = (
+        # One entry per user per day; also the conflict target for bulk upserts
+        UniqueConstraint("user_id", "tracking_date", name="uq_daily_tracking_user_date"),
+    )
+    # Fetch created_at/updated_at with RETURNING as part of the INSERT/UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, index=True, nullable=False)  # Foreign key to user identifier
@@ -23,9 +29,13 @@ class DailyTracking(Base):
     # Optional Notes
     daily_notes = Column(Text, nullable=True)  # Free-form notes for the day
     
+    # Replaced on every write (ETags); updated_at is too coarse on SQLite
+    revision = Column(String(32), nullable=False, default=new_revision, onupdate=new_revision)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Explicit NULL default: without one the ORM re-SELECTs updated_at after each INSERT
+    updated_at = Column(DateTime(timezone=True), default=null(), onupdate=func.now())
     
     def __repr__(self):
         return f"<DailyTracking(user_id={self.user_id}, date={self.tracking_date}, temp={self.body_temperature})>"
@@ -1,13 +1,16 @@
 from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, null
 from datetime import datetime
+from app.core.database import new_revision
 
 Base = declarative_base()
 
 
 class HealthProfile(Base):
     __tablename__ = "health_profiles"
+    # Server-generated timestamps come back from the write itself (RETURNING)
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, unique=True, index=True, nullable=False)  # User identifier
@@ -29,9 +32,13 @@ class HealthProfile(Base):
     # Survey Completion Status
     survey_completed = Column(Boolean, default=False, nullable=False)
     
+    # New value on every write; the GET routes derive their ETags from it
+    revision = Column(String(32), nullable=False, default=new_revision, onupdate=new_revision)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # NULL until the first update; the explicit default keeps it out of a post-INSERT SELECT
+    updated_at = Column(DateTime(timezone=True), default=null(), onupdate=func.now())
     
     def __repr__(self):
         return f"<HealthProfile(user_id={self.user_id}, survey_completed={self.survey_completed})>"
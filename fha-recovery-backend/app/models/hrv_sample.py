@@ -0,0 +1,63 @@
+# Raw beat-to-beat (RR interval) samples from wearables and their daily aggregates
+# Samples are stored as packed float32 blocks rather than a row per beat; the
+# daily RMSSD is mirrored to DailyTracking.heart_rate_variability
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class HRVSampleBlock(Base):
+    __tablename__ = "hrv_sample_blocks"
+    __table_args__ = (
+        Index("ix_hrv_sample_blocks_user_date", "user_id", "sample_date", "start_time"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    sample_date = Column(Date, nullable=False)  # Day of start_time
+    start_time = Column(DateTime, nullable=False)  # Client wall-clock time of the first beat
+    end_time = Column(DateTime, nullable=False)  # start_time + sum of the intervals
+    sample_count = Column(Integer, nullable=False)
+    rr_intervals = Column(LargeBinary, nullable=False)  # Little-endian float32 RR intervals (ms)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<HRVSampleBlock(user_id={self.user_id}, start={self.start_time}, samples={self.sample_count})>"
+
+
+class HRVDailyStats(Base):
+    __tablename__ = "hrv_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "sample_date", name="uq_hrv_daily_stats_user_date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    sample_date = Column(Date, nullable=False)
+
+    # Running state, updated as each block arrives
+    sample_count = Column(Integer, nullable=False, default=0)  # Accepted intervals
+    rejected_count = Column(Integer, nullable=False, default=0)  # Intervals outside the plausible range
+    rr_sum = Column(Float, nullable=False, default=0)
+    rr_sum_sq = Column(Float, nullable=False, default=0)
+    diff_count = Column(Integer, nullable=False, default=0)  # Successive differences between accepted beats
+    diff_sum_sq = Column(Float, nullable=False, default=0)
+    last_rr = Column(Float, nullable=True)  # Last interval of the latest block, if accepted
+    last_time = Column(DateTime, nullable=True)  # end_time of the latest block
+    histogram = Column(LargeBinary, nullable=True)  # uint32 counts per 1 ms bin, for percentiles
+
+    # Derived daily metrics
+    rmssd = Column(Float, nullable=True)
+    mean_rr = Column(Float, nullable=True)
+    sdnn = Column(Float, nullable=True)
+    p10_rr = Column(Float, nullable=True)
+    p50_rr = Column(Float, nullable=True)
+    p90_rr = Column(Float, nullable=True)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<HRVDailyStats(user_id={self.user_id}, date={self.sample_date}, rmssd={self.rmssd})>"
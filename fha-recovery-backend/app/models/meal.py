@@ -0,0 +1,25 @@
+# Logged meals; calories also roll up into DailyTracking.total_calories
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class Meal(Base):
+    __tablename__ = "meals"
+    __table_args__ = (
+        Index("ix_meals_user_date", "user_id", "date"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)  # User identifier
+    date = Column(Date, nullable=False)  # Day the meal was eaten
+    meal_type = Column(String, nullable=False)  # breakfast, lunch, dinner, snack
+    description = Column(Text, nullable=False)
+    calories = Column(Integer, nullable=False, default=0)
+    notes = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Meal(user_id={self.user_id}, date={self.date}, type={self.meal_type}, calories={self.calories})>"
@@ -0,0 +1,23 @@
+# Persistent cache of generated recipes keyed by normalized meal title
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class RecipeCacheEntry(Base):
+    __tablename__ = "recipe_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    normalized_title = Column(String, unique=True, index=True, nullable=False)  # Cache key
+    title = Column(String, nullable=False)  # Title as first requested
+    recipe_json = Column(Text, nullable=False)  # Serialized FullRecipe
+
+    hit_count = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime, nullable=False)  # When the recipe was last generated
+    last_accessed_at = Column(DateTime, nullable=False, index=True)  # For size-cap eviction
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<RecipeCacheEntry(normalized_title={self.normalized_title}, hits={self.hit_count})>"
@@ -0,0 +1,33 @@
+# Running sums over the trailing 7/30/60/90 days of each user's DailyTracking metrics
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class UserMetricRollup(Base):
+    __tablename__ = "user_metric_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "window_days", name="uq_user_metric_rollups_user_window"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(String, nullable=False)
+    window_days = Column(Integer, nullable=False)  # 7, 30, 60 or 90
+    as_of_date = Column(Date, nullable=False)  # Last day of the window
+
+    # Per metric: sum, count of non-null values and sum of squares (for variance)
+    hrv_sum = Column(Float, nullable=False, default=0)
+    hrv_count = Column(Integer, nullable=False, default=0)
+    hrv_sum_sq = Column(Float, nullable=False, default=0)
+    bbt_sum = Column(Float, nullable=False, default=0)
+    bbt_count = Column(Integer, nullable=False, default=0)
+    bbt_sum_sq = Column(Float, nullable=False, default=0)
+    deficit_sum = Column(Float, nullable=False, default=0)
+    deficit_count = Column(Integer, nullable=False, default=0)
+    deficit_sum_sq = Column(Float, nullable=False, default=0)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<UserMetricRollup(user_id={self.user_id}, window={self.window_days}, as_of={self.as_of_date})>"
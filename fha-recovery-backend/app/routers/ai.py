@@ -1,16 +1,33 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Optional, Iterator, Tuple, Any, List
 from app.schemas.ai import MealSuggestion, Affirmation, MealInspirationRequest, MealInspirationResponse, RecipeRequest, FullRecipe
-from app.schemas.meal_analysis import MealAnalysisRequest, MealAnalysisResponse
+from app.schemas.meal_analysis import MealAnalysisRequest, MealAnalysisResponse, MealBatchAnalysisRequest
 from app.core.gemini_client import GeminiClient
 from app.core.nutrition_optimizer import NutritionOptimizer
+from app.core.api_budget import ApiBudget
+from app.core.single_flight import SingleFlight
+from app.core.recipe_cache import RecipeCache, normalize_title
+from app.core.prompts import prompt_stats
+from app.core.static_content import static_content, fallback_inspiration, random_affirmation
+import hashlib
+import json
 import os
 
 router = APIRouter()
 
+# Shared cross-worker budget for Gemini calls
+api_budget = ApiBudget.from_env()
+
+# Concurrent identical Gemini requests share one in-flight call
+ai_single_flight = SingleFlight()
+
 # Initialize Gemini client and nutrition optimizer
 try:
     gemini_client = GeminiClient()
-    nutrition_optimizer = NutritionOptimizer(gemini_client)
+    nutrition_optimizer = NutritionOptimizer(gemini_client, api_budget, ai_single_flight)
     print("✅ Gemini client initialized successfully")
 except ValueError as e:
     print(f"❌ Failed to initialize Gemini client: {e}")
@@ -23,65 +40,17 @@ except Exception as e:
 
 
 @router.get("/meal-suggestion", response_model=MealSuggestion)
-async def get_meal_suggestion():
+async def get_meal_suggestion(http_request: Request):
     """Get AI-generated meal suggestion for FHA recovery"""
-    return MealSuggestion(
-        title="Nourishing Quinoa Bowl",
-        description=(
-            "A gentle, nutrient-dense meal perfect for your recovery journey"
-        ),
-        ingredients=[
-            "1/2 cup quinoa",
-            "1/4 avocado, sliced",
-            "1/2 cup steamed broccoli",
-            "1 tbsp olive oil",
-            "1 tbsp pumpkin seeds",
-            "Fresh herbs to taste",
-        ],
-        instructions=[
-            "Cook quinoa according to package instructions",
-            "Steam broccoli until tender",
-            "Combine quinoa and broccoli in a bowl",
-            "Top with avocado slices and pumpkin seeds",
-            "Drizzle with olive oil and herbs",
-            "Enjoy mindfully",
-        ],
-        nutrition_notes=(
-            "Rich in healthy fats, protein, and micronutrients to support "
-            "hormonal health"
-        ),
-        encouragement=(
-            "This meal provides gentle nourishment for your body's healing "
-            "process"
-        ),
-    )
+    # Served as pre-serialized bytes with an ETag; repeat visits get 304
+    return static_content.get("meal-suggestion").response(http_request)
 
 
 @router.get("/daily-affirmation", response_model=Affirmation)
-async def get_daily_affirmation():
+async def get_daily_affirmation(http_request: Request):
     """Get AI-generated daily affirmation"""
-    affirmations = [
-        "I am worthy of healing and recovery",
-        "My body is strong and capable of restoration",
-        "I honor my journey with patience and compassion",
-        "Every small step forward is progress",
-        "I trust my body's wisdom and timing",
-        "I am deserving of gentle care and nourishment",
-        "My recovery is a beautiful act of self-love",
-    ]
-
-    import random
-
-    selected_affirmation = random.choice(affirmations)
-
-    return Affirmation(
-        text=selected_affirmation,
-        category="self-love",
-        encouragement=(
-            "Remember: healing is not linear, and every day you choose "
-            "recovery is a victory."
-        ),
-    )
+    return static_content.response_for(random_affirmation(), http_request)
+
 
 
 @router.post("/analyze-meal", response_model=MealAnalysisResponse)
@@ -99,7 +68,8 @@ async def analyze_meal(request: MealAnalysisRequest):
         analysis = await nutrition_optimizer.analyze_meal_optimized(
             meal_type=request.meal_type,
             description=request.description,
-            image_base64=request.image_base64
+            image_base64=request.image_base64,
+            user_id=request.user_id
         )
         
         return analysis
@@ -115,6 +85,132 @@ async def analyze_meal(request: MealAnalysisRequest):
         )
 
 
+@router.post("/analyze-meals", response_model=List[MealAnalysisResponse])
+async def analyze_meals(request: MealBatchAnalysisRequest):
+    """Analyze several meals in one request (e.g. back-filling a day); results are returned in order"""
+    
+    if not nutrition_optimizer:
+        raise HTTPException(
+            status_code=503, 
+            detail="AI analysis service is not available. Please configure GEMINI_API_KEY."
+        )
+    
+    try:
+        # Cache hits and local estimates first, then one Gemini call for the rest
+        return await nutrition_optimizer.analyze_meals_batch(request.meals, request.user_id)
+        
+    except Exception as e:
+        print(f"Error analyzing meal batch: {str(e)}")
+        return [
+            gemini_client._create_fallback_response(meal.meal_type, f"Analysis temporarily unavailable: {str(e)}")
+            for meal in request.meals
+        ]
+
+
+def _sse_event(event: str, payload: Any) -> str:
+    """Format one Server-Sent Event; models are serialized with their schema"""
+    if isinstance(payload, BaseModel):
+        data = payload.model_dump_json()
+    elif event == "delta":
+        data = json.dumps({"text": payload})
+    elif event == "error":
+        data = json.dumps({"message": payload})
+    else:
+        data = json.dumps(payload)
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _sse_response(events: Iterator[Tuple[str, Any]]) -> StreamingResponse:
+    return StreamingResponse(
+        (_sse_event(event, payload) for event, payload in events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/analyze-meal/stream")
+async def analyze_meal_stream(request: MealAnalysisRequest):
+    """Stream a meal analysis as Server-Sent Events
+    
+    Emits "delta" events with the encouraging text as it is generated and a terminal
+    "result" event carrying the full MealAnalysisResponse.
+    """
+    
+    if not nutrition_optimizer:
+        raise HTTPException(
+            status_code=503, 
+            detail="AI analysis service is not available. Please configure GEMINI_API_KEY."
+        )
+    
+    return _sse_response(nutrition_optimizer.stream_meal_analysis(
+        meal_type=request.meal_type,
+        description=request.description,
+        image_base64=request.image_base64,
+        user_id=request.user_id
+    ))
+
+
+def _stream_inspiration(logged_meals: list, user_id: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+    """Budget-checked inspiration stream, falling back to a single result event"""
+    if gemini_client.circuit_open() or not api_budget.acquire("inspiration", user_id):
+        yield "result", gemini_client._create_fallback_inspiration()
+        return
+    yield from gemini_client.stream_meal_inspiration(
+        logged_meals, on_suggestion=lambda title: recipe_cache.prewarm([title])
+    )
+
+
+@router.post("/meal-inspiration/stream")
+async def get_meal_inspiration_stream(request: MealInspirationRequest):
+    """Stream personalized meal suggestions as Server-Sent Events
+    
+    Emits a "suggestion" event per MealInspiration as soon as it is parsed and a
+    terminal "result" event carrying the full MealInspirationResponse.
+    """
+    
+    if not gemini_client:
+        raise HTTPException(
+            status_code=503, 
+            detail="AI inspiration service is not available. Please configure GEMINI_API_KEY."
+        )
+    
+    return _sse_response(_stream_inspiration(request.logged_meals, request.user_id))
+
+
+def _generate_inspiration(logged_meals: list, user_id: Optional[str] = None) -> MealInspirationResponse:
+    """Spend one inspiration call from the budget, or fall back when it's exhausted or the API is down"""
+    if gemini_client.circuit_open() or not api_budget.acquire("inspiration", user_id):
+        return gemini_client._create_fallback_inspiration()
+    # Prefetch each suggestion's recipe as part of the suggestion fan-out
+    return gemini_client.generate_meal_inspiration(
+        logged_meals, on_suggestion=lambda title: recipe_cache.prewarm([title])
+    )
+
+
+def _generate_recipe(meal_title: str, user_id: Optional[str] = None) -> FullRecipe:
+    """Spend one recipe call from the budget, or fall back when it's exhausted or the API is down"""
+    if gemini_client.circuit_open() or not api_budget.acquire("recipe", user_id):
+        return gemini_client._create_fallback_recipe(meal_title)
+    recipe = gemini_client.generate_full_recipe(meal_title, fallback_on_error=False)
+    recipe_cache.put(meal_title, recipe)
+    return recipe
+
+
+def _generate_recipe_for_cache(meal_title: str) -> FullRecipe:
+    """Background generator for prewarming/refreshing cached recipes; raises instead of falling back"""
+    if not gemini_client:
+        raise RuntimeError("Gemini client is not available")
+    if gemini_client.circuit_open():
+        raise RuntimeError("Gemini circuit is open")
+    if not api_budget.acquire("recipe"):
+        raise RuntimeError("Recipe API budget exhausted")
+    return gemini_client.generate_full_recipe(meal_title, fallback_on_error=False)
+
+
+# Recipes keyed by normalized title, prewarmed from inspiration suggestions
+recipe_cache = RecipeCache(generator=_generate_recipe_for_cache)
+
+
 @router.post("/meal-inspiration", response_model=MealInspirationResponse)
 async def get_meal_inspiration(request: MealInspirationRequest):
     """Generate personalized meal suggestions based on user's daily meals"""
@@ -125,17 +221,27 @@ async def get_meal_inspiration(request: MealInspirationRequest):
             detail="AI inspiration service is not available. Please configure GEMINI_API_KEY."
         )
     
+    # While the API is down, answer straight from the prebuilt fallbacks
+    if gemini_client.circuit_open():
+        return static_content.response_for(fallback_inspiration())
+    
     try:
-        # Generate meal inspiration using Gemini
-        inspiration = gemini_client.generate_meal_inspiration(request.logged_meals)
-        return inspiration
+        # Identical meal logs already being processed share one Gemini call
+        meals_key = hashlib.md5(
+            json.dumps(request.logged_meals, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        inspiration = await ai_single_flight.do(
+            f"inspiration:{meals_key}", _generate_inspiration, request.logged_meals, request.user_id
+        )
+        # Fallbacks are returned as their pre-serialized bytes
+        return static_content.response_for(inspiration) or inspiration
         
     except Exception as e:
         # Log the error (in production, use proper logging)
         print(f"Error generating meal inspiration: {str(e)}")
         
         # Return fallback response
-        return gemini_client._create_fallback_inspiration()
+        return static_content.response_for(fallback_inspiration())
 
 
 @router.post("/generate-recipe", response_model=FullRecipe)
@@ -149,8 +255,23 @@ async def generate_recipe(request: RecipeRequest):
         )
     
     try:
-        # Generate full recipe using Gemini
-        recipe = gemini_client.generate_full_recipe(request.meal_title)
+        cached_recipe = recipe_cache.get(request.meal_title)
+        if cached_recipe:
+            return cached_recipe
+        
+        # A suggestion's recipe may still be prewarming; wait for it instead of paying twice
+        prewarm = recipe_cache.pending(request.meal_title)
+        if prewarm is not None:
+            await asyncio.shield(asyncio.wrap_future(prewarm))
+            cached_recipe = recipe_cache.get(request.meal_title)
+            if cached_recipe:
+                return cached_recipe
+        
+        # Concurrent requests for the same title share one Gemini call
+        title_key = normalize_title(request.meal_title)
+        recipe = await ai_single_flight.do(
+            f"recipe:{title_key}", _generate_recipe, request.meal_title, request.user_id
+        )
         return recipe
         
     except Exception as e:
@@ -159,3 +280,23 @@ async def generate_recipe(request: RecipeRequest):
         
         # Return fallback response
         return gemini_client._create_fallback_recipe(request.meal_title)
+
+
+@router.get("/usage")
+async def get_api_usage(user_id: Optional[str] = None):
+    """Get shared Gemini API quota usage and limiter metrics"""
+    usage = api_budget.usage_snapshot(user_id)
+    usage["single_flight"] = ai_single_flight.snapshot()
+    usage["recipe_cache"] = recipe_cache.snapshot()
+    usage["prompt_tokens"] = prompt_stats.snapshot()
+    return usage
+
+
+@router.get("/health")
+async def get_ai_health():
+    """Get Gemini circuit breaker state, retry/hedging counters and recent latency"""
+    if not gemini_client:
+        return {"status": "unavailable", "gemini": None}
+    snapshot = gemini_client.resilience.snapshot()
+    status = "degraded" if snapshot["breaker"]["state"] != "closed" else "ok"
+    return {"status": status, "gemini": snapshot}
@@ -1,38 +1,99 @@
-from fastapi import APIRouter
-from datetime import datetime, timedelta
-from app.schemas.bbt import BBTReading, BBTResponse
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc
+from datetime import date
+from typing import Optional
 
-router = APIRouter()
+from app.core.bbt_analytics import bbt_analytics_cache, get_user_analysis
+from app.core.database import get_db
+from app.core.tracking_sync import sync_body_temperature
+from app.core.write_behind import tracking_write_buffer
+from app.models.bbt_reading import BBTReading as BBTRecord
+from app.schemas.bbt import BBTReading, BBTResponse, BBTCycleSummary, BBTAnalyticsResponse
 
-# Mock data for demonstration
-mock_bbt_data = [
-    BBTReading(
-        id=i,
-        date=(datetime.now() - timedelta(days=30 - i)).date(),
-        temperature=97.0 + (i * 0.1) + (0.5 if i % 7 == 0 else 0),
-        notes=f"Reading {i+1}" if i % 5 == 0 else None,
-    )
-    for i in range(30)
-]
+router = APIRouter()
 
 
 @router.get("/", response_model=BBTResponse)
-async def get_bbt_readings():
-    """Get BBT readings for the last 30 days"""
+def get_bbt_readings(
+    user_id: str = Query(..., description="User identifier"),
+    start_date: Optional[date] = Query(None, description="Start date filter"),
+    end_date: Optional[date] = Query(None, description="End date filter"),
+    limit: int = Query(30, ge=1, le=365, description="Maximum number of readings to return"),
+    offset: int = Query(0, ge=0, description="Number of most recent readings to skip"),
+    db: Session = Depends(get_db)
+):
+    """Get BBT readings (the most recent 30 by default) in chronological order"""
+
+    filters = [BBTRecord.user_id == user_id]
+    if start_date:
+        filters.append(BBTRecord.date >= start_date)
+    if end_date:
+        filters.append(BBTRecord.date <= end_date)
+
+    total_count, average_temp = db.query(
+        func.count(BBTRecord.id),
+        func.coalesce(func.avg(BBTRecord.temperature), 0.0),
+    ).filter(*filters).one()
+
+    # Page from the newest reading backwards, then return the page oldest-first for charting
+    readings = (
+        db.query(BBTRecord)
+        .filter(*filters)
+        .order_by(desc(BBTRecord.date), desc(BBTRecord.id))
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    readings.reverse()
+
+    tracking_write_buffer.flush(user_id)
+    analysis = get_user_analysis(db, user_id)
     return BBTResponse(
-        readings=mock_bbt_data,
-        average_temp=sum(r.temperature for r in mock_bbt_data)
-        / len(mock_bbt_data),
-        cycle_length=28,  # Mock cycle length
-        fertile_window_start=14,  # Mock fertile window
-        fertile_window_end=18,
+        readings=readings,
+        average_temp=float(average_temp),
+        total_count=total_count,
+        **(analysis.summary() if analysis else {})
+    )
+
+
+@router.get("/analytics", response_model=BBTAnalyticsResponse)
+def get_bbt_analytics(
+    user_id: str = Query(..., description="User identifier"),
+    db: Session = Depends(get_db)
+):
+    """Smoothed trend, coverline and estimated phase for each day of the user's BBT history"""
+
+    tracking_write_buffer.flush(user_id)
+    analysis = get_user_analysis(db, user_id)
+    if not analysis:
+        return BBTAnalyticsResponse(user_id=user_id, summary=BBTCycleSummary(), days=[])
+
+    return BBTAnalyticsResponse(
+        user_id=user_id,
+        summary=BBTCycleSummary(**analysis.summary()),
+        days=analysis.daily(),
     )
 
 
 @router.post("/", response_model=BBTReading)
-async def create_bbt_reading(reading: BBTReading):
-    """Create a new BBT reading"""
-    # For demo purposes, just return the reading with an ID
-    reading.id = len(mock_bbt_data) + 1
-    mock_bbt_data.append(reading)
-    return reading
+def create_bbt_reading(
+    reading: BBTReading,
+    user_id: str = Query(..., description="User identifier"),
+    db: Session = Depends(get_db)
+):
+    """Record a BBT reading and mirror it onto that day's tracking entry"""
+
+    tracking_write_buffer.flush(user_id)
+    db_reading = BBTRecord(
+        user_id=user_id,
+        **reading.dict(exclude={"id", "user_id"})
+    )
+    db.add(db_reading)
+    sync_body_temperature(db, user_id, reading.date, reading.temperature)
+
+    # Reading and tracking row are committed together
+    db.commit()
+    bbt_analytics_cache.invalidate(user_id)
+
+    return db_reading
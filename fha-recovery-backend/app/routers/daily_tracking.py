@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, Header
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc, asc
 from typing import List, Optional
 from datetime import date, datetime, timedelta
 
+from app.core.bbt_analytics import bbt_analytics_cache
+from app.core.bulk_tracking import BULK_MAX_ROWS, BulkPayloadError, bulk_upsert, parse_rows
 from app.core.database import get_db
+from app.core.http_cache import not_modified, weak_etag
+from app.core.metric_rollups import ROLLUP_WINDOWS, TrackingValues, apply_tracking_change, get_rolling_stats
+from app.core.write_behind import tracking_write_buffer
+from app.models.user_metric_rollup import UserMetricRollup
 from app.models.daily_tracking import DailyTracking
 from app.schemas.daily_tracking import (
     DailyTrackingCreate,
@@ -12,12 +19,21 @@ from app.schemas.daily_tracking import (
     DailyTrackingResponse,
     DailyTrackingSummary,
     WeeklyTrackingSummary,
-    HealthMetricsUpdateRequest
+    HealthMetricsUpdateRequest,
+    RollingStatsResponse,
+    BulkTrackingResponse
 )
 
 router = APIRouter(prefix="/api/daily-tracking", tags=["daily-tracking"])
 
 
+def _buffered_response(db: Session, entry: DailyTracking, pending) -> DailyTracking:
+    """The row as it will look once the write-behind buffer flushes it"""
+    db.expunge(entry)
+    pending.apply_to(entry)
+    return entry
+
+
 @router.patch("/date/{tracking_date}/calories", response_model=DailyTrackingResponse)
 def update_daily_calories(
     tracking_date: date,
@@ -35,6 +51,13 @@ def update_daily_calories(
         )
     ).first()
     
+    if tracking_entry and tracking_write_buffer.enabled:
+        return _buffered_response(db, tracking_entry, tracking_write_buffer.enqueue(
+            user_id, tracking_date, calories_delta=calories_to_add
+        ))
+    if tracking_write_buffer.flush(user_id) and tracking_entry:
+        db.refresh(tracking_entry)
+    
     if not tracking_entry:
         # Create new entry for today
         tracking_entry = DailyTracking(
@@ -49,7 +72,6 @@ def update_daily_calories(
         tracking_entry.total_calories = current_calories + calories_to_add
     
     db.commit()
-    db.refresh(tracking_entry)
     
     return tracking_entry
 
@@ -62,6 +84,7 @@ def create_daily_tracking(
 ):
     """Create a new daily tracking entry for a user"""
     
+    tracking_write_buffer.flush(user_id)
     # Check if entry already exists for this user and date
     existing_entry = db.query(DailyTracking).filter(
         and_(
@@ -83,12 +106,58 @@ def create_daily_tracking(
     )
     
     db.add(db_tracking)
+    apply_tracking_change(db, user_id, None, TrackingValues.of(db_tracking))
     db.commit()
-    db.refresh(db_tracking)
+    bbt_analytics_cache.invalidate(user_id)
     
     return db_tracking
 
 
+async def _raw_body(request: Request) -> bytes:
+    return await request.body()
+
+
+@router.post("/bulk", response_model=BulkTrackingResponse)
+def bulk_upload_tracking(
+    user_id: str = Query(..., description="User identifier"),
+    body: bytes = Depends(_raw_body),
+    content_type: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upsert many days of metrics at once (e.g. a wearable sync).
+    
+    Accepts a JSON array, {"readings": [...]}, or NDJSON (Content-Type:
+    application/x-ndjson) of objects with tracking_date plus any of
+    body_temperature, heart_rate_variability, total_calories, calorie_deficit.
+    Omitted metrics keep their stored value. Valid rows are written in one
+    transaction; invalid rows (including NDJSON lines that aren't valid JSON)
+    are reported without failing the request.
+    """
+    
+    try:
+        rows = parse_rows(body, content_type)
+    except BulkPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if len(rows) > BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many rows ({len(rows)}); send at most {BULK_MAX_ROWS} per request"
+        )
+    
+    tracking_write_buffer.flush(user_id)
+    statuses = bulk_upsert(db, user_id, rows)
+    db.commit()
+    bbt_analytics_cache.invalidate(user_id)
+    
+    counts = {status: 0 for status in ("created", "updated", "skipped", "invalid")}
+    for row in statuses:
+        counts[row["status"]] += 1
+    
+    return BulkTrackingResponse(user_id=user_id, received=len(rows), rows=statuses, **counts)
+
+
 @router.get("/", response_model=List[DailyTrackingResponse])
 def get_daily_tracking_entries(
     user_id: str = Query(..., description="User identifier"),
@@ -99,6 +168,7 @@ def get_daily_tracking_entries(
 ):
     """Get daily tracking entries for a user with optional date filtering"""
     
+    tracking_write_buffer.flush(user_id)
     query = db.query(DailyTracking).filter(DailyTracking.user_id == user_id)
     
     if start_date:
@@ -114,25 +184,33 @@ def get_daily_tracking_entries(
 @router.get("/date/{tracking_date}", response_model=DailyTrackingResponse)
 def get_daily_tracking_by_date(
     tracking_date: date,
+    request: Request,
+    response: Response,
     user_id: str = Query(..., description="User identifier"),
     db: Session = Depends(get_db)
 ):
-    """Get daily tracking entry for a specific date"""
+    """Get daily tracking entry for a specific date (supports If-None-Match)"""
     
-    entry = db.query(DailyTracking).filter(
+    tracking_write_buffer.flush(user_id)
+    query = db.query(DailyTracking).filter(
         and_(
             DailyTracking.user_id == user_id,
             DailyTracking.tracking_date == tracking_date
         )
-    ).first()
+    )
     
-    if not entry:
+    current = query.with_entities(DailyTracking.revision).first()
+    if not current:
         raise HTTPException(
             status_code=404,
             detail=f"No tracking data found for {tracking_date}"
         )
     
-    return entry
+    cached = not_modified(request, response, weak_etag("tracking", current.revision))
+    if cached:
+        return cached
+    
+    return query.first()
 
 
 @router.put("/date/{tracking_date}", response_model=DailyTrackingResponse)
@@ -144,6 +222,7 @@ def update_daily_tracking(
 ):
     """Update daily tracking entry for a specific date"""
     
+    tracking_write_buffer.flush(user_id)
     entry = db.query(DailyTracking).filter(
         and_(
             DailyTracking.user_id == user_id,
@@ -158,12 +237,14 @@ def update_daily_tracking(
         )
     
     # Update only provided fields
+    before = TrackingValues.of(entry)
     update_data = tracking_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(entry, field, value)
+    apply_tracking_change(db, user_id, before, TrackingValues.of(entry))
     
     db.commit()
-    db.refresh(entry)
+    bbt_analytics_cache.invalidate(user_id)
     
     return entry
 
@@ -184,6 +265,12 @@ def update_health_metrics(
         )
     ).first()
     
+    update_data = health_data.dict(exclude_unset=True)
+    if entry and tracking_write_buffer.enabled and None not in update_data.values():
+        return _buffered_response(db, entry, tracking_write_buffer.enqueue(user_id, tracking_date, update_data))
+    if tracking_write_buffer.flush(user_id) and entry:
+        db.refresh(entry)
+    
     if not entry:
         # Create new entry if it doesn't exist
         entry = DailyTracking(
@@ -193,34 +280,44 @@ def update_health_metrics(
         db.add(entry)
     
     # Update health metric fields
-    update_data = health_data.dict(exclude_unset=True)
+    before = TrackingValues.of(entry)
     for field, value in update_data.items():
         setattr(entry, field, value)
+    apply_tracking_change(db, user_id, before, TrackingValues.of(entry))
     
     db.commit()
-    db.refresh(entry)
+    bbt_analytics_cache.invalidate(user_id)
     
     return entry
 
 
 @router.get("/summary", response_model=List[DailyTrackingSummary])
 def get_daily_summaries(
+    request: Request,
+    response: Response,
     user_id: str = Query(..., description="User identifier"),
     start_date: Optional[date] = Query(None, description="Start date filter"),
     end_date: Optional[date] = Query(None, description="End date filter"),
     limit: int = Query(30, ge=1, le=365, description="Maximum number of summaries to return"),
     db: Session = Depends(get_db)
 ):
-    """Get daily tracking summaries for a user"""
+    """Get daily tracking summaries for a user (supports If-None-Match)"""
     
+    tracking_write_buffer.flush(user_id)
     query = db.query(DailyTracking).filter(DailyTracking.user_id == user_id)
     
     if start_date:
         query = query.filter(DailyTracking.tracking_date >= start_date)
     if end_date:
         query = query.filter(DailyTracking.tracking_date <= end_date)
+    query = query.order_by(desc(DailyTracking.tracking_date)).limit(limit)
     
-    entries = query.order_by(desc(DailyTracking.tracking_date)).limit(limit).all()
+    revisions = [row.revision for row in query.with_entities(DailyTracking.revision)]
+    cached = not_modified(request, response, weak_etag("summary", revisions))
+    if cached:
+        return cached
+    
+    entries = query.all()
     
     summaries = []
     for entry in entries:
@@ -229,6 +326,7 @@ def get_daily_summaries(
             tracking_date=entry.tracking_date,
             body_temperature=entry.body_temperature,
             heart_rate_variability=entry.heart_rate_variability,
+            total_calories=entry.total_calories,
             calorie_deficit=entry.calorie_deficit
         )
         summaries.append(summary)
@@ -236,23 +334,55 @@ def get_daily_summaries(
     return summaries
 
 
+@router.get("/rolling-stats", response_model=RollingStatsResponse)
+def get_rolling_stats_endpoint(
+    user_id: str = Query(..., description="User identifier"),
+    window: int = Query(30, description=f"Trailing window in days, one of {ROLLUP_WINDOWS}"),
+    db: Session = Depends(get_db)
+):
+    """Rolling mean/std of HRV, body temperature and calorie deficit ending today"""
+    
+    if window not in ROLLUP_WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"window must be one of {', '.join(str(w) for w in ROLLUP_WINDOWS)}"
+        )
+    
+    tracking_write_buffer.flush(user_id)
+    stats = get_rolling_stats(db, user_id, window)
+    # Persist the rollup if it was created or slid forward
+    db.commit()
+    
+    return RollingStatsResponse(user_id=user_id, window_days=window, **stats)
+
+
 @router.get("/weekly-summary", response_model=WeeklyTrackingSummary)
 def get_weekly_summary(
+    request: Request,
+    response: Response,
     user_id: str = Query(..., description="User identifier"),
     week_start: date = Query(..., description="Start date of the week (Monday)"),
     db: Session = Depends(get_db)
 ):
-    """Get weekly tracking summary for a user"""
+    """Get weekly tracking summary for a user (supports If-None-Match)"""
     
+    tracking_write_buffer.flush(user_id)
     week_end = week_start + timedelta(days=6)
     
-    entries = db.query(DailyTracking).filter(
+    query = db.query(DailyTracking).filter(
         and_(
             DailyTracking.user_id == user_id,
             DailyTracking.tracking_date >= week_start,
             DailyTracking.tracking_date <= week_end
         )
-    ).order_by(asc(DailyTracking.tracking_date)).all()
+    ).order_by(asc(DailyTracking.tracking_date))
+    
+    revisions = [row.revision for row in query.with_entities(DailyTracking.revision)]
+    cached = not_modified(request, response, weak_etag("weekly-summary", revisions))
+    if cached:
+        return cached
+    
+    entries = query.all()
     
     # Create daily summaries
     daily_summaries = []
@@ -262,6 +392,7 @@ def get_weekly_summary(
             tracking_date=entry.tracking_date,
             body_temperature=entry.body_temperature,
             heart_rate_variability=entry.heart_rate_variability,
+            total_calories=entry.total_calories,
             calorie_deficit=entry.calorie_deficit
         )
         daily_summaries.append(summary)
@@ -269,6 +400,7 @@ def get_weekly_summary(
     # Calculate averages
     body_temps = [e.body_temperature for e in entries if e.body_temperature is not None]
     hrv_values = [e.heart_rate_variability for e in entries if e.heart_rate_variability is not None]
+    total_calories = [e.total_calories for e in entries if e.total_calories is not None]
     calorie_deficits = [e.calorie_deficit for e in entries if e.calorie_deficit is not None]
     
     return WeeklyTrackingSummary(
@@ -278,6 +410,7 @@ def get_weekly_summary(
         daily_summaries=daily_summaries,
         average_body_temperature=sum(body_temps) / len(body_temps) if body_temps else None,
         average_hrv=sum(hrv_values) / len(hrv_values) if hrv_values else None,
+        average_total_calories=sum(total_calories) / len(total_calories) if total_calories else None,
         average_calorie_deficit=sum(calorie_deficits) / len(calorie_deficits) if calorie_deficits else None,
         total_days=len(entries)
     )
@@ -291,6 +424,7 @@ def delete_daily_tracking(
 ):
     """Delete daily tracking entry for a specific date"""
     
+    tracking_write_buffer.flush(user_id)
     entry = db.query(DailyTracking).filter(
         and_(
             DailyTracking.user_id == user_id,
@@ -304,8 +438,10 @@ def delete_daily_tracking(
             detail=f"No tracking data found for {tracking_date}"
         )
     
+    apply_tracking_change(db, user_id, TrackingValues.of(entry), None)
     db.delete(entry)
     db.commit()
+    bbt_analytics_cache.invalidate(user_id)
     
     return {"message": f"Daily tracking data for {tracking_date} deleted successfully"}
 
@@ -317,6 +453,7 @@ def get_today_tracking(
 ):
     """Get today's tracking entry for a user"""
     
+    tracking_write_buffer.flush(user_id)
     today = date.today()
     entry = db.query(DailyTracking).filter(
         and_(
@@ -333,7 +470,6 @@ def get_today_tracking(
         )
         db.add(entry)
         db.commit()
-        db.refresh(entry)
     
     return entry
 
@@ -342,9 +478,12 @@ def get_today_tracking(
 def get_all_tracking_data(db: Session = Depends(get_db)):
     """Get all daily tracking data for database viewing (admin endpoint)"""
     
+    tracking_write_buffer.flush()
     entries = db.query(DailyTracking).order_by(desc(DailyTracking.tracking_date), desc(DailyTracking.user_id)).all()
     
-    return {
+    # Returned as a response directly: orjson encodes the datetimes itself, which
+    # is far cheaper than running thousands of rows through jsonable_encoder
+    return ORJSONResponse({
         "total_entries": len(entries),
         "entries": [
             {
@@ -360,19 +499,22 @@ def get_all_tracking_data(db: Session = Depends(get_db)):
             }
             for entry in entries
         ]
-    }
+    })
 
 
 @router.delete("/admin/clear-tracking")
 def clear_all_tracking_data(db: Session = Depends(get_db)):
     """Clear all daily tracking data from database (admin endpoint)"""
     
+    tracking_write_buffer.flush()
     # Get count before deletion for response
     entry_count = db.query(DailyTracking).count()
     
-    # Delete all tracking entries
+    # Delete all tracking entries and the rollups derived from them
     db.query(DailyTracking).delete()
+    db.query(UserMetricRollup).delete()
     db.commit()
+    bbt_analytics_cache.invalidate()
     
     return {
         "message": "Daily tracking database cleared successfully",
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional
 from app.core.database import get_db
+from app.core.http_cache import not_modified, weak_etag
 from app.models.health_profile import HealthProfile
 from app.schemas.health_profile import (
     HealthProfileCreate,
@@ -45,7 +46,6 @@ async def create_health_profile(
     
     db.add(db_profile)
     db.commit()
-    db.refresh(db_profile)
     
     return db_profile
 
@@ -53,21 +53,29 @@ async def create_health_profile(
 @router.get("/{user_id}", response_model=HealthProfileResponse)
 async def get_health_profile(
     user_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """Get health profile for a specific user"""
+    """Get health profile for a specific user (supports If-None-Match)"""
     
-    profile = db.query(HealthProfile).filter(
+    current = db.query(HealthProfile.revision).filter(
         HealthProfile.user_id == user_id
     ).first()
     
-    if not profile:
+    if not current:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Health profile not found for this user"
         )
     
-    return profile
+    cached = not_modified(request, response, weak_etag("profile", current.revision))
+    if cached:
+        return cached
+    
+    return db.query(HealthProfile).filter(
+        HealthProfile.user_id == user_id
+    ).first()
 
 
 @router.put("/{user_id}", response_model=HealthProfileResponse)
@@ -94,7 +102,6 @@ async def update_health_profile(
         setattr(profile, field, value)
     
     db.commit()
-    db.refresh(profile)
     
     return profile
 
@@ -135,7 +142,6 @@ async def complete_survey(
         db.add(profile)
     
     db.commit()
-    db.refresh(profile)
     
     return profile
 
@@ -166,14 +172,20 @@ async def delete_health_profile(
 @router.get("/{user_id}/survey-status")
 async def get_survey_status(
     user_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """Check if user has completed the health survey"""
+    """Check if user has completed the health survey (supports If-None-Match)"""
     
-    profile = db.query(HealthProfile).filter(
+    profile = db.query(HealthProfile.survey_completed, HealthProfile.revision).filter(
         HealthProfile.user_id == user_id
     ).first()
     
+    cached = not_modified(request, response, weak_etag("survey-status", profile.revision if profile else None))
+    if cached:
+        return cached
+    
     return {
         "user_id": user_id,
         "survey_completed": profile.survey_completed if profile else False,
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import List, Optional
+
+from app.core.database import get_db
+from app.core.hrv_samples import MAX_UPLOAD_SAMPLES, ingest_samples, load_day_samples
+from app.core.write_behind import tracking_write_buffer
+from app.models.hrv_sample import HRVDailyStats
+from app.schemas.hrv import HRVSampleUpload, HRVUploadResponse, HRVDailySummary, HRVDaySamples
+
+router = APIRouter()
+
+
+@router.post("/samples", response_model=HRVUploadResponse)
+def upload_hrv_samples(
+    upload: HRVSampleUpload,
+    user_id: str = Query(..., description="User identifier"),
+    db: Session = Depends(get_db)
+):
+    """
+    Store raw RR intervals and update that day's HRV summary. The day's RMSSD
+    is also written to daily tracking as heart_rate_variability.
+    """
+
+    if len(upload.rr_intervals) > MAX_UPLOAD_SAMPLES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many samples ({len(upload.rr_intervals)}); send at most {MAX_UPLOAD_SAMPLES} per request"
+        )
+
+    tracking_write_buffer.flush(user_id)
+    days = ingest_samples(db, user_id, upload.start_time, upload.rr_intervals)
+    db.commit()
+
+    return HRVUploadResponse(
+        user_id=user_id,
+        samples_received=len(upload.rr_intervals),
+        days=days,
+    )
+
+
+@router.get("/daily", response_model=List[HRVDailySummary])
+def get_daily_hrv(
+    user_id: str = Query(..., description="User identifier"),
+    start_date: Optional[date] = Query(None, description="Start date filter"),
+    end_date: Optional[date] = Query(None, description="End date filter"),
+    db: Session = Depends(get_db)
+):
+    """Daily HRV summaries in chronological order"""
+
+    query = db.query(HRVDailyStats).filter(HRVDailyStats.user_id == user_id)
+    if start_date:
+        query = query.filter(HRVDailyStats.sample_date >= start_date)
+    if end_date:
+        query = query.filter(HRVDailyStats.sample_date <= end_date)
+    return query.order_by(HRVDailyStats.sample_date).all()
+
+
+@router.get("/samples", response_model=HRVDaySamples)
+def get_day_samples(
+    user_id: str = Query(..., description="User identifier"),
+    sample_date: date = Query(..., description="Day to fetch"),
+    db: Session = Depends(get_db)
+):
+    """Every stored RR interval for one day, in time order"""
+
+    samples = load_day_samples(db, user_id, sample_date)
+    if samples.size == 0:
+        raise HTTPException(status_code=404, detail="No HRV samples for this date")
+    return HRVDaySamples(user_id=user_id, sample_date=sample_date, rr_intervals=samples.tolist())
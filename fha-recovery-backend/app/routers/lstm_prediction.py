@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.schemas.lstm_prediction import LSTMPredictionRequest, LSTMPredictionResponse
 from app.core.lstm_predictor import LSTMPredictor
 from app.core.database import get_db
+from app.core.write_behind import tracking_write_buffer
 from app.models.daily_tracking import DailyTracking
 from datetime import datetime, timedelta
 from typing import List
@@ -37,6 +38,7 @@ async def predict_recovery(request: LSTMPredictionRequest, db: Session = Depends
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=60)
         
+        tracking_write_buffer.flush(request.user_id)
         daily_records = db.query(DailyTracking).filter(
             DailyTracking.user_id == request.user_id,
             DailyTracking.tracking_date >= start_date,
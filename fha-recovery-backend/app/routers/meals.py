@@ -1,38 +1,78 @@
-from fastapi import APIRouter
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import func, desc
+from datetime import date
+from typing import Optional
+
+from app.core.database import get_db
+from app.core.tracking_sync import add_meal_calories
+from app.core.write_behind import tracking_write_buffer
+from app.models.meal import Meal as MealRecord
 from app.schemas.meals import Meal, MealResponse
 
 router = APIRouter()
 
-# Mock data for demonstration
-mock_meals = [
-    Meal(
-        id=i,
-        date=(datetime.now() - timedelta(days=7 - i)).date(),
-        meal_type=["breakfast", "lunch", "dinner", "snack"][i % 4],
-        description=f"Sample meal {i+1}",
-        calories=300 + (i * 50),
-        notes=f"Notes for meal {i+1}" if i % 3 == 0 else None,
-    )
-    for i in range(20)
-]
-
 
 @router.get("/", response_model=MealResponse)
-async def get_meals():
-    """Get logged meals"""
+def get_meals(
+    user_id: str = Query(..., description="User identifier"),
+    start_date: Optional[date] = Query(None, description="Start date filter"),
+    end_date: Optional[date] = Query(None, description="End date filter"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of meals to return"),
+    offset: int = Query(0, ge=0, description="Number of meals to skip"),
+    db: Session = Depends(get_db)
+):
+    """Get logged meals, newest first, with totals computed over the whole filtered range"""
+
+    filters = [MealRecord.user_id == user_id]
+    if start_date:
+        filters.append(MealRecord.date >= start_date)
+    if end_date:
+        filters.append(MealRecord.date <= end_date)
+
+    total_count, total_calories, average_calories = db.query(
+        func.count(MealRecord.id),
+        func.coalesce(func.sum(MealRecord.calories), 0),
+        func.coalesce(func.avg(MealRecord.calories), 0.0),
+    ).filter(*filters).one()
+
+    meals = (
+        db.query(MealRecord)
+        .filter(*filters)
+        .order_by(desc(MealRecord.date), desc(MealRecord.id))
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
     return MealResponse(
-        meals=mock_meals,
-        total_calories=sum(m.calories for m in mock_meals),
-        average_calories=sum(m.calories for m in mock_meals) / len(mock_meals)
-        if mock_meals
-        else 0,
+        meals=meals,
+        total_calories=int(total_calories),
+        average_calories=float(average_calories),
+        total_count=total_count,
+        limit=limit,
+        offset=offset,
     )
 
 
 @router.post("/", response_model=Meal)
-async def create_meal(meal: Meal):
-    """Log a new meal"""
-    meal.id = len(mock_meals) + 1
-    mock_meals.append(meal)
-    return meal
+def create_meal(
+    meal: Meal,
+    user_id: str = Query(..., description="User identifier"),
+    db: Session = Depends(get_db)
+):
+    """Log a new meal and add its calories to that day's tracking total"""
+
+    db_meal = MealRecord(
+        user_id=user_id,
+        **meal.dict(exclude={"id", "user_id"})
+    )
+    db.add(db_meal)
+    # Buffered absolute totals must land first, or they would overwrite this meal later
+    tracking_write_buffer.flush(user_id)
+    add_meal_calories(db, user_id, meal.date, meal.calories)
+
+    # Meal row and daily total are committed together
+    db.commit()
+
+    return db_meal
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from datetime import date
 import numpy as np
@@ -6,8 +7,9 @@ from typing import List
 
 from app.core.database import get_db
 from app.core.coxfinal import predict_period_recovery
+from app.core.metric_rollups import get_rolling_stats
+from app.core.write_behind import tracking_write_buffer
 from app.schemas.period_prediction import PeriodPredictionRequest, PeriodPredictionResponse
-from app.models.daily_tracking import DailyTracking
 from app.models.health_profile import HealthProfile
 
 router = APIRouter(prefix="/api/period-prediction", tags=["period-prediction"])
@@ -32,9 +34,6 @@ def predict_period_recovery_endpoint(
             timesinceperiod=request.days_since_last_period
         )
         
-        # Convert numpy array to list for JSON serialization
-        probability_list = probability_array.tolist()
-        
         # Calculate summary statistics
         peak_day = int(np.argmax(probability_array)) + 1  # 1-indexed
         peak_probability = float(np.max(probability_array))
@@ -45,19 +44,21 @@ def predict_period_recovery_endpoint(
         cumulative_90 = float(np.sum(probability_array[:90]))
         cumulative_180 = float(np.sum(probability_array[:180]))
         
-        return PeriodPredictionResponse(
-            user_id=request.user_id,
-            prediction_date=date.today(),
-            days_since_last_period=request.days_since_last_period,
-            hrv_average=request.hrv_average,
-            mean_cycle_duration=request.mean_cycle_duration,
-            probability_distribution=probability_list,
-            peak_probability_day=peak_day,
-            peak_probability_value=peak_probability,
-            cumulative_30_day_probability=cumulative_30,
-            cumulative_60_day_probability=cumulative_60,
-            cumulative_90_day_probability=cumulative_90
-        )
+        # Returned as a response directly so orjson writes the distribution straight
+        # from the NumPy array, skipping a .tolist() and Pydantic validation of 180 floats
+        return ORJSONResponse({
+            "user_id": request.user_id,
+            "prediction_date": date.today(),
+            "days_since_last_period": request.days_since_last_period,
+            "hrv_average": request.hrv_average,
+            "mean_cycle_duration": request.mean_cycle_duration,
+            "probability_distribution": probability_array,
+            "peak_probability_day": peak_day,
+            "peak_probability_value": peak_probability,
+            "cumulative_30_day_probability": cumulative_30,
+            "cumulative_60_day_probability": cumulative_60,
+            "cumulative_90_day_probability": cumulative_90
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -74,7 +75,7 @@ def predict_from_user_data(
     """
     Predict period recovery using the user's historical daily tracking data and health profile.
     
-    This endpoint automatically calculates HRV average from daily tracking data and
+    This endpoint reads the 30-day HRV average from the user's metric rollup and
     retrieves days since last period from the user's health profile.
     """
     try:
@@ -89,27 +90,18 @@ def predict_from_user_data(
                 detail="No health profile found or days since last period not set. Please complete your health profile."
             )
         
-        # Get user's recent daily tracking data (last 30 days for HRV average)
-        recent_entries = db.query(DailyTracking).filter(
-            DailyTracking.user_id == user_id,
-            DailyTracking.heart_rate_variability.isnot(None)
-        ).order_by(DailyTracking.tracking_date.desc()).limit(30).all()
+        # 30-day HRV average from the user's rollup row
+        tracking_write_buffer.flush(user_id)
+        hrv_stats = get_rolling_stats(db, user_id, 30)["heart_rate_variability"]
+        db.commit()
         
-        if not recent_entries:
+        if not hrv_stats["count"]:
             raise HTTPException(
                 status_code=404,
-                detail="No HRV data found for user. Please ensure daily tracking data is available."
-            )
-        
-        # Calculate average HRV from recent data
-        hrv_values = [entry.heart_rate_variability for entry in recent_entries if entry.heart_rate_variability is not None]
-        if not hrv_values:
-            raise HTTPException(
-                status_code=400,
-                detail="No valid HRV data found in recent entries."
+                detail="No HRV data found for user in the last 30 days. Please ensure daily tracking data is available."
             )
         
-        avg_hrv = sum(hrv_values) / len(hrv_values)
+        avg_hrv = hrv_stats["mean"]
         
         # Use a default mean cycle duration (can be enhanced later with actual cycle tracking)
         # For FHA users, cycles are often longer or irregular, so we use a higher default
@@ -23,6 +23,7 @@ class MealInspiration(BaseModel):
 
 class MealInspirationRequest(BaseModel):
     logged_meals: List[dict]  # List of meals logged today
+    user_id: Optional[str] = None  # Used for per-user API quotas
 
 
 class MealInspirationResponse(BaseModel):
@@ -34,6 +35,7 @@ class MealInspirationResponse(BaseModel):
 class RecipeRequest(BaseModel):
     meal_id: str
     meal_title: str
+    user_id: Optional[str] = None  # Used for per-user API quotas
 
 
 class FullRecipe(BaseModel):
@@ -53,3 +55,19 @@ class Affirmation(BaseModel):
     text: str
     category: str
     encouragement: str
+
+
+# Raw payloads returned by Gemini's structured (JSON) output mode
+
+class InspirationSuggestionPayload(BaseModel):
+    title: str
+    description: str
+    prep_time: str
+    nutrition_highlights: str
+    why_recommended: str
+
+
+class MealInspirationPayload(BaseModel):
+    daily_analysis: str = 'Your nutrition choices today show great care for your body.'
+    encouragement: str = 'Keep up the wonderful work of nourishing yourself!'
+    suggestions: List[InspirationSuggestionPayload]
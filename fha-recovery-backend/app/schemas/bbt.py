@@ -5,14 +5,42 @@ from typing import List, Optional
 
 class BBTReading(BaseModel):
     id: Optional[int] = None
+    user_id: Optional[str] = None
     date: date
     temperature: float
     notes: Optional[str] = None
 
+    class Config:
+        from_attributes = True
 
-class BBTResponse(BaseModel):
+
+class BBTCycleSummary(BaseModel):
+    """Cycle estimates from the user's body temperature history; None until there is enough data"""
+    cycle_length: Optional[int] = None
+    fertile_window_start: Optional[int] = None  # Cycle day
+    fertile_window_end: Optional[int] = None  # Cycle day
+    coverline: Optional[float] = None
+    thermal_shift_date: Optional[date] = None  # Most recent confirmed shift
+    current_phase: str = "unknown"  # unknown, follicular, fertile or luteal
+    cycles_detected: int = 0
+
+
+class BBTResponse(BBTCycleSummary):
     readings: List[BBTReading]
-    average_temp: float
-    cycle_length: int
-    fertile_window_start: int
-    fertile_window_end: int
+    average_temp: float  # Across every reading matching the filters, not just this page
+    total_count: int
+
+
+class BBTDailyAnalytics(BaseModel):
+    date: date
+    temperature: Optional[float] = None
+    smoothed: Optional[float] = None
+    coverline: Optional[float] = None
+    phase: str
+    thermal_shift: bool = False
+
+
+class BBTAnalyticsResponse(BaseModel):
+    user_id: str
+    summary: BBTCycleSummary
+    days: List[BBTDailyAnalytics]
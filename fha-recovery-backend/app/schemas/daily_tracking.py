@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, validator
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 from enum import Enum
 
@@ -92,3 +92,39 @@ class HealthMetricsUpdateRequest(BaseModel):
     total_calories: Optional[int] = Field(None, ge=0, le=5000)
     calorie_deficit: Optional[int] = Field(None, ge=-2000, le=2000)
     daily_notes: Optional[str] = Field(None, max_length=1000, description="Free-form notes for the day")
+
+
+class MetricRollingStats(BaseModel):
+    """Rolling mean and standard deviation of one metric"""
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    count: int = 0
+
+
+class RollingStatsResponse(BaseModel):
+    """Trailing-window statistics read from the user's rollup row"""
+    user_id: str
+    window_days: int
+    as_of_date: date
+    heart_rate_variability: MetricRollingStats
+    body_temperature: MetricRollingStats
+    calorie_deficit: MetricRollingStats
+
+
+class BulkTrackingRowStatus(BaseModel):
+    """Outcome for one row of a bulk upload"""
+    index: int  # Position in the submitted array / NDJSON line order
+    tracking_date: Optional[date] = None
+    status: str  # created, updated, skipped or invalid
+    errors: List[str] = []
+
+
+class BulkTrackingResponse(BaseModel):
+    """Schema for bulk tracking upload results"""
+    user_id: str
+    received: int
+    created: int
+    updated: int
+    skipped: int
+    invalid: int
+    rows: List[BulkTrackingRowStatus]
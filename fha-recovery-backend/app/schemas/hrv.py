@@ -0,0 +1,37 @@
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from typing import List, Optional
+
+
+class HRVSampleUpload(BaseModel):
+    """A continuous run of beat-to-beat intervals from a wearable"""
+    start_time: datetime = Field(..., description="Time of the first beat, in the user's local time")
+    rr_intervals: List[float] = Field(..., min_length=1, description="RR intervals in milliseconds, in order")
+
+
+class HRVDailySummary(BaseModel):
+    """Daily HRV computed from the raw intervals; heart_rate_variability in daily tracking is the RMSSD"""
+    sample_date: date
+    sample_count: int
+    rejected_count: int  # Intervals dropped as artifacts
+    rmssd: Optional[float] = None
+    sdnn: Optional[float] = None
+    mean_rr: Optional[float] = None
+    p10_rr: Optional[float] = None
+    p50_rr: Optional[float] = None
+    p90_rr: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+
+class HRVUploadResponse(BaseModel):
+    user_id: str
+    samples_received: int
+    days: List[HRVDailySummary]
+
+
+class HRVDaySamples(BaseModel):
+    user_id: str
+    sample_date: date
+    rr_intervals: List[float]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -7,6 +7,12 @@ class MealAnalysisRequest(BaseModel):
     meal_type: str  # breakfast, lunch, dinner, snack
     description: str
     image_base64: Optional[str] = None
+    user_id: Optional[str] = None  # Used for per-user API quotas
+
+
+class MealBatchAnalysisRequest(BaseModel):
+    meals: List[MealAnalysisRequest] = Field(..., min_length=1, max_length=20)
+    user_id: Optional[str] = None  # Applies to meals that don't set their own
 
 
 class NutrientInfo(BaseModel):
@@ -34,3 +40,18 @@ class MealAnalysisResponse(BaseModel):
     encouragement: str
     processing_level: str  # "minimal", "moderate", "highly_processed"
     estimated_calories: Optional[int] = None
+
+
+class MealAnalysisPayload(BaseModel):
+    """Raw payload returned by Gemini's structured (JSON) output mode"""
+    analysis: str
+    estimated_calories: Optional[int] = None
+
+
+class MealBatchItemPayload(MealAnalysisPayload):
+    index: int  # 1-based position of the meal in the batch prompt
+
+
+class MealBatchAnalysisPayload(BaseModel):
+    """Raw payload for a multi-meal analysis in JSON output mode"""
+    analyses: List[MealBatchItemPayload]
@@ -5,14 +5,21 @@ from typing import List, Optional
 
 class Meal(BaseModel):
     id: Optional[int] = None
+    user_id: Optional[str] = None
     date: date
     meal_type: str  # breakfast, lunch, dinner, snack
     description: str
     calories: int
     notes: Optional[str] = None
 
+    class Config:
+        from_attributes = True
+
 
 class MealResponse(BaseModel):
     meals: List[Meal]
-    total_calories: int
+    total_calories: int  # Across every meal matching the filters, not just this page
     average_calories: float
+    total_count: int
+    limit: int
+    offset: int
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Score every user's recovery predictions from the latest tracking snapshot.
+
+Runs the Cox 180-day distribution and (when the model files and TensorFlow
+are available) the LSTM 30-day probability in batch, reading windows from the
+memory-mapped snapshot written by export_tracking_snapshot.py.
+
+    python batch_predict.py --output predictions.csv
+"""
+
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from app.core.batch_predictions import score_cox, score_lstm
+from app.core.database import SessionLocal
+from app.core.tracking_snapshot import TrackingSnapshot
+from app.models.health_profile import HealthProfile
+
+
+def load_days_since_period():
+    db = SessionLocal()
+    try:
+        rows = db.query(HealthProfile.user_id, HealthProfile.days_since_last_period).filter(
+            HealthProfile.days_since_last_period.isnot(None)
+        ).all()
+    finally:
+        db.close()
+    return dict(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch recovery predictions from a tracking snapshot")
+    parser.add_argument("--snapshot", default=None, help="Snapshot directory (default: latest)")
+    parser.add_argument("--skip-lstm", action="store_true", help="Only run the Cox model")
+    parser.add_argument("--output", default=None, help="Write per-user results to this CSV file")
+    args = parser.parse_args()
+
+    snapshot = TrackingSnapshot(args.snapshot) if args.snapshot else TrackingSnapshot.latest()
+    print(f"Snapshot {snapshot.path} ({len(snapshot.users)} users, "
+          f"{snapshot.start_date} to {snapshot.end_date}, {snapshot.age_seconds / 3600:.1f}h old)")
+
+    started = time.perf_counter()
+    cox = score_cox(snapshot, load_days_since_period())
+    print(f"✅ Cox: {len(cox)} users in {time.perf_counter() - started:.2f}s")
+
+    lstm = {}
+    if not args.skip_lstm:
+        try:
+            from app.core.lstm_predictor import LSTMPredictor
+            predictor = LSTMPredictor()
+            if predictor.is_available():
+                started = time.perf_counter()
+                lstm = score_lstm(snapshot, predictor)
+                print(f"✅ LSTM: {len(lstm)} users in {time.perf_counter() - started:.2f}s")
+            else:
+                print("❌ LSTM model files missing, skipping LSTM predictions")
+        except ImportError as e:
+            print(f"❌ LSTM unavailable ({e}), skipping LSTM predictions")
+
+    if args.output:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["user_id", "lstm_recovery_probability", "cox_peak_day",
+                             "cox_cumulative_30", "cox_cumulative_90"])
+            for user_id in sorted(set(cox) | set(lstm)):
+                distribution = cox.get(user_id)
+                writer.writerow([
+                    user_id,
+                    lstm.get(user_id, ""),
+                    int(np.argmax(distribution)) + 1 if distribution is not None else "",
+                    float(distribution[:30].sum()) if distribution is not None else "",
+                    float(distribution[:90].sum()) if distribution is not None else "",
+                ])
+        print(f"✅ Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark: wire bytes and CPU per payload.
+
+Renders the largest responses the API returns (the same builders as
+benchmark_serialization.py, plus the fallback meal inspiration and recipe),
+then compresses each body with gzip and Brotli at several levels and reports
+the compressed size and the compression time. Use it to pick
+COMPRESSION_GZIP_LEVEL / COMPRESSION_BROTLI_QUALITY / COMPRESSION_MINIMUM_SIZE.
+Brotli rows are skipped when the optional `brotli` package isn't installed.
+
+    python benchmark_compression.py --iterations 50 --admin-entries 5000
+"""
+
+import argparse
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.core.compression import brotli, compress_body
+from app.core.static_content import fallback_inspiration, fallback_recipe
+from app.schemas.bbt import BBTDailyAnalytics
+from app.schemas.daily_tracking import DailyTrackingResponse
+from benchmark_serialization import admin_dump, bbt_daily, cox_payload, tracking_history
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 11)
+
+
+def payloads(args) -> List[tuple]:
+    history = TypeAdapter(List[DailyTrackingResponse]).dump_python(tracking_history(args.days), mode="json")
+    analytics = TypeAdapter(List[BBTDailyAnalytics]).dump_python(bbt_daily(args.days), mode="json")
+    return [
+        ("cox prediction", ORJSONResponse(cox_payload(numpy_distribution=True)).body),
+        (f"tracking history ({args.days} days)", ORJSONResponse(history).body),
+        (f"bbt analytics ({args.days} days)", ORJSONResponse(analytics).body),
+        (f"admin all-tracking ({args.admin_entries} rows)", ORJSONResponse(jsonable_encoder(admin_dump(args.admin_entries))).body),
+        ("meal inspiration", ORJSONResponse(fallback_inspiration().model_dump(mode="json")).body),
+        ("recipe", ORJSONResponse(fallback_recipe("Salmon Quinoa Bowl").model_dump(mode="json")).body),
+    ]
+
+
+def timed(body: bytes, encoding: str, level: int, iterations: int):
+    compressed = compress_body(body, encoding, gzip_level=level, brotli_quality=level)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        compress_body(body, encoding, gzip_level=level, brotli_quality=level)
+    return (time.perf_counter() - start) / iterations * 1000, len(compressed)
+
+
+def run(args):
+    settings = [("gzip", level) for level in GZIP_LEVELS]
+    if brotli is not None:
+        settings += [("br", quality) for quality in BROTLI_QUALITIES]
+    else:
+        print("brotli not installed, gzip only (pip install brotli)\n")
+
+    print(f"{'payload':<36} {'raw bytes':>10} {'encoding':>9} {'bytes':>9} {'ratio':>7} {'cpu ms':>8}")
+    for name, body in payloads(args):
+        for encoding, level in settings:
+            cpu_ms, size = timed(body, encoding, level, args.iterations)
+            print(f"{name:<36} {len(body):>10} {f'{encoding}-{level}':>9} {size:>9} {len(body) / size:>6.1f}x {cpu_ms:>8.3f}")
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare gzip and Brotli levels on the API's largest responses")
+    parser.add_argument("--iterations", type=int, default=50, help="Timed compressions per payload and level")
+    parser.add_argument("--days", type=int, default=365, help="Days of tracking history / BBT analytics")
+    parser.add_argument("--admin-entries", type=int, default=5000, help="Rows in the admin tracking dump")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Response serialization benchmark: stdlib JSONResponse vs ORJSONResponse.
+
+Builds the largest payloads the API returns (the Cox 180-day distribution, a
+year of tracking history, the admin tracking dump, a year of BBT analytics)
+and times the same steps FastAPI runs for each: Pydantic's JSON-mode dump or
+jsonable_encoder, then rendering the response body. The Cox payload is also
+timed the way the endpoint now returns it, with orjson encoding the NumPy
+array directly, and the admin dump as that route returns it (no jsonable_encoder).
+
+    python benchmark_serialization.py --iterations 200 --admin-entries 5000
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.bbt import BBTDailyAnalytics
+from app.schemas.daily_tracking import DailyTrackingResponse
+
+
+def cox_payload(numpy_distribution: bool) -> dict:
+    distribution = np.random.default_rng(0).dirichlet(np.ones(180))
+    return {
+        "user_id": "benchmark-user",
+        "prediction_date": date.today(),
+        "days_since_last_period": 120,
+        "hrv_average": 42.5,
+        "mean_cycle_duration": 35.0,
+        "probability_distribution": distribution if numpy_distribution else distribution.tolist(),
+        "peak_probability_day": int(np.argmax(distribution)) + 1,
+        "peak_probability_value": float(distribution.max()),
+        "cumulative_30_day_probability": float(distribution[:30].sum()),
+        "cumulative_60_day_probability": float(distribution[:60].sum()),
+        "cumulative_90_day_probability": float(distribution[:90].sum()),
+    }
+
+
+def tracking_history(days: int) -> List[DailyTrackingResponse]:
+    rng = np.random.default_rng(1)
+    today = date.today()
+    now = datetime.now()
+    return [
+        DailyTrackingResponse(
+            id=i + 1,
+            user_id="benchmark-user",
+            tracking_date=today - timedelta(days=i),
+            body_temperature=round(97.5 + rng.normal(0, 0.3), 2),
+            heart_rate_variability=round(45 + rng.normal(0, 8), 1),
+            total_calories=int(rng.integers(1400, 2600)),
+            calorie_deficit=int(rng.integers(-500, 500)),
+            daily_notes="Felt good, walked in the afternoon" if i % 3 == 0 else None,
+            created_at=now - timedelta(days=i),
+            updated_at=now - timedelta(days=i, hours=-2),
+        )
+        for i in range(days)
+    ]
+
+
+def admin_dump(entries: int) -> dict:
+    rows = [entry.model_dump() for entry in tracking_history(min(entries, 365))]
+    rows = (rows * (entries // len(rows) + 1))[:entries]
+    return {"total_entries": len(rows), "entries": rows}
+
+
+def bbt_daily(days: int) -> List[BBTDailyAnalytics]:
+    rng = np.random.default_rng(2)
+    start = date.today() - timedelta(days=days - 1)
+    phases = ("follicular", "fertile", "luteal")
+    return [
+        BBTDailyAnalytics(
+            date=start + timedelta(days=i),
+            temperature=round(97.4 + rng.normal(0, 0.2), 2),
+            smoothed=round(97.4 + rng.normal(0, 0.1), 2),
+            coverline=97.6,
+            phase=phases[(i // 10) % 3],
+            thermal_shift=i % 29 == 14,
+        )
+        for i in range(days)
+    ]
+
+
+def timed(function: Callable[[], bytes], iterations: int):
+    body = function()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1000, len(body)
+
+
+def run(args):
+    history = tracking_history(args.days)
+    history_adapter = TypeAdapter(List[DailyTrackingResponse])
+    analytics = bbt_daily(args.days)
+    analytics_adapter = TypeAdapter(List[BBTDailyAnalytics])
+    admin = admin_dump(args.admin_entries)
+    cox_lists = cox_payload(numpy_distribution=False)
+    cox_numpy = cox_payload(numpy_distribution=True)
+
+    cases = [
+        ("cox prediction (lists)",
+         lambda: JSONResponse(jsonable_encoder(cox_lists)).body,
+         lambda: ORJSONResponse(jsonable_encoder(cox_lists)).body),
+        ("cox prediction (ndarray, direct)",
+         lambda: JSONResponse(jsonable_encoder(cox_lists)).body,
+         lambda: ORJSONResponse(cox_numpy).body),
+        (f"tracking history ({args.days} days)",
+         lambda: JSONResponse(history_adapter.dump_python(history, mode="json")).body,
+         lambda: ORJSONResponse(history_adapter.dump_python(history, mode="json")).body),
+        (f"bbt analytics ({args.days} days)",
+         lambda: JSONResponse(analytics_adapter.dump_python(analytics, mode="json")).body,
+         lambda: ORJSONResponse(analytics_adapter.dump_python(analytics, mode="json")).body),
+        (f"admin all-tracking ({args.admin_entries} rows)",
+         lambda: JSONResponse(jsonable_encoder(admin)).body,
+         lambda: ORJSONResponse(jsonable_encoder(admin)).body),
+        (f"admin all-tracking ({args.admin_entries} rows, direct)",
+         lambda: JSONResponse(jsonable_encoder(admin)).body,
+         lambda: ORJSONResponse(admin).body),
+    ]
+
+    print(f"{'payload':<44} {'bytes':>9} {'json ms':>9} {'orjson ms':>10} {'speedup':>8}")
+    for name, stdlib, fast in cases:
+        stdlib_ms, size = timed(stdlib, args.iterations)
+        fast_ms, _ = timed(fast, args.iterations)
+        print(f"{name:<44} {size:>9} {stdlib_ms:>9.3f} {fast_ms:>10.3f} {stdlib_ms / fast_ms:>7.1f}x")
+
+    # Rendering alone, from already JSON-ready Python objects
+    history_json = history_adapter.dump_python(history, mode="json")
+    admin_json = jsonable_encoder(admin)
+    print("\nrender step only:")
+    for name, content in (("tracking history", history_json), ("admin all-tracking", admin_json)):
+        stdlib_ms, size = timed(lambda: JSONResponse(content).body, args.iterations)
+        fast_ms, _ = timed(lambda: ORJSONResponse(content).body, args.iterations)
+        print(f"{name:<44} {size:>9} {stdlib_ms:>9.3f} {fast_ms:>10.3f} {stdlib_ms / fast_ms:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stdlib JSON and orjson response serialization")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed renders per payload")
+    parser.add_argument("--days", type=int, default=365, help="Days of tracking history / BBT analytics")
+    parser.add_argument("--admin-entries", type=int, default=5000, help="Rows in the admin tracking dump")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
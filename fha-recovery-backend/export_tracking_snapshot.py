@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Export daily_tracking into a columnar, memory-mappable snapshot.
+
+Writes <TRACKING_SNAPSHOT_DIR>/<timestamp>/series.npy (users x days x
+channels, float32) plus users.npy and manifest.json, then points LATEST at
+it. Schedule it (e.g. nightly) so batch analytics read the snapshot instead
+of the database.
+
+    python export_tracking_snapshot.py --days 365
+    python export_tracking_snapshot.py --parquet
+"""
+
+import argparse
+import time
+
+from app.core.database import SessionLocal
+from app.core.tracking_snapshot import SNAPSHOT_DIR, write_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export daily tracking data to a columnar snapshot")
+    parser.add_argument("--days", type=int, default=365, help="Days of history to include")
+    parser.add_argument("--output", default=None, help=f"Snapshot root directory (default {SNAPSHOT_DIR})")
+    parser.add_argument("--parquet", action="store_true", help="Also write a long-format Parquet file")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows fetched per database round trip")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        path = write_snapshot(db, args.output, days=args.days, parquet=args.parquet, batch_size=args.batch_size)
+    except Exception as e:
+        print(f"❌ Error exporting tracking snapshot: {e}")
+        raise
+    finally:
+        db.close()
+
+    print(f"✅ Wrote snapshot {path} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
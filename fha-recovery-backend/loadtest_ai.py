@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the AI endpoints.
+
+Runs the FastAPI app in-process against the stub LLM backend (no API key or
+quota needed), drives /api/ai endpoints with concurrent clients and reports
+throughput and latency percentiles per endpoint.
+
+    python loadtest_ai.py --requests 300 --concurrency 20 --repeat-ratio 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+MEAL_DESCRIPTIONS = [
+    "2 scrambled eggs with buttered toast and orange juice",
+    "grilled chicken salad with olive oil dressing and croutons",
+    "oatmeal with peanut butter, banana and whole milk",
+    "salmon with roasted potatoes and green beans",
+    "turkey sandwich on sourdough with avocado and an apple",
+    "greek yogurt with granola and honey",
+    "beef stir fry with rice and broccoli",
+    "lentil soup with crusty bread",
+]
+MEAL_TYPES = ["breakfast", "lunch", "dinner", "snack"]
+RECIPE_TITLES = [
+    "Miso Glazed Chicken Rice Bowl",
+    "Creamy Tuscan White Bean Pasta",
+    "Peanut Butter Banana Overnight Oats",
+    "Beef and Sweet Potato Hash",
+    "Coconut Lentil Dal",
+]
+ENDPOINTS = ("analyze", "analyze-stream", "analyze-batch", "inspiration", "recipe")
+
+
+def configure_environment(args):
+    """Point the app at the stub backend and a throwaway database before importing it"""
+    os.environ["LLM_BACKEND"] = "stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["LLM_STUB_LATENCY_SIGMA"] = str(args.latency_sigma)
+    os.environ["LLM_STUB_ERROR_RATE"] = str(args.error_rate)
+    os.environ["LLM_STUB_SEED"] = str(args.seed)
+    if not args.keep_budgets:
+        for name in ("GEMINI_DAILY_BUDGET", "GEMINI_CALLS_PER_MINUTE", "GEMINI_USER_CALLS_PER_MINUTE"):
+            os.environ[name] = "0"
+        for endpoint in ("ANALYZE", "INSPIRATION", "RECIPE"):
+            os.environ[f"GEMINI_DAILY_QUOTA_{endpoint}"] = "0"
+            os.environ[f"GEMINI_USER_DAILY_QUOTA_{endpoint}"] = "0"
+    if not args.database_url:
+        db_path = Path(tempfile.mkdtemp(prefix="fha-loadtest-")) / "loadtest.db"
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    else:
+        os.environ["DATABASE_URL"] = args.database_url
+
+
+def build_request(endpoint: str, rng: random.Random, repeat_ratio: float, index: int):
+    """(method, path, json body); repeated payloads exercise caching and single-flight"""
+    repeat = rng.random() < repeat_ratio
+    user_id = f"loadtest-{rng.randrange(50)}"
+
+    if endpoint in ("analyze", "analyze-stream"):
+        description = rng.choice(MEAL_DESCRIPTIONS)
+        if not repeat:
+            description = f"{description} (variation {index})"
+        path = "/api/ai/analyze-meal" if endpoint == "analyze" else "/api/ai/analyze-meal/stream"
+        return "POST", path, {"meal_type": rng.choice(MEAL_TYPES), "description": description, "user_id": user_id}
+
+    if endpoint == "analyze-batch":
+        meals = []
+        for meal_type in MEAL_TYPES[:rng.randint(3, 4)]:
+            description = rng.choice(MEAL_DESCRIPTIONS)
+            if not repeat:
+                description = f"{description} (variation {index})"
+            meals.append({"meal_type": meal_type, "description": description})
+        return "POST", "/api/ai/analyze-meals", {"meals": meals, "user_id": user_id}
+
+    if endpoint == "inspiration":
+        meals = [{"meal_type": "breakfast", "calorieCount": 450,
+                  "analysis": {"overall_assessment": rng.choice(MEAL_DESCRIPTIONS)}}]
+        if not repeat:
+            meals.append({"meal_type": "lunch", "calorieCount": 300 + index,
+                          "analysis": {"overall_assessment": f"variation {index}"}})
+        return "POST", "/api/ai/meal-inspiration", {"logged_meals": meals, "user_id": user_id}
+
+    title = rng.choice(RECIPE_TITLES)
+    if not repeat:
+        title = f"{title} {index}"
+    return "POST", "/api/ai/generate-recipe", {"meal_id": str(index), "meal_title": title, "user_id": user_id}
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(args):
+    import httpx
+    from app.main import app
+    from app.core.database import create_tables
+
+    # ASGITransport doesn't run startup events
+    create_tables()
+
+    rng = random.Random(args.seed)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        sys.exit(f"Unknown endpoints: {', '.join(sorted(unknown))} (choose from {', '.join(ENDPOINTS)})")
+
+    jobs = asyncio.Queue()
+    for index in range(args.requests):
+        endpoint = endpoints[index % len(endpoints)]
+        jobs.put_nowait((endpoint, build_request(endpoint, rng, args.repeat_ratio, index)))
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+        async def worker():
+            while True:
+                try:
+                    endpoint, (method, path, body) = jobs.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=body)
+                    await response.aread()
+                    if response.status_code >= 400:
+                        errors[endpoint] += 1
+                except Exception as e:
+                    print(f"❌ {endpoint} request failed: {e}")
+                    errors[endpoint] += 1
+                latencies[endpoint].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        usage = (await client.get("/api/ai/usage")).json()
+
+    print(f"\nCompleted {args.requests} requests in {elapsed:.2f}s "
+          f"({args.requests / elapsed:.1f} req/s) with concurrency {args.concurrency}")
+    print(f"Stub latency ~{args.latency_ms:.0f}ms (sigma {args.latency_sigma}), "
+          f"error rate {args.error_rate:.0%}, repeat ratio {args.repeat_ratio:.0%}\n")
+    print(f"{'endpoint':<16} {'count':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    print("-" * 66)
+    for endpoint in endpoints:
+        values = sorted(latencies[endpoint])
+        print(f"{endpoint:<16} {len(values):>6} {errors[endpoint]:>6} {len(values) / elapsed:>8.1f} "
+              f"{percentile(values, 50) * 1000:>8.0f} {percentile(values, 90) * 1000:>8.0f} "
+              f"{percentile(values, 99) * 1000:>8.0f}")
+
+    print(f"\nSingle-flight: {usage.get('single_flight')}")
+    print(f"Recipe cache:  {usage.get('recipe_cache')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AI endpoints against the stub LLM backend")
+    parser.add_argument("--requests", type=int, default=200, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        help=f"Comma-separated endpoints to hit ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--repeat-ratio", type=float, default=0.5,
+                        help="Fraction of requests reusing a common payload (exercises caches)")
+    parser.add_argument("--latency-ms", type=float, default=800, help="Median stub LLM latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal spread of stub latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub calls that fail")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--keep-budgets", action="store_true",
+                        help="Keep configured Gemini API budgets instead of disabling them")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    asyncio.run(run_load(args))
+
+
+if __name__ == "__main__":
+    main()
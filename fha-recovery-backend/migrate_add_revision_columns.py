@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the revision column to daily_tracking and health_profiles.
+Every write stores a new random revision; GET endpoints build their ETags from it.
+Existing rows get a random revision each.
+"""
+
+import sqlite3
+from pathlib import Path
+
+TABLES = ["daily_tracking", "health_profiles"]
+
+
+def migrate_add_revision_columns():
+    """Add revision to each table that doesn't have it yet"""
+
+    # Database path
+    db_path = Path(__file__).parent / "fha_recovery.db"
+
+    if not db_path.exists():
+        print(f"Database not found at {db_path}")
+        return
+
+    print(f"Adding revision columns at {db_path}")
+
+    # Connect to database
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        for table in TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            column_names = [col[1] for col in cursor.fetchall()]
+
+            if not column_names:
+                print(f"Table {table} not found, skipping")
+                continue
+            if "revision" in column_names:
+                print(f"✅ revision already exists in {table}")
+                continue
+
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN revision VARCHAR(32) NOT NULL DEFAULT ''")
+            cursor.execute(f"UPDATE {table} SET revision = lower(hex(randomblob(16)))")
+            print(f"✅ Added revision to {table} ({cursor.rowcount} rows)")
+
+        # Commit changes
+        conn.commit()
+        print("✅ Revision migration completed successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate_add_revision_columns()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Migration script to enforce one daily_tracking row per user per day.
+Merges duplicate (user_id, tracking_date) rows, keeping the newest non-null
+value of each field, then adds the unique index bulk upserts rely on.
+"""
+
+import sqlite3
+from pathlib import Path
+
+MERGED_FIELDS = ["body_temperature", "heart_rate_variability", "total_calories", "calorie_deficit", "daily_notes"]
+
+
+def migrate_add_tracking_unique_constraint():
+    """Deduplicate daily_tracking and add uq_daily_tracking_user_date"""
+    
+    # Database path
+    db_path = Path(__file__).parent / "fha_recovery.db"
+    
+    if not db_path.exists():
+        print(f"Database not found at {db_path}")
+        return
+    
+    print(f"Adding unique (user_id, tracking_date) index to daily_tracking at {db_path}")
+    
+    # Connect to database
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='uq_daily_tracking_user_date'")
+        if cursor.fetchone():
+            print("✅ uq_daily_tracking_user_date already exists")
+            return
+        
+        cursor.execute("PRAGMA table_info(daily_tracking)")
+        column_names = [col[1] for col in cursor.fetchall()]
+        fields = [field for field in MERGED_FIELDS if field in column_names]
+        
+        duplicates = cursor.execute("""
+            SELECT user_id, tracking_date FROM daily_tracking
+            GROUP BY user_id, tracking_date HAVING COUNT(*) > 1
+        """).fetchall()
+        print(f"Found {len(duplicates)} duplicated user/date pairs")
+        
+        for user_id, tracking_date in duplicates:
+            ids = [row[0] for row in cursor.execute(
+                "SELECT id FROM daily_tracking WHERE user_id = ? AND tracking_date = ? ORDER BY id DESC",
+                (user_id, tracking_date)
+            ).fetchall()]
+            keep_id, drop_ids = ids[0], ids[1:]
+            
+            # Newest non-null value wins for each field
+            for field in fields:
+                cursor.execute(f"""
+                    UPDATE daily_tracking SET {field} = (
+                        SELECT {field} FROM daily_tracking
+                        WHERE user_id = ? AND tracking_date = ? AND {field} IS NOT NULL
+                        ORDER BY id DESC LIMIT 1
+                    ) WHERE id = ?
+                """, (user_id, tracking_date, keep_id))
+            
+            cursor.executemany("DELETE FROM daily_tracking WHERE id = ?", [(i,) for i in drop_ids])
+        
+        cursor.execute("""
+            CREATE UNIQUE INDEX uq_daily_tracking_user_date
+            ON daily_tracking (user_id, tracking_date)
+        """)
+        
+        # Commit changes
+        conn.commit()
+        print("✅ Unique (user_id, tracking_date) index added successfully!")
+        if duplicates:
+            print("Run rebuild_metric_rollups.py to refresh rolling statistics")
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate_add_tracking_unique_constraint()
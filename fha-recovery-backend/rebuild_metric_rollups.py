@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Rebuild the user_metric_rollups table from raw daily_tracking rows.
+
+Run after bulk imports or direct database edits that bypassed the API
+(e.g. generate_sample_data.py), or whenever rollups are suspected to drift.
+
+    python rebuild_metric_rollups.py
+    python rebuild_metric_rollups.py --user-id user_123
+"""
+
+import argparse
+import time
+
+from app.core.database import SessionLocal, create_tables
+from app.core.metric_rollups import ROLLUP_WINDOWS, rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute rolling metric statistics from daily tracking data")
+    parser.add_argument("--user-id", default=None, help="Only rebuild this user (default: everyone)")
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        users = rebuild_rollups(db, args.user_id)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding metric rollups: {e}")
+        raise
+    finally:
+        db.close()
+
+    windows = ", ".join(f"{w}d" for w in ROLLUP_WINDOWS)
+    print(f"✅ Rebuilt {windows} rollups for {users} user(s) in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
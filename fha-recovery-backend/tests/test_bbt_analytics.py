@@ -0,0 +1,35 @@
+from app.core.bbt_analytics import BBTAnalyticsCache
+
+
+def test_result_loaded_across_an_invalidation_is_not_stored():
+    cache = BBTAnalyticsCache(ttl_seconds=300, max_users=10)
+
+    def stale_loader():
+        cache.invalidate("user")  # A write lands while the old rows are being analyzed
+        return "stale"
+
+    assert cache.get("user", stale_loader) == "stale"
+    assert cache.get("user", lambda: "fresh") == "fresh"
+    assert cache.get("user", lambda: "unused") == "fresh"
+
+
+def test_invalidating_everyone_also_discards_in_flight_loads():
+    cache = BBTAnalyticsCache(ttl_seconds=300, max_users=10)
+
+    def stale_loader():
+        cache.invalidate()
+        return "stale"
+
+    cache.get("user", stale_loader)
+    assert cache.get("user", lambda: "fresh") == "fresh"
+
+
+def test_other_users_invalidation_does_not_block_storing():
+    cache = BBTAnalyticsCache(ttl_seconds=300, max_users=10)
+
+    def loader():
+        cache.invalidate("other")
+        return "analysis"
+
+    cache.get("user", loader)
+    assert cache.get("user", lambda: "unused") == "analysis"
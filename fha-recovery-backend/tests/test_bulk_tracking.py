@@ -0,0 +1,54 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.core.bulk_tracking import BulkPayloadError, parse_rows, validate_rows
+
+
+@pytest.mark.parametrize("value", [
+    "2026",
+    "2026-10",
+    "today",
+    "2026-10-19T23:00",
+    "2026-W42-1",
+    "20261019",
+    "2026-02-30",
+    " 2026-10-19",
+    20261019,
+    None,
+])
+def test_tracking_date_must_be_exact_iso_date(value):
+    validated = validate_rows([{"tracking_date": value, "heart_rate_variability": 42}])
+
+    assert not validated["keep"][0]
+    assert np.isnat(validated["dates"][0])
+    assert "tracking_date is required as YYYY-MM-DD" in validated["errors"][0]
+
+
+def test_valid_iso_date_is_kept():
+    validated = validate_rows([{"tracking_date": "2026-10-19", "heart_rate_variability": 42}])
+
+    assert validated["keep"][0]
+    assert str(validated["dates"][0]) == "2026-10-19"
+
+
+def test_malformed_ndjson_line_is_an_invalid_row():
+    lines = [json.dumps({"tracking_date": f"2026-09-{day:02d}", "heart_rate_variability": 40 + day})
+             for day in range(1, 18)]
+    lines.insert(5, '{"tracking_date": "2026-09-30", "heart_rate_var')
+
+    rows = parse_rows("\n".join(lines).encode(), "application/x-ndjson")
+    validated = validate_rows(rows)
+
+    assert len(rows) == 18
+    assert validated["keep"].sum() == 17
+    assert not validated["keep"][5]
+    assert validated["errors"][5][0].startswith("Invalid JSON on line 6")
+
+
+def test_undecodable_body_is_rejected():
+    with pytest.raises(BulkPayloadError):
+        parse_rows(b"\xff\xfe", "application/x-ndjson")
+    with pytest.raises(BulkPayloadError):
+        parse_rows(b'{"readings": 3}', "application/json")
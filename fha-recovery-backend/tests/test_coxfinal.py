@@ -0,0 +1,23 @@
+import numpy as np
+
+from app.core.coxfinal import baseline, predict_period_recovery, predict_period_recovery_batch
+
+
+def test_batch_matches_single_prediction_across_the_baseline_end():
+    days = [0, 1, 120, 320, len(baseline) - 181, len(baseline) - 1, len(baseline), len(baseline) + 1, 900]
+    hrv = np.array([20.0, 35.5, 48.0] * 3)
+    mcd = np.array([300.0, 477.48, 650.0] * 3)
+    since = np.array(days)
+
+    batch = predict_period_recovery_batch(hrv, mcd, since)
+
+    assert batch.shape == (len(days), 180)
+    assert np.isfinite(batch).all()
+    for row, (user_hrv, user_mcd, t) in enumerate(zip(hrv, mcd, since)):
+        np.testing.assert_allclose(batch[row], predict_period_recovery(user_hrv, user_mcd, int(t)), rtol=1e-9, atol=1e-15)
+
+
+def test_long_amenorrhea_predicts_zeros():
+    batch = predict_period_recovery_batch(np.array([30.0]), np.array([400.0]), np.array([len(baseline) + 30]))
+
+    assert not batch.any()
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.core.hrv_samples import DailyAccumulator, _split_blocks, unpack_intervals
+
+
+def test_artifact_intervals_add_no_time_to_block_timestamps(monkeypatch):
+    monkeypatch.setattr("app.core.hrv_samples.BLOCK_MAX_SAMPLES", 2)
+    start = datetime(2026, 10, 1, 8, 0)
+    rr = np.array([800, np.nan, 1e15, -800, np.inf, 810], dtype=np.float32)
+
+    blocks = _split_blocks("user", start, rr)
+
+    after_first = start + timedelta(milliseconds=800)
+    assert [block.start_time for block in blocks] == [start, after_first, after_first]
+    assert blocks[-1].end_time == start + timedelta(milliseconds=1610)
+
+
+def test_artifact_intervals_are_rejected():
+    accumulator = DailyAccumulator()
+    rr = np.array([800, np.nan, 1e15, -800, np.inf, 810, 820], dtype=np.float32)
+    block = _split_blocks("user", datetime(2026, 10, 1, 8, 0), rr)[0]
+
+    accumulator.add_block(block.start_time, unpack_intervals(block.rr_intervals), block.end_time)
+
+    assert accumulator.sample_count == 3
+    assert accumulator.rejected_count == 4
+    assert accumulator.metrics()["rmssd"] == 10.0